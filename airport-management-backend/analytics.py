@@ -0,0 +1,117 @@
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+
+TOP_ROUTES = 10
+
+# one bulk read per table; everything after it is array arithmetic. Tickets
+# come counted per flight off the Flight_no index, which is a tenth of the
+# rows to ship and convert
+FLIGHTS_QUERY = "SELECT Flight_no, Airline_ID, Airline_name, src_city, des_city FROM Flight"
+TICKETS_QUERY = "SELECT Flight_no, COUNT(*) AS tickets_sold FROM Ticket GROUP BY Flight_no"
+AIRCRAFT_QUERY = "SELECT Airline_ID, capacity FROM Aircraft WHERE capacity IS NOT NULL"
+
+RATIOS = ("load_factor", "flight_share", "ticket_share", "seat_share")
+
+
+def read_frame(db: Session, sql):
+    # rows come straight off the DBAPI cursor; building a Row per record
+    # costs more than the read itself at a hundred thousand flights
+    result = db.execute(text(sql))
+    try:
+        return pd.DataFrame(result.cursor.fetchall(), columns=list(result.keys()))
+    finally:
+        result.close()
+
+
+def snapshot(db: Session):
+    # one row per flight with its tickets sold and seats
+    flights = read_frame(db, FLIGHTS_QUERY)
+    tickets = read_frame(db, TICKETS_QUERY)
+    aircraft = read_frame(db, AIRCRAFT_QUERY)
+
+    # line the counts up with the flight frame by position
+    positions = pd.Index(flights["Flight_no"]).get_indexer(tickets["Flight_no"])
+    sold = np.zeros(len(flights), dtype=np.int64)
+    found = positions >= 0
+    sold[positions[found]] = tickets["tickets_sold"].to_numpy()[found]
+
+    # Flight has no aircraft of its own, so a flight's seats are the mean
+    # capacity of its airline's fleet; airlines with no aircraft stay NaN
+    fleet = aircraft["capacity"].astype(float).groupby(aircraft["Airline_ID"]).mean()
+    seats = flights["Airline_ID"].map(fleet).to_numpy(dtype=float)
+    return flights.assign(tickets_sold=sold, seats=seats)
+
+
+def summarize(frame, keys):
+    # load factor only counts tickets on flights whose seats are known
+    known = ~np.isnan(frame["seats"].to_numpy())
+    totals = pd.DataFrame({
+        "flights": 1,
+        "tickets_sold": frame["tickets_sold"],
+        "seats": np.where(known, frame["seats"], 0.0),
+        "sold_on_known": np.where(known, frame["tickets_sold"], 0),
+    })
+    grouped = totals.groupby([frame[key] for key in keys], sort=False, dropna=False).sum()
+    grouped["load_factor"] = grouped["sold_on_known"] / grouped["seats"].where(grouped["seats"] > 0)
+    grouped["seats"] = grouped["seats"].round().astype(np.int64)
+    return grouped.reset_index()
+
+
+def ratio(numerator, denominator):
+    return round(float(numerator) / float(denominator), 4) if denominator else None
+
+
+def records(frame, columns):
+    frame = frame[columns].copy()
+    for column in RATIOS:
+        if column in frame:
+            # NaN (no seats known) goes out as null
+            frame[column] = frame[column].round(4).astype(object).where(frame[column].notna(), None)
+    return frame.to_dict("records")
+
+
+def load_factor_report(frame):
+    airlines = summarize(frame, ["Airline_ID", "Airline_name"])
+    airlines = airlines.sort_values(["load_factor", "Airline_ID"], ascending=[False, True], na_position="last")
+    seats = frame["seats"].to_numpy()
+    known = ~np.isnan(seats)
+    return {
+        "flights": len(frame),
+        "tickets_sold": int(frame["tickets_sold"].sum()),
+        "seats": int(round(seats[known].sum())),
+        "load_factor": ratio(frame["tickets_sold"].to_numpy()[known].sum(), seats[known].sum()),
+        "flights_without_capacity": int((~known).sum()),
+        "airlines": records(airlines, ["Airline_ID", "Airline_name", "flights", "tickets_sold", "seats", "load_factor"])
+    }
+
+
+def route_rankings(frame, top_n: int = TOP_ROUTES):
+    # sorted by city once, so the stable sorts below break ties by route
+    routes = summarize(frame, ["src_city", "des_city"]).sort_values(["src_city", "des_city"])
+    rated = routes[routes["load_factor"].notna()]
+
+    def top(routes, column, ascending):
+        rows = routes.sort_values(column, ascending=ascending, kind="stable").head(top_n)
+        rows = rows.assign(route=rows["src_city"].fillna("") + " → " + rows["des_city"].fillna(""))
+        return records(rows, ["route", "src_city", "des_city", "flights", "tickets_sold", "seats", "load_factor"])
+
+    return {
+        "routes": len(routes),
+        "busiest": top(routes, "tickets_sold", False),
+        "fullest": top(rated, "load_factor", False),
+        "emptiest": top(rated, "load_factor", True)
+    }
+
+
+def airline_shares(frame):
+    airlines = summarize(frame, ["Airline_ID", "Airline_name"])
+    for column, share in (("flights", "flight_share"), ("tickets_sold", "ticket_share"), ("seats", "seat_share")):
+        total = airlines[column].sum()
+        airlines[share] = airlines[column] / total if total else np.nan
+    airlines = airlines.sort_values(["ticket_share", "Airline_ID"], ascending=[False, True])
+    return {
+        "airlines": records(airlines, ["Airline_ID", "Airline_name", "flights", "tickets_sold", "flight_share", "ticket_share", "seat_share"])
+    }
@@ -0,0 +1,353 @@
+import asyncio
+import datetime
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel
+from sqlalchemy import bindparam, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+import changes
+import listings
+from database import SessionLocal, get_async_db, get_db
+from flight_index import FLIGHT_COLUMNS
+from report_counters import report_counters, bind_lists, capture_passengers, FLIGHTS_SCOPE
+from responses import page_response
+
+
+# flights completed longer ago than this leave the live tables
+ARCHIVE_AFTER_HOURS = float(os.getenv("ARCHIVE_AFTER_HOURS", "24"))
+# flights moved per transaction; all of a batch's flights completed on the same day
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "200"))
+# seconds between background passes; 0 leaves archiving to POST /api/archive/run
+ARCHIVE_INTERVAL = int(os.getenv("ARCHIVE_INTERVAL", "600"))
+# pause between batches, so a large backlog does not hold the live tables
+ARCHIVE_BATCH_PAUSE = float(os.getenv("ARCHIVE_BATCH_PAUSE", "0.2"))
+# default window of the historical listing
+ARCHIVE_DEFAULT_DAYS = 30
+
+PASSENGERS_OF_FLIGHTS = "Passenger_ID IN (SELECT Passenger_ID FROM Passenger WHERE Flight_no IN :key)"
+
+# live table -> columns copied and the rows of a batch (flights in :key).
+# Children come first: they are deleted in this order, before the rows
+# their subqueries look at.
+ARCHIVED_TABLES = [
+    ("Passenger_Email", ("Passenger_ID", "Passenger_email"), PASSENGERS_OF_FLIGHTS),
+    ("Passenger_phone", ("Passenger_ID", "Passenger_phone"), PASSENGERS_OF_FLIGHTS),
+    ("Boards", ("Passenger_ID", "Flight_no"), FLIGHTS_SCOPE["dependents"]),
+    ("Baggage", ("Baggage_ID", "Baggae_weight", "Baggage_status", "Passenger_ID", "Flight_no"), FLIGHTS_SCOPE["dependents"]),
+    ("Ticket", ("Ticket_no", "Price", "Seat_No", "Booking_date", "Class", "Flight_no", "Passenger_ID"), FLIGHTS_SCOPE["dependents"]),
+    ("Crew", ("Crew_ID", "Crew_role", "Employee_ID", "Flight_no"), "Flight_no IN :key"),
+    ("Passenger", (
+        "Passenger_ID", "F_Name", "M_Name", "L_Name", "Passenger_name", "DOB", "Passenger_Address", "Flight_no", "Passenger_status"
+    ), "Flight_no IN :key"),
+    ("Flight", FLIGHT_COLUMNS + ("Completed_at",), "Flight_no IN :key"),
+]
+ARCHIVE_TABLES = [f"{table}_archive" for table, _, _ in ARCHIVED_TABLES]
+
+NEXT_BATCH_QUERY = text("""
+    SELECT Flight_no, Completed_at FROM Flight
+    WHERE Completed_at <= :cutoff
+    ORDER BY Completed_at, Flight_no
+    LIMIT :limit
+""")
+PARTITIONS_QUERY = text("""
+    SELECT TABLE_NAME, PARTITION_DESCRIPTION FROM information_schema.PARTITIONS
+    WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME IN :tables AND PARTITION_NAME <> 'p_future'
+""").bindparams(bindparam("tables", expanding=True))
+
+archive_router = APIRouter()
+
+
+class FlightCompletion(BaseModel):
+    # defaults to now; set it to backfill flights that completed earlier
+    completed_at: Optional[datetime.datetime] = None
+
+
+def as_date(value):
+    # DATETIME values come back as strings from SQLite
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    return datetime.date.fromisoformat(str(value)[:10])
+
+
+def next_month(day):
+    return datetime.date(day.year + day.month // 12, day.month % 12 + 1, 1)
+
+
+class Archiver:
+    def __init__(self):
+        self._lock = threading.Lock()
+        # archive table -> exclusive upper bound of its newest month partition
+        self._partition_bounds = {}
+        self.last_run = None
+
+    def cutoff(self):
+        return datetime.datetime.now() - datetime.timedelta(hours=ARCHIVE_AFTER_HOURS)
+
+    def next_batch(self, db: Session, cutoff, limit=ARCHIVE_BATCH_SIZE):
+        rows = db.execute(NEXT_BATCH_QUERY, {"cutoff": cutoff, "limit": limit}).fetchall()
+        if not rows:
+            return None, []
+        day = as_date(rows[0].Completed_at)
+        return day, [row.Flight_no for row in rows if as_date(row.Completed_at) == day]
+
+    def ensure_partition(self, db: Session, day):
+        # MySQL only: split the day's month off p_future in every archive
+        # table still ending before it. Months older than the newest
+        # partition land in whichever partition covers them.
+        if db.get_bind().dialect.name != "mysql":
+            return
+        bound = next_month(day)
+        if all(self._partition_bounds.get(table, datetime.date.min) >= bound for table in ARCHIVE_TABLES):
+            return
+        bounds = {table: datetime.date.min for table in ARCHIVE_TABLES}
+        for row in db.execute(PARTITIONS_QUERY, {"tables": ARCHIVE_TABLES}):
+            bounds[row.TABLE_NAME] = max(bounds[row.TABLE_NAME], datetime.date.fromisoformat(row.PARTITION_DESCRIPTION.strip("'")))
+        for table, newest in bounds.items():
+            if newest < bound:
+                db.execute(text(f"""
+                    ALTER TABLE {table} REORGANIZE PARTITION p_future INTO (
+                        PARTITION p{day:%Y%m} VALUES LESS THAN ('{bound}'),
+                        PARTITION p_future VALUES LESS THAN (MAXVALUE)
+                    )
+                """))
+                bounds[table] = bound
+        self._partition_bounds = bounds
+
+    def archive_batch(self, db: Session, day, flight_nos):
+        # copies the flights and their dependent rows to the archive and
+        # deletes them from the live tables, in one transaction
+        params = {"key": flight_nos, "archive_date": day}
+        removed = capture_passengers(db, FLIGHTS_SCOPE, flight_nos)
+        crew_ids = [row.Crew_ID for row in db.execute(bind_lists("SELECT Crew_ID FROM Crew WHERE Flight_no IN :key", params), params)]
+        moved = {}
+        for table, columns, where in ARCHIVED_TABLES:
+            column_list = ", ".join(columns)
+            moved[table] = db.execute(bind_lists(f"""
+                INSERT INTO {table}_archive ({column_list}, Archive_date)
+                SELECT {column_list}, :archive_date FROM {table} WHERE {where}
+            """, params), params).rowcount
+        for table, _, where in ARCHIVED_TABLES:
+            if table == "Crew":
+                # the crew stay on staff, free for their next flight
+                db.execute(bind_lists(f"UPDATE Crew SET Flight_no = NULL WHERE {where}", params), params)
+            else:
+                db.execute(bind_lists(f"DELETE FROM {table} WHERE {where}", params), params)
+        with report_counters.writing():
+            db.commit()
+            report_counters.passengers_removed(removed)
+        changes.tables_changed("Flight", "Passenger", "Ticket", "Baggage", "Crew")
+        changes.rows_changed("Flight", "delete", [{"Flight_no": flight_no} for flight_no in flight_nos])
+        if crew_ids:
+            changes.rows_changed("Crew", "update", [{"Crew_ID": crew_id, "Flight_no": None} for crew_id in crew_ids])
+        return moved
+
+    def run(self, max_batches=None, pause=ARCHIVE_BATCH_PAUSE):
+        # returns None when another pass is already running
+        if not self._lock.acquire(blocking=False):
+            return None
+        try:
+            start = time.perf_counter()
+            cutoff = self.cutoff()
+            summary = {"started_at": datetime.datetime.now().isoformat(timespec="seconds"), "cutoff": cutoff.isoformat(timespec="seconds"), "batches": 0, "days": []}
+            moved = defaultdict(int)
+            while max_batches is None or summary["batches"] < max_batches:
+                db = SessionLocal()
+                try:
+                    day, flight_nos = self.next_batch(db, cutoff)
+                    if not flight_nos:
+                        break
+                    self.ensure_partition(db, day)
+                    for table, count in self.archive_batch(db, day, flight_nos).items():
+                        moved[table] += count
+                except Exception:
+                    db.rollback()
+                    raise
+                finally:
+                    db.close()
+                summary["batches"] += 1
+                if str(day) not in summary["days"]:
+                    summary["days"].append(str(day))
+                if pause:
+                    time.sleep(pause)
+            summary["flights"] = moved["Flight"]
+            summary["rows"] = dict(moved)
+            summary["seconds"] = round(time.perf_counter() - start, 3)
+            self.last_run = summary
+            return summary
+        finally:
+            self._lock.release()
+
+
+archiver = Archiver()
+
+
+async def archive_loop(interval=ARCHIVE_INTERVAL):
+    if interval <= 0:
+        return
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await run_in_threadpool(archiver.run)
+        except Exception as e:
+            print(f"Error archiving flights: {e}")
+
+
+@archive_router.put("/api/flight-schedule/{flight_no}/complete")
+def complete_flight(flight_no: str, body: Optional[FlightCompletion] = None, db: Session = Depends(get_db)):
+    try:
+        completed_at = (body.completed_at if body else None) or datetime.datetime.now()
+        result = db.execute(
+            text("UPDATE Flight SET Completed_at = :completed_at WHERE Flight_no = :flight_no"),
+            {"completed_at": completed_at, "flight_no": flight_no}
+        )
+        if result.rowcount == 0:
+            raise HTTPException(status_code=404, detail="Flight not found")
+        db.commit()
+        changes.tables_changed("Flight")
+        changes.rows_changed("Flight", "update", [{"Flight_no": flight_no}])
+        return {"message": "Flight completed", "flight_no": flight_no, "completed_at": completed_at}
+    except HTTPException:
+        raise
+    except Exception as e:
+        db.rollback()
+        print(f"Error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@archive_router.post("/api/archive/run")
+def run_archive(max_batches: Optional[int] = Query(None, ge=1)):
+    try:
+        summary = archiver.run(max_batches)
+        if summary is None:
+            raise HTTPException(status_code=409, detail="An archive pass is already running")
+        return summary
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@archive_router.get("/api/archive/status")
+def get_archive_status(db: Session = Depends(get_db)):
+    try:
+        pending = db.execute(text("SELECT COUNT(*) FROM Flight WHERE Completed_at <= :cutoff"), {"cutoff": archiver.cutoff()}).scalar()
+        completed = db.execute(text("SELECT COUNT(*) FROM Flight WHERE Completed_at IS NOT NULL")).scalar()
+        return {
+            "completed_live": completed,
+            "due": pending,
+            "archive_after_hours": ARCHIVE_AFTER_HOURS,
+            "last_run": archiver.last_run
+        }
+    except Exception as e:
+        print(f"Error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def archive_window(date_from, date_to):
+    date_to = date_to or datetime.date.today()
+    date_from = date_from or date_to - datetime.timedelta(days=ARCHIVE_DEFAULT_DAYS)
+    if date_from > date_to:
+        raise HTTPException(status_code=400, detail="date_from is after date_to")
+    return date_from, date_to
+
+
+@archive_router.get("/api/archive/flights")
+async def get_archived_flights(
+    date_from: Optional[datetime.date] = None,
+    date_to: Optional[datetime.date] = None,
+    airport: Optional[str] = None,
+    flight_no: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(listings.DEFAULT_PAGE_SIZE, ge=1, le=listings.MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db)
+):
+    # every query names an Archive_date range, so MySQL only opens the
+    # partitions of those months
+    try:
+        date_from, date_to = archive_window(date_from, date_to)
+        conditions = ["Archive_date BETWEEN :date_from AND :date_to"]
+        params = {"date_from": date_from, "date_to": date_to, "limit": limit + 1}
+        if airport is not None:
+            conditions.append("Airport_ID = :airport")
+            params["airport"] = airport
+        if flight_no is not None:
+            conditions.append("Flight_no = :flight_no")
+            params["flight_no"] = flight_no
+        if cursor is not None:
+            # the cursor is "<Archive_date>,<Flight_no>" of the last row
+            try:
+                cursor_date, cursor_no = cursor.split(",", 1)
+                params["cursor_date"] = datetime.date.fromisoformat(cursor_date)
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+            params["cursor_no"] = cursor_no
+            conditions.append("(Archive_date > :cursor_date OR (Archive_date = :cursor_date AND Flight_no > :cursor_no))")
+        query = text(f"""
+            SELECT Archive_date, {', '.join(FLIGHT_COLUMNS)}, Completed_at
+            FROM Flight_archive
+            WHERE {' AND '.join(conditions)}
+            ORDER BY Archive_date, Flight_no
+            LIMIT :limit
+        """)
+        rows = (await db.execute(query, params)).fetchall()
+        flights = [dict(row._mapping) for row in rows[:limit]]
+        next_cursor = f"{flights[-1]['Archive_date']},{flights[-1]['Flight_no']}" if len(rows) > limit else None
+        return page_response("flights", flights, next_cursor)
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@archive_router.get("/api/archive/flight/{flight_no}/passengers")
+async def get_archived_passengers(flight_no: str, archive_date: Optional[datetime.date] = None, db: AsyncSession = Depends(get_async_db)):
+    try:
+        if archive_date is None:
+            # the flight number's most recent archived flight
+            archive_date = (await db.execute(
+                text("SELECT MAX(Archive_date) FROM Flight_archive WHERE Flight_no = :flight_no"), {"flight_no": flight_no}
+            )).scalar()
+            if archive_date is None:
+                raise HTTPException(status_code=404, detail="Flight not found in the archive")
+        query = text("""
+            SELECT p.Passenger_ID, p.Passenger_name, p.Passenger_status,
+                   b.Baggage_ID, b.Baggae_weight, t.Ticket_no
+            FROM Passenger_archive p
+            LEFT JOIN Baggage_archive b ON b.Archive_date = p.Archive_date AND b.Passenger_ID = p.Passenger_ID
+            LEFT JOIN Ticket_archive t ON t.Archive_date = p.Archive_date AND t.Passenger_ID = p.Passenger_ID
+            WHERE p.Archive_date = :archive_date AND p.Flight_no = :flight_no
+            ORDER BY p.Passenger_ID, b.Baggage_ID, t.Ticket_no
+        """)
+        rows = (await db.execute(query, {"archive_date": archive_date, "flight_no": flight_no})).fetchall()
+
+        # first bag and ticket per passenger, as the live passenger list does
+        passenger_list = []
+        seen = set()
+        for p in rows:
+            if p.Passenger_ID in seen:
+                continue
+            seen.add(p.Passenger_ID)
+            passenger_list.append({
+                "Passenger_ID": p.Passenger_ID,
+                "Passenger_name": p.Passenger_name,
+                "Passenger_status": p.Passenger_status or "Normal",
+                "baggage_weight": p.Baggae_weight,
+                "baggage_id": p.Baggage_ID,
+                "ticket_id": p.Ticket_no,
+            })
+        return {"flight_no": flight_no, "archive_date": str(archive_date), "passengers": passenger_list}
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
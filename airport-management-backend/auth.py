@@ -1,23 +1,207 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from database import get_db
-import models
+import os
+import secrets
+import threading
+import time
+import uuid
+
+from fastapi import APIRouter, Body, Depends, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from jose import JWTError, jwt
+from sqlalchemy import bindparam, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import changes
+from database import get_async_db
+from passwords import HashPoolBusy, hash_pool
+
+
+AUTH_SECRET_KEY = os.getenv("AUTH_SECRET_KEY")
+if not AUTH_SECRET_KEY:
+    # tokens signed with a per-process key stop working on restart and are
+    # not accepted by other workers
+    print("AUTH_SECRET_KEY is not set; using a random key for this process")
+    AUTH_SECRET_KEY = secrets.token_urlsafe(32)
+AUTH_ALGORITHM = "HS256"
+AUTH_TOKEN_TTL = int(os.getenv("AUTH_TOKEN_TTL", "900"))
+AUTH_SESSION_CACHE_SIZE = int(os.getenv("AUTH_SESSION_CACHE_SIZE", "10000"))
+
+SIGNIN_ROLES = ("Airport Head of Staff", "Security")
+
+# every employee with the name and a signin role; the password is checked
+# against each hash in Python
+SIGNIN_QUERY = text("""
+    SELECT Employee_ID, Employee_name, Job_title, Airport_ID, pwd
+    FROM Employee
+    WHERE F_Name = :first_name
+      AND Job_title IN :roles
+""").bindparams(bindparam("roles", expanding=True))
+SESSION_QUERY = text("""
+    SELECT Employee_ID, Employee_name, Job_title, Airport_ID
+    FROM Employee
+    WHERE Employee_ID = :id AND Job_title IN :roles
+""").bindparams(bindparam("roles", expanding=True))
 
 auth_router = APIRouter()
+bearer = HTTPBearer(auto_error=False)
 
-@auth_router.post("/signin")
-def signin(first_name: str, password: str, db: Session = Depends(get_db)):
-    employee = db.query(models.Employee).filter(
-        models.Employee.F_Name == first_name,
-        models.Employee.pwd == password,
-        models.Employee.Job_title == "Airport Head of Staff"
-    ).first()
-    if not employee:
-        raise HTTPException(status_code=401, detail="Invalid credentials")
+
+class SessionCache:
+    def __init__(self, max_entries=AUTH_SESSION_CACHE_SIZE):
+        self.max_entries = max_entries
+        # token -> (employee, expires_at)
+        self._sessions = {}
+        # token id -> expires_at, for tokens signed out before they expire
+        self._revoked = {}
+        self._lock = threading.Lock()
+
+    def get(self, token):
+        with self._lock:
+            entry = self._sessions.get(token)
+            if entry is None:
+                return None
+            if entry[1] <= time.time():
+                del self._sessions[token]
+                return None
+            return entry[0]
+
+    def put(self, token, employee, expires_at):
+        with self._lock:
+            if len(self._sessions) >= self.max_entries:
+                self._purge()
+            if len(self._sessions) < self.max_entries:
+                self._sessions[token] = (employee, expires_at)
+
+    def revoke(self, token, token_id, expires_at):
+        with self._lock:
+            self._sessions.pop(token, None)
+            self._revoked[token_id] = expires_at
+
+    def is_revoked(self, token_id):
+        with self._lock:
+            return token_id in self._revoked
+
+    def clear(self):
+        # employees changed; cached sessions are checked against the table again
+        with self._lock:
+            self._sessions.clear()
+
+    def _purge(self):
+        now = time.time()
+        self._sessions = {token: entry for token, entry in self._sessions.items() if entry[1] > now}
+        self._revoked = {token_id: expires_at for token_id, expires_at in self._revoked.items() if expires_at > now}
+
+
+session_cache = SessionCache()
+changes.on_tables_changed(lambda tables: session_cache.clear() if "Employee" in tables else None)
+
+
+def employee_info(row):
     return {
-        "Employee_ID": employee.Employee_ID,
-        "Employee_name": employee.Employee_name,
-        "Age": None,  
-        "Job_title": employee.Job_title,
-        "Airport_ID": employee.Airport_ID
+        "Employee_ID": row.Employee_ID,
+        "Employee_name": row.Employee_name,
+        "Job_title": row.Job_title,
+        "Airport_ID": row.Airport_ID,
     }
+
+
+def issue_token(employee):
+    now = int(time.time())
+    expires_at = now + AUTH_TOKEN_TTL
+    claims = {
+        "sub": str(employee["Employee_ID"]),
+        "jti": uuid.uuid4().hex,
+        "iat": now,
+        "exp": expires_at,
+    }
+    token = jwt.encode(claims, AUTH_SECRET_KEY, algorithm=AUTH_ALGORITHM)
+    session_cache.put(token, employee, expires_at)
+    return token
+
+
+def decode_token(token):
+    try:
+        return jwt.decode(token, AUTH_SECRET_KEY, algorithms=[AUTH_ALGORITHM])
+    except JWTError:
+        raise HTTPException(status_code=401, detail="Invalid or expired session", headers={"WWW-Authenticate": "Bearer"})
+
+
+async def current_employee(
+    credentials: HTTPAuthorizationCredentials = Depends(bearer),
+    db: AsyncSession = Depends(get_async_db)
+):
+    if credentials is None:
+        raise HTTPException(status_code=401, detail="Not signed in", headers={"WWW-Authenticate": "Bearer"})
+    token = credentials.credentials
+    employee = session_cache.get(token)
+    if employee is not None:
+        return employee
+
+    claims = decode_token(token)
+    if session_cache.is_revoked(claims["jti"]):
+        raise HTTPException(status_code=401, detail="Invalid or expired session", headers={"WWW-Authenticate": "Bearer"})
+    row = (await db.execute(SESSION_QUERY, {"id": int(claims["sub"]), "roles": SIGNIN_ROLES})).fetchone()
+    if not row:
+        raise HTTPException(status_code=401, detail="Invalid or expired session", headers={"WWW-Authenticate": "Bearer"})
+    employee = employee_info(row)
+    session_cache.put(token, employee, claims["exp"])
+    return employee
+
+
+@auth_router.post("/signin")
+async def signin(
+    first_name: str = Body(..., embed=True),
+    password: str = Body(..., embed=True),
+    db: AsyncSession = Depends(get_async_db)
+):
+    try:
+        rows = (await db.execute(SIGNIN_QUERY, {"first_name": first_name, "roles": SIGNIN_ROLES})).fetchall()
+
+        employee = None
+        new_hash = None
+        if not rows:
+            # an unknown name costs as much as a wrong password
+            await hash_pool.verify(password, None)
+        for row in rows:
+            matched, new_hash = await hash_pool.verify(password, row.pwd)
+            if matched:
+                employee = row
+                break
+        if not employee:
+            raise HTTPException(status_code=401, detail="Invalid credentials")
+
+        if new_hash:
+            await db.execute(
+                text("UPDATE Employee SET pwd = :pwd WHERE Employee_ID = :id"),
+                {"pwd": new_hash, "id": employee.Employee_ID}
+            )
+            await db.commit()
+
+        info = employee_info(employee)
+        return {
+            **info,
+            "access_token": issue_token(info),
+            "token_type": "bearer",
+            "expires_in": AUTH_TOKEN_TTL,
+        }
+    except HTTPException:
+        raise
+    except HashPoolBusy:
+        raise HTTPException(status_code=503, detail="Too many sign-ins in progress, try again", headers={"Retry-After": "1"})
+    except Exception as e:
+        print(f"Error in signin: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+@auth_router.post("/signout")
+async def signout(
+    credentials: HTTPAuthorizationCredentials = Depends(bearer),
+    employee: dict = Depends(current_employee)
+):
+    claims = decode_token(credentials.credentials)
+    session_cache.revoke(credentials.credentials, claims["jti"], claims["exp"])
+    return {"message": "Signed out"}
+
+
+@auth_router.get("/api/session")
+async def get_session(employee: dict = Depends(current_employee)):
+    return employee
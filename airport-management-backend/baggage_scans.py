@@ -0,0 +1,330 @@
+import asyncio
+import datetime
+import os
+import threading
+import time
+from collections import deque
+from decimal import Decimal
+from typing import List, Optional
+
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel, Field
+from sqlalchemy import bindparam, text
+from starlette.concurrency import run_in_threadpool
+
+import changes
+from database import SessionLocal
+from report_counters import report_counters, PassengerDelta
+
+
+# scans waiting to be written; past this POST /api/baggage/scans answers 503
+BAGGAGE_QUEUE_SIZE = int(os.getenv("BAGGAGE_QUEUE_SIZE", "100000"))
+# distinct bags written per transaction
+BAGGAGE_BATCH_SIZE = int(os.getenv("BAGGAGE_BATCH_SIZE", "2000"))
+# how long a batch waits to fill before it is written anyway
+BAGGAGE_FLUSH_MS = int(os.getenv("BAGGAGE_FLUSH_MS", "200"))
+# the largest weight Baggage.Baggae_weight (DECIMAL(10,2)) holds
+MAX_WEIGHT = 99999999.99
+# end-to-end lags kept for the status endpoint
+LAG_SAMPLES = 10_000
+
+# a passenger flagged for overweight baggage is cleared once none of their
+# bags weighs this much
+WEIGHT_LIMIT = 33
+OVERWEIGHT_STATUS = "baggage overweight"
+NORMAL_STATUS = "Normal"
+
+SELECT_BAGS = text("""
+    SELECT Baggage_ID, Passenger_ID, Baggae_weight, Last_scanned_at FROM Baggage WHERE Baggage_ID IN :bags
+""").bindparams(bindparam("bags", expanding=True))
+# a scan older than the one already stored is skipped; scans without a time
+# always apply
+UPDATE_BAG = text("""
+    UPDATE Baggage
+    SET Baggage_status = :status, Baggae_weight = COALESCE(:weight, Baggae_weight),
+        Last_scanned_at = COALESCE(:scanned_at, Last_scanned_at)
+    WHERE Baggage_ID = :bag AND (:scanned_at IS NULL OR Last_scanned_at IS NULL OR Last_scanned_at <= :scanned_at)
+""")
+# the weight rule for the whole batch: flagged passengers none of whose
+# bags is over the limit any more
+SELECT_CLEARED = text("""
+    SELECT p.Passenger_ID FROM Passenger p
+    WHERE p.Passenger_ID IN :passengers AND p.Passenger_status = :overweight
+      AND NOT EXISTS (SELECT 1 FROM Baggage b WHERE b.Passenger_ID = p.Passenger_ID AND b.Baggae_weight >= :limit)
+""").bindparams(bindparam("passengers", expanding=True))
+CLEAR_PASSENGERS = text("""
+    UPDATE Passenger SET Passenger_status = :normal WHERE Passenger_ID IN :passengers
+""").bindparams(bindparam("passengers", expanding=True))
+
+scans_router = APIRouter()
+
+
+class BaggageScan(BaseModel):
+    Baggage_ID: int
+    Baggage_status: str = Field(..., min_length=1, max_length=50)
+    Baggae_weight: Optional[float] = Field(None, ge=0, le=MAX_WEIGHT)
+    # when the scanner read the tag; orders scans of one bag that arrive
+    # out of order, within a batch and against the stored scan
+    scanned_at: Optional[datetime.datetime] = None
+
+
+class Pending:
+    __slots__ = ("status", "weight", "scanned_at", "received")
+
+    def __init__(self, status, weight, scanned_at, received):
+        self.status = status
+        self.weight = weight
+        self.scanned_at = scanned_at
+        self.received = received
+
+
+def naive_utc(value):
+    # Last_scanned_at is stored as UTC without a zone
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def as_datetime(value):
+    # SQLite hands DATETIME back as text
+    if isinstance(value, str):
+        return datetime.datetime.fromisoformat(value)
+    return value
+
+
+def merge(batch, bag_id, scan):
+    # the latest scan of a bag wins; a weight from an earlier scan is kept
+    # when the latest one has none
+    current = batch.get(bag_id)
+    if current is None:
+        batch[bag_id] = scan
+        return False
+    if current.scanned_at is None or scan.scanned_at is None or scan.scanned_at >= current.scanned_at:
+        current.status = scan.status
+        current.weight = scan.weight if scan.weight is not None else current.weight
+        current.scanned_at = scan.scanned_at or current.scanned_at
+    elif current.weight is None:
+        current.weight = scan.weight
+    current.received.extend(scan.received)
+    return True
+
+
+class ScanIngestor:
+    def __init__(self):
+        self.queue = asyncio.Queue(maxsize=BAGGAGE_QUEUE_SIZE)
+        self.task = None
+        self._lock = threading.Lock()
+        self.received = 0
+        self.coalesced = 0
+        self.scans_written = 0
+        self.bags_written = 0
+        self.unknown_bags = 0
+        self.rejected_scans = 0
+        self.stale_scans = 0
+        self.passengers_cleared = 0
+        self.batches = 0
+        self.failed_batches = 0
+        self.last_batch = None
+        self._lags = deque(maxlen=LAG_SAMPLES)
+
+    def submit(self, scans: List[BaggageScan]):
+        # all or nothing, so a scanner that gets a 503 can resend the lot
+        if self.queue.qsize() + len(scans) > self.queue.maxsize:
+            return False
+        received = time.monotonic()
+        for scan in scans:
+            self.queue.put_nowait((
+                scan.Baggage_ID, Pending(scan.Baggage_status, scan.Baggae_weight, naive_utc(scan.scanned_at), [received])
+            ))
+        self.received += len(scans)
+        return True
+
+    def _drain(self, batch):
+        while len(batch) < BAGGAGE_BATCH_SIZE:
+            try:
+                bag_id, scan = self.queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            if merge(batch, bag_id, scan):
+                self.coalesced += 1
+
+    async def run(self):
+        # one batch at a time: scans arriving while a batch is written wait
+        # in the queue and are coalesced into the next one
+        batch = {}
+        try:
+            while True:
+                if not batch:
+                    bag_id, scan = await self.queue.get()
+                    batch[bag_id] = scan
+                deadline = time.monotonic() + BAGGAGE_FLUSH_MS / 1000
+                self._drain(batch)
+                while len(batch) < BAGGAGE_BATCH_SIZE and time.monotonic() < deadline:
+                    await asyncio.sleep(min(0.01, max(0.0, deadline - time.monotonic())))
+                    self._drain(batch)
+                try:
+                    await run_in_threadpool(self.flush, batch)
+                    batch = {}
+                except Exception as e:
+                    self.failed_batches += 1
+                    print(f"Error writing baggage scans: {e}")
+                    try:
+                        await run_in_threadpool(self.flush_each, batch)
+                        batch = {}
+                    except Exception:
+                        # the database is down; keep the batch, newer scans
+                        # merge into it and it is written on the next round
+                        await asyncio.sleep(BAGGAGE_FLUSH_MS / 1000)
+        except asyncio.CancelledError:
+            # write what is already buffered before shutting down
+            while batch or not self.queue.empty():
+                self._drain(batch)
+                try:
+                    await run_in_threadpool(self.flush, batch)
+                except Exception as e:
+                    print(f"Error writing baggage scans: {e}")
+                    break
+                batch = {}
+            raise
+
+    def flush(self, batch):
+        if not batch:
+            return
+        started = time.monotonic()
+        db = SessionLocal()
+        try:
+            stored = {row[0]: row for row in db.execute(SELECT_BAGS, {"bags": list(batch)}).fetchall()}
+            # bags whose stored scan is newer than the batch's are left alone
+            stale = [
+                bag_id for bag_id in batch if bag_id in stored and batch[bag_id].scanned_at is not None
+                and stored[bag_id][3] is not None and as_datetime(stored[bag_id][3]) > batch[bag_id].scanned_at
+            ]
+            known = [bag_id for bag_id in batch if bag_id in stored and bag_id not in stale]
+            if known:
+                db.execute(UPDATE_BAG, [{
+                    "bag": bag_id, "status": batch[bag_id].status, "weight": batch[bag_id].weight,
+                    "scanned_at": batch[bag_id].scanned_at
+                } for bag_id in known])
+            cleared = []
+            passengers = sorted({stored[bag_id][1] for bag_id in known})
+            if passengers:
+                cleared = [row[0] for row in db.execute(SELECT_CLEARED, {
+                    "passengers": passengers, "overweight": OVERWEIGHT_STATUS, "limit": WEIGHT_LIMIT
+                }).fetchall()]
+            if cleared:
+                db.execute(CLEAR_PASSENGERS, {"normal": NORMAL_STATUS, "passengers": cleared})
+            # re-weighed bags move the baggage totals of the traffic report
+            reweighed = sum(
+                (Decimal(str(batch[bag_id].weight)) - Decimal(str(stored[bag_id][2] or 0))
+                 for bag_id in known if batch[bag_id].weight is not None),
+                Decimal(0)
+            )
+            with report_counters.writing():
+                db.commit()
+                if reweighed:
+                    report_counters.passengers_added(PassengerDelta(baggage_weight=reweighed))
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        committed = time.monotonic()
+
+        if known:
+            changes.tables_changed("Baggage", *(["Passenger"] if cleared else []))
+            changes.rows_changed("Baggage", "update", [{
+                "Baggage_ID": bag_id,
+                "Passenger_ID": stored[bag_id][1],
+                "Baggage_status": batch[bag_id].status,
+                "Baggae_weight": batch[bag_id].weight if batch[bag_id].weight is not None else stored[bag_id][2]
+            } for bag_id in known])
+        if cleared:
+            changes.rows_changed("Passenger", "update", [
+                {"Passenger_ID": passenger_id, "Passenger_status": NORMAL_STATUS} for passenger_id in cleared
+            ])
+
+        scans = sum(len(scan.received) for scan in batch.values())
+        with self._lock:
+            self.batches += 1
+            self.scans_written += scans
+            self.bags_written += len(known)
+            self.unknown_bags += len(batch) - len(known) - len(stale)
+            self.stale_scans += sum(len(batch[bag_id].received) for bag_id in stale)
+            self.passengers_cleared += len(cleared)
+            self._lags.extend((committed - received) * 1000 for scan in batch.values() for received in scan.received)
+            self.last_batch = {
+                "bags": len(batch),
+                "scans": scans,
+                "write_ms": round((committed - started) * 1000, 2)
+            }
+
+    def flush_each(self, batch):
+        # after a failed batch: write it a bag at a time and drop the bags
+        # the database rejects, so one bad scan cannot hold up the rest
+        rejected = {}
+        for bag_id, scan in batch.items():
+            try:
+                self.flush({bag_id: scan})
+            except Exception as e:
+                print(f"Error writing baggage scan for bag {bag_id}: {e}")
+                rejected[bag_id] = scan
+        if len(rejected) == len(batch):
+            # every bag failed: drop them only if the database is up
+            db = SessionLocal()
+            try:
+                db.execute(text("SELECT 1"))
+            finally:
+                db.close()
+        with self._lock:
+            self.rejected_scans += sum(len(scan.received) for scan in rejected.values())
+
+    def start(self):
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self.task is None:
+            return
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+        self.task = None
+
+    def stats(self):
+        with self._lock:
+            lags = sorted(self._lags)
+            return {
+                "queued": self.queue.qsize(),
+                "received": self.received,
+                "coalesced": self.coalesced,
+                "scans_written": self.scans_written,
+                "bags_written": self.bags_written,
+                "unknown_bags": self.unknown_bags,
+                "rejected_scans": self.rejected_scans,
+                "stale_scans": self.stale_scans,
+                "passengers_cleared": self.passengers_cleared,
+                "batches": self.batches,
+                "failed_batches": self.failed_batches,
+                "last_batch": self.last_batch,
+                "lag_ms": {
+                    "p50": round(lags[len(lags) // 2], 2),
+                    "p99": round(lags[min(len(lags) - 1, int(len(lags) * 0.99))], 2),
+                    "max": round(lags[-1], 2)
+                } if lags else None
+            }
+
+
+scan_ingestor = ScanIngestor()
+
+
+@scans_router.post("/api/baggage/scans", status_code=202)
+async def ingest_scans(scans: List[BaggageScan]):
+    if not scan_ingestor.submit(scans):
+        raise HTTPException(status_code=503, detail="Too many baggage scans waiting, try again", headers={"Retry-After": "1"})
+    return {"accepted": len(scans), "queued": scan_ingestor.queue.qsize()}
+
+
+@scans_router.get("/api/baggage/scans/status")
+async def get_scan_status():
+    return scan_ingestor.stats()
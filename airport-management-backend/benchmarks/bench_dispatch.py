@@ -0,0 +1,89 @@
+# Times a full rebalance of the ground operations queue in dispatch.py
+# (every open medical and engineer job planned against all staff) against
+# picking each job's staff member by scanning the whole pool.
+#
+#   python benchmarks/bench_dispatch.py
+#   python benchmarks/bench_dispatch.py --jobs 200 2000 --staff-ratio 0.5
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import dispatch
+from gate_schedule import MINUTES_PER_DAY, format_minute
+
+JOBS = [100, 1_000, 10_000]
+AIRPORTS = ["BLR", "HYD", "DEL", "BOM"]
+TERMINALS = [1, 2, 3]
+
+
+def synthetic_queue(job_count, staff_count, rng):
+    jobs = []
+    for i in range(job_count):
+        kind = dispatch.MEDICAL if rng.random() < 0.3 else dispatch.ENGINEER
+        key = i if kind == dispatch.MEDICAL else f"BF{i:07d}"
+        jobs.append(dispatch.Job(
+            kind, key, None, f"BF{i:07d}", rng.choice(AIRPORTS), rng.choice(TERMINALS),
+            f"{format_minute(rng.randrange(MINUTES_PER_DAY))}:00"
+        ))
+    staff = [
+        dispatch.StaffMember(
+            100_000 + i, None, dispatch.MEDICAL if i % 3 == 0 else dispatch.ENGINEER, rng.choice(AIRPORTS),
+            rng.randrange(3), rng.choice(TERMINALS + [None])
+        )
+        for i in range(staff_count)
+    ]
+    return jobs, staff
+
+
+def plan_by_scan(jobs, staff):
+    loads = {member.Employee_ID: [member.load, member.Terminal] for member in staff}
+    plan = []
+    for job in sorted(jobs, key=dispatch.job_order):
+        best = None
+        for member in staff:
+            if member.kind != job.kind or member.Airport_ID != job.Airport_ID:
+                continue
+            load, terminal = loads[member.Employee_ID]
+            candidate = (load, dispatch.terminal_distance(terminal, job.Terminal), member.Employee_ID)
+            if best is None or candidate < best:
+                best = candidate
+        if best is None:
+            plan.append((job, None))
+            continue
+        loads[best[2]] = [best[0] + 1, job.Terminal]
+        plan.append((job, best[2]))
+    return plan
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--jobs", type=int, nargs="+", default=JOBS)
+    # staff on duty per open job
+    parser.add_argument("--staff-ratio", type=float, default=0.25)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'jobs':>8} {'staff':>7} {'scan (ms)':>10} {'rebalance (ms)':>15} {'speedup':>9}")
+    for job_count in args.jobs:
+        staff_count = max(1, int(job_count * args.staff_ratio))
+        jobs, staff = synthetic_queue(job_count, staff_count, random.Random(job_count))
+        planned = [employee_id for _, employee_id in dispatch.plan_dispatch(jobs, staff)]
+        assert planned == [employee_id for _, employee_id in plan_by_scan(jobs, staff)]
+
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            dispatch.plan_dispatch(jobs, staff)
+        rebalance_ms = (time.perf_counter() - start) / args.repeat * 1000
+        # the scan is quadratic, so it runs once
+        start = time.perf_counter()
+        plan_by_scan(jobs, staff)
+        scan_ms = (time.perf_counter() - start) * 1000
+        print(f"{job_count:>8} {staff_count:>7} {scan_ms:>10.1f} {rebalance_ms:>15.2f} {scan_ms / rebalance_ms:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+# Times gate conflict checks on the sorted per-gate timelines in
+# gate_schedule.py against a linear scan of the same gate's flights, at
+# hub-sized daily schedules.
+#
+#   python benchmarks/bench_gate_conflicts.py
+#   python benchmarks/bench_gate_conflicts.py --movements 2000 20000 --gates 150
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from gate_schedule import GATE_OCCUPANCY_MINUTES, MINUTES_PER_DAY, GateTimeline
+
+MOVEMENTS = [1_000, 5_000, 20_000]
+
+
+def linear_overlapping(starts, start, window):
+    found = []
+    for other_start, flight_no in starts:
+        distance = abs(start - other_start)
+        if min(distance, MINUTES_PER_DAY - distance) < window:
+            found.append((other_start, flight_no))
+    return found
+
+
+def per_call_us(fn, probes):
+    start = time.perf_counter()
+    for probe in probes:
+        fn(probe)
+    return (time.perf_counter() - start) / len(probes) * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--movements", type=int, nargs="+", default=MOVEMENTS)
+    parser.add_argument("--gates", type=int, default=120)
+    parser.add_argument("--probes", type=int, default=20_000)
+    args = parser.parse_args()
+
+    window = GATE_OCCUPANCY_MINUTES
+    print(f"{'movements':>10} {'gates':>6} {'linear (us)':>12} {'timeline (us)':>14} {'free gate (us)':>15} {'conflicts':>10}")
+    for movements in args.movements:
+        rng = random.Random(movements)
+        timelines = [GateTimeline(window) for _ in range(args.gates)]
+        for i in range(movements):
+            rng.choice(timelines).add(rng.randrange(MINUTES_PER_DAY), f"BF{i:07d}")
+        probes = [(rng.randrange(args.gates), rng.randrange(MINUTES_PER_DAY)) for _ in range(args.probes)]
+
+        conflicts = 0
+        for gate, start in probes[:1000]:
+            expected = sorted(linear_overlapping(timelines[gate].starts, start, window))
+            found = sorted(timelines[gate].overlapping(start))
+            assert expected == found
+            conflicts += bool(found)
+
+        linear_us = per_call_us(lambda probe: linear_overlapping(timelines[probe[0]].starts, probe[1], window), probes)
+        timeline_us = per_call_us(lambda probe: timelines[probe[0]].overlapping(probe[1]), probes)
+        # proposing gates checks every gate at the airport
+        free_us = per_call_us(
+            lambda probe: [gate for gate, timeline in enumerate(timelines) if not timeline.overlapping(probe[1])],
+            probes[:1000]
+        )
+        print(f"{movements:>10} {args.gates:>6} {linear_us:>12.2f} {timeline_us:>14.2f} {free_us:>15.1f} {conflicts / 10:>9.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# CPU time to turn one large flight schedule page into a response body:
+# FastAPI's default path (jsonable_encoder, then json.dumps) against the
+# orjson response in responses.py, with row dicts and with columnar rows.
+#
+#   python benchmarks/bench_serialization.py
+#   python benchmarks/bench_serialization.py --rows 5000 50000 --repeat 10
+import argparse
+import datetime
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+import listings
+from datagen import AIRLINES, CITIES
+from responses import FastJSONResponse
+
+ROWS = [5_000, 50_000]
+
+
+def schedule_rows(count, rng):
+    # shaped like the rows the Flight query returns, TIME values included
+    rows = []
+    for i in range(count):
+        airline_id, airline_name = rng.choice(AIRLINES)
+        rows.append((
+            f"BF{i:07d}", airline_name, rng.choice(["Arrival", "Departure"]),
+            datetime.time(rng.randrange(24), rng.randrange(60)), rng.choice(["BLR", "HYD", "DEL"]),
+            airline_id, f"G{rng.randrange(1, 40):02d}", rng.randrange(1, 4), rng.choice(CITIES), rng.choice(CITIES)
+        ))
+    return rows
+
+
+def default_path(rows, field_names):
+    items, next_cursor = listings.page_from_rows(listings.FLIGHT_SCHEDULE, field_names, rows, len(rows))
+    return JSONResponse(jsonable_encoder({"flights": items, "next_cursor": next_cursor})).body
+
+
+def fast_path(rows, field_names):
+    items, next_cursor = listings.page_from_rows(listings.FLIGHT_SCHEDULE, field_names, rows, len(rows))
+    return FastJSONResponse({"flights": items, "next_cursor": next_cursor}).body
+
+
+def columnar_path(rows, field_names):
+    items, next_cursor = listings.page_from_rows(listings.FLIGHT_SCHEDULE, field_names, rows, len(rows), columnar=True)
+    return FastJSONResponse({"flights": items, "next_cursor": next_cursor, "columns": field_names}).body
+
+
+def cpu_ms(fn, repeat):
+    start = time.process_time()
+    for _ in range(repeat):
+        body = fn()
+    return (time.process_time() - start) / repeat * 1000, len(body)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=ROWS)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    field_names = listings.FLIGHT_SCHEDULE.select_fields()
+    paths = [("default", default_path), ("orjson", fast_path), ("columnar", columnar_path)]
+    print(f"{'rows':>8} {'path':>9} {'cpu (ms)':>9} {'body (KB)':>10} {'speedup':>9}")
+    for count in args.rows:
+        rows = schedule_rows(count, random.Random(count))
+        assert json.loads(default_path(rows[:100], field_names)) == json.loads(fast_path(rows[:100], field_names))
+        baseline = None
+        for name, path in paths:
+            elapsed, size = cpu_ms(lambda: path(rows, field_names), args.repeat)
+            baseline = baseline or elapsed
+            print(f"{count:>8} {name:>9} {elapsed:>9.1f} {size / 1024:>10.0f} {baseline / elapsed:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,371 @@
+import csv
+import io
+import json
+import os
+from contextlib import nullcontext
+from typing import List, Union
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import bindparam, text
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+import changes
+import revenue
+from database import get_db
+from gate_schedule import gate_schedule
+from passwords import hash_pool
+from report_counters import (
+    report_counters, bind_lists, capture_employees, capture_passengers, PassengerDelta, PASSENGERS_SCOPE, FLIGHTS_SCOPE
+)
+from schemas import EmployeeSchema, FlightSchema, PassengerSchema, TicketSchema
+
+
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "1000"))
+
+bulk_router = APIRouter()
+
+
+class BulkDelete(BaseModel):
+    keys: List[Union[int, str]]
+
+
+class BulkTable:
+    def __init__(
+        self, table, key, key_type, schema, changed_on_delete,
+        prepare_rows=None, check_rows=None, lock=None, before_commit=None, after_insert=None, capture_delete=None
+    ):
+        self.table = table
+        self.key = key
+        self.key_type = key_type
+        self.schema = schema
+        self.columns = list(schema.model_fields)
+        # tables touched by a delete, including FK cascades
+        self.changed_on_delete = changed_on_delete
+        self.prepare_rows = prepare_rows
+        # check_rows(valid rows, options) -> (rows to insert, errors)
+        self.check_rows = check_rows
+        # held from check_rows until the inserted rows are published
+        self.lock = lock
+        # runs in the insert's transaction, for writes that must commit with it
+        self.before_commit = before_commit
+        self.after_insert = after_insert
+        self.capture_delete = capture_delete
+
+        self.insert_query = text(
+            f"INSERT INTO {table} ({', '.join(self.columns)}) "
+            f"VALUES ({', '.join(':' + column for column in self.columns)})"
+        )
+        self.existing_query = text(f"SELECT {key} FROM {table} WHERE {key} IN :keys").bindparams(bindparam("keys", expanding=True))
+        self.delete_query = text(f"DELETE FROM {table} WHERE {key} IN :keys").bindparams(bindparam("keys", expanding=True))
+
+
+def hash_employee_passwords(rows):
+    with_pwd = [row for row in rows if row.get("pwd")]
+    for row, hashed in zip(with_pwd, hash_pool.hash_many([row["pwd"] for row in with_pwd])):
+        row["pwd"] = hashed
+
+
+def employees_inserted(rows):
+    report_counters.employees_added([(row["Job_title"], row["Employee_Salary"]) for row in rows])
+
+
+def capture_employee_delete(db, keys):
+    removed = capture_employees(db, "Employee_ID IN :ids", {"ids": keys})
+    return lambda: report_counters.employees_removed(removed)
+
+
+def passengers_inserted(rows):
+    report_counters.passengers_added(PassengerDelta(passengers=len(rows)))
+
+
+def capture_passenger_delete(db, keys):
+    removed = capture_passengers(db, PASSENGERS_SCOPE, keys)
+    revenue.tickets_removed(db, PASSENGERS_SCOPE["dependents"], {"key": keys})
+    return lambda: report_counters.passengers_removed(removed)
+
+
+def capture_flight_delete(db, keys):
+    removed = capture_passengers(db, FLIGHTS_SCOPE, keys)
+    revenue.tickets_removed(db, FLIGHTS_SCOPE["dependents"], {"key": keys})
+    return lambda: report_counters.passengers_removed(removed)
+
+
+def default_ticket_class(rows):
+    # an explicit null would bypass the column default
+    for row in rows:
+        row["Class"] = row.get("Class") or revenue.DEFAULT_CLASS
+
+
+def tickets_inserted(rows):
+    classes = {}
+    for row in rows:
+        classes[row["Class"]] = classes.get(row["Class"], 0) + 1
+    report_counters.passengers_added(PassengerDelta(ticket_classes=classes))
+
+
+def capture_ticket_delete(db, keys):
+    classes = dict(db.execute(bind_lists(
+        "SELECT Class, COUNT(*) FROM Ticket WHERE Ticket_no IN :keys GROUP BY Class", {"keys": keys}
+    ), {"keys": keys}).fetchall())
+    revenue.tickets_removed(db, "Ticket_no IN :key", {"key": keys})
+    return lambda: report_counters.passengers_removed(PassengerDelta(ticket_classes=classes))
+
+
+def check_gates(valid, options):
+    # the check add_flight makes, per row; a row clashing with the schedule
+    # or an earlier row of the upload is rejected unless allow_conflict is set
+    if options.get("allow_conflict"):
+        return valid, []
+    if not gate_schedule.loaded:
+        gate_schedule.load()
+    kept = []
+    errors = []
+    for (number, row), conflicts in zip(valid, gate_schedule.batch_conflicts([row for _, row in valid])):
+        if conflicts:
+            errors.append({
+                "row": number,
+                "errors": ["Gate is already in use at that time: " + ", ".join(
+                    f"{conflict['Flight_no']} at {conflict['arrival_time']}" for conflict in conflicts
+                )]
+            })
+        else:
+            kept.append((number, row))
+    return kept, errors
+
+
+FLIGHTS = BulkTable(
+    "Flight", "Flight_no", str, FlightSchema,
+    ("Flight", "Passenger", "Ticket", "Baggage"),
+    check_rows=check_gates, lock=gate_schedule.lock, capture_delete=capture_flight_delete
+)
+EMPLOYEES = BulkTable(
+    "Employee", "Employee_ID", int, EmployeeSchema,
+    ("Employee", "Crew"),
+    prepare_rows=hash_employee_passwords, after_insert=employees_inserted, capture_delete=capture_employee_delete
+)
+PASSENGERS = BulkTable(
+    "Passenger", "Passenger_ID", int, PassengerSchema,
+    ("Passenger", "Ticket", "Baggage"),
+    after_insert=passengers_inserted, capture_delete=capture_passenger_delete
+)
+TICKETS = BulkTable(
+    "Ticket", "Ticket_no", str, TicketSchema,
+    ("Ticket",),
+    prepare_rows=default_ticket_class, before_commit=revenue.tickets_added,
+    after_insert=tickets_inserted, capture_delete=capture_ticket_delete
+)
+
+
+def detect_format(content_type, filename=""):
+    if filename.endswith(".csv") or "csv" in content_type:
+        return "csv"
+    if filename.endswith((".ndjson", ".jsonl")) or "ndjson" in content_type:
+        return "ndjson"
+    return "json"
+
+
+def parse_rows(data, fmt):
+    # returns (row number, dict) pairs; a row that cannot be parsed carries
+    # its error message instead of a dict
+    if fmt == "csv":
+        reader = csv.DictReader(io.StringIO(data))
+        return [
+            (number, {column: (value if value != "" else None) for column, value in row.items()})
+            for number, row in enumerate(reader, start=1)
+        ]
+    if fmt == "ndjson":
+        rows = []
+        for number, line in enumerate((line for line in data.splitlines() if line.strip()), start=1):
+            try:
+                rows.append((number, json.loads(line)))
+            except ValueError as e:
+                rows.append((number, f"Invalid JSON: {e}"))
+        return rows
+    try:
+        payload = json.loads(data)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid JSON: {e}")
+    if not isinstance(payload, list):
+        raise HTTPException(status_code=400, detail="Expected a JSON array of rows")
+    return list(enumerate(payload, start=1))
+
+
+async def read_rows(request: Request):
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("multipart/form-data"):
+        form = await request.form()
+        upload = form.get("file")
+        if upload is None or isinstance(upload, str):
+            raise HTTPException(status_code=400, detail="Upload the rows in a 'file' field")
+        data = await upload.read()
+        fmt = detect_format(upload.content_type or "", upload.filename or "")
+    else:
+        data = await request.body()
+        fmt = detect_format(content_type)
+    try:
+        return parse_rows(data.decode("utf-8-sig"), fmt)
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Upload must be UTF-8 text")
+
+
+def db_error(e):
+    return str(getattr(e, "orig", None) or e)
+
+
+def validate_rows(bulk_table: BulkTable, rows):
+    valid = []
+    errors = []
+    for number, row in rows:
+        if not isinstance(row, dict):
+            errors.append({"row": number, "errors": [row if isinstance(row, str) else "Expected an object"]})
+            continue
+        try:
+            valid.append((number, bulk_table.schema(**row).model_dump(mode="json")))
+        except ValidationError as e:
+            errors.append({
+                "row": number,
+                "errors": [f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}" for err in e.errors()]
+            })
+    return valid, errors
+
+
+def insert_rows(db: Session, bulk_table: BulkTable, rows, options=None):
+    valid, errors = validate_rows(bulk_table, rows)
+    if bulk_table.prepare_rows:
+        bulk_table.prepare_rows([row for _, row in valid])
+    inserted = 0
+    inserted_rows = []
+    with bulk_table.lock or nullcontext():
+        if bulk_table.check_rows:
+            valid, rejected = bulk_table.check_rows(valid, options or {})
+            errors.extend(rejected)
+        for start in range(0, len(valid), BULK_CHUNK_SIZE):
+            chunk = valid[start:start + BULK_CHUNK_SIZE]
+            # the counters see each chunk's commit and delta together
+            with report_counters.writing():
+                try:
+                    db.execute(bulk_table.insert_query, [row for _, row in chunk])
+                    if bulk_table.before_commit:
+                        bulk_table.before_commit(db, [row for _, row in chunk])
+                    db.commit()
+                    done = chunk
+                except Exception:
+                    # retry the chunk row by row to find out which rows were rejected
+                    db.rollback()
+                    done = []
+                    for number, row in chunk:
+                        try:
+                            db.execute(bulk_table.insert_query, row)
+                            if bulk_table.before_commit:
+                                bulk_table.before_commit(db, [row])
+                            db.commit()
+                            done.append((number, row))
+                        except Exception as e:
+                            db.rollback()
+                            errors.append({"row": number, "errors": [db_error(e)]})
+                inserted += len(done)
+                inserted_rows.extend({column: value for column, value in row.items() if column != "pwd"} for _, row in done)
+                if done and bulk_table.after_insert:
+                    bulk_table.after_insert([row for _, row in done])
+
+        if inserted:
+            changes.tables_changed(bulk_table.table)
+            changes.rows_changed(bulk_table.table, "insert", inserted_rows)
+    errors.sort(key=lambda error: error["row"])
+    return {"received": len(rows), "inserted": inserted, "failed": len(errors), "errors": errors}
+
+
+def delete_rows(db: Session, bulk_table: BulkTable, keys):
+    errors = []
+    typed_keys = []
+    for key in keys:
+        try:
+            typed_keys.append(bulk_table.key_type(key))
+        except (TypeError, ValueError):
+            errors.append({"key": key, "errors": ["Invalid key"]})
+
+    deleted = 0
+    deleted_keys = []
+    for start in range(0, len(typed_keys), BULK_CHUNK_SIZE):
+        chunk = typed_keys[start:start + BULK_CHUNK_SIZE]
+        try:
+            existing = {row[0] for row in db.execute(bulk_table.existing_query, {"keys": chunk}).fetchall()}
+            errors.extend({"key": key, "errors": ["Not found"]} for key in chunk if key not in existing)
+            found = [key for key in chunk if key in existing]
+            if not found:
+                continue
+            apply_counters = bulk_table.capture_delete(db, found) if bulk_table.capture_delete else None
+            db.execute(bulk_table.delete_query, {"keys": found})
+            with report_counters.writing():
+                db.commit()
+                if apply_counters:
+                    apply_counters()
+            deleted += len(found)
+            deleted_keys.extend(found)
+        except Exception as e:
+            db.rollback()
+            errors.extend({"key": key, "errors": [db_error(e)]} for key in chunk)
+
+    if deleted:
+        changes.tables_changed(*bulk_table.changed_on_delete)
+        changes.rows_changed(bulk_table.table, "delete", [{bulk_table.key: key} for key in deleted_keys])
+    return {"received": len(keys), "deleted": deleted, "failed": len(errors), "errors": errors}
+
+
+async def bulk_insert(request: Request, db: Session, bulk_table: BulkTable, **options):
+    rows = await read_rows(request)
+    try:
+        return await run_in_threadpool(insert_rows, db, bulk_table, rows, options)
+    except Exception as e:
+        print(f"Error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+async def bulk_delete(body: BulkDelete, db: Session, bulk_table: BulkTable):
+    try:
+        return await run_in_threadpool(delete_rows, db, bulk_table, body.keys)
+    except Exception as e:
+        print(f"Error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@bulk_router.post("/api/flight-schedule/bulk")
+async def bulk_add_flights(request: Request, allow_conflict: bool = False, db: Session = Depends(get_db)):
+    return await bulk_insert(request, db, FLIGHTS, allow_conflict=allow_conflict)
+
+
+@bulk_router.post("/api/employees/bulk")
+async def bulk_add_employees(request: Request, db: Session = Depends(get_db)):
+    return await bulk_insert(request, db, EMPLOYEES)
+
+
+@bulk_router.post("/api/passengers/bulk")
+async def bulk_add_passengers(request: Request, db: Session = Depends(get_db)):
+    return await bulk_insert(request, db, PASSENGERS)
+
+
+@bulk_router.post("/api/tickets/bulk")
+async def bulk_add_tickets(request: Request, db: Session = Depends(get_db)):
+    return await bulk_insert(request, db, TICKETS)
+
+
+@bulk_router.post("/api/flight-schedule/bulk-delete")
+async def bulk_delete_flights(body: BulkDelete, db: Session = Depends(get_db)):
+    return await bulk_delete(body, db, FLIGHTS)
+
+
+@bulk_router.post("/api/employees/bulk-delete")
+async def bulk_delete_employees(body: BulkDelete, db: Session = Depends(get_db)):
+    return await bulk_delete(body, db, EMPLOYEES)
+
+
+@bulk_router.post("/api/passengers/bulk-delete")
+async def bulk_delete_passengers(body: BulkDelete, db: Session = Depends(get_db)):
+    return await bulk_delete(body, db, PASSENGERS)
+
+
+@bulk_router.post("/api/tickets/bulk-delete")
+async def bulk_delete_tickets(body: BulkDelete, db: Session = Depends(get_db)):
+    return await bulk_delete(body, db, TICKETS)
@@ -0,0 +1,206 @@
+import asyncio
+import json
+import os
+import secrets
+from collections import deque
+from typing import Optional
+
+from fastapi import APIRouter, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+
+import changes
+
+
+FEED_QUEUE_SIZE = int(os.getenv("CHANGE_FEED_QUEUE_SIZE", "256"))
+FEED_HISTORY = int(os.getenv("CHANGE_FEED_HISTORY", "1000"))
+# larger writes (bulk loads) are announced without their rows
+FEED_MAX_ROWS = int(os.getenv("CHANGE_FEED_MAX_ROWS", "200"))
+FEED_HEARTBEAT = float(os.getenv("CHANGE_FEED_HEARTBEAT", "15"))
+# seq counts from 0 in every process, so event ids carry this process's
+# epoch too; an id from another worker or an earlier run means resync
+FEED_EPOCH = secrets.token_hex(4)
+
+feed_router = APIRouter()
+
+
+class FeedMessage:
+    __slots__ = ("seq", "table", "data")
+
+    def __init__(self, seq, table, data):
+        self.seq = seq
+        self.table = table
+        self.data = data
+
+
+def resync_message(seq, table=None):
+    return FeedMessage(seq, table, json.dumps({"type": "resync", "epoch": FEED_EPOCH, "seq": seq, "table": table}))
+
+
+def parse_since(value):
+    # "<epoch>-<seq>" as sent in event ids, or a bare seq; returns
+    # (epoch or None, seq), or None for a value that is neither
+    epoch, _, seq = value.rpartition("-")
+    if not seq.isdigit():
+        return None
+    return epoch or None, int(seq)
+
+
+class Subscriber:
+    def __init__(self, tables=None):
+        self.tables = tables
+        self.queue = asyncio.Queue(maxsize=FEED_QUEUE_SIZE)
+        self.dropped = 0
+
+    def wants(self, table):
+        return self.tables is None or table in self.tables
+
+    def offer(self, message):
+        if not self.wants(message.table):
+            return
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # A consumer that falls this far behind gets one resync message
+            # in place of its backlog and refetches, instead of the feed
+            # buffering without bound or waiting on it.
+            self.dropped += self.queue.qsize() + 1
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(resync_message(message.seq))
+
+
+class ChangeFeed:
+    def __init__(self, history=FEED_HISTORY):
+        self._loop = None
+        self._seq = 0
+        self._history = deque(maxlen=history)
+        self._subscribers = set()
+
+    def start(self, loop):
+        self._loop = loop
+
+    def stop(self):
+        self._loop = None
+
+    def publish(self, table, op, rows):
+        # called from request threads as well as the event loop; all feed
+        # state is only touched on the loop
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        loop.call_soon_threadsafe(self._fan_out, table, op, list(rows))
+
+    def _fan_out(self, table, op, rows):
+        self._seq += 1
+        event = {"type": "change", "epoch": FEED_EPOCH, "seq": self._seq, "table": table, "op": op}
+        if len(rows) > FEED_MAX_ROWS:
+            event["count"] = len(rows)
+            event["resync"] = True
+        else:
+            event["rows"] = rows
+        # serialized once and shared by every subscriber
+        message = FeedMessage(self._seq, table, json.dumps(event, default=str))
+        self._history.append(message)
+        for subscriber in self._subscribers:
+            subscriber.offer(message)
+
+    def subscribe(self, tables=None, since=None):
+        # since: where the client left off, see parse_since
+        subscriber = Subscriber(tables)
+        if since is not None:
+            self._catch_up(subscriber, parse_since(since))
+        self._subscribers.add(subscriber)
+        return subscriber
+
+    def _catch_up(self, subscriber, position):
+        if position is None or position[0] not in (None, FEED_EPOCH) or position[1] > self._seq:
+            # not a point in this process's feed: a restart, another worker,
+            # or garbage
+            subscriber.offer(resync_message(self._seq))
+            return
+        since = position[1]
+        if since == self._seq:
+            return
+        if self._history and self._history[0].seq <= since + 1:
+            for message in self._history:
+                if message.seq > since:
+                    subscriber.offer(message)
+        else:
+            subscriber.offer(resync_message(self._seq))
+
+    def unsubscribe(self, subscriber):
+        self._subscribers.discard(subscriber)
+
+    def stats(self):
+        return {
+            "epoch": FEED_EPOCH,
+            "seq": self._seq,
+            "subscribers": len(self._subscribers),
+            "queued": sum(subscriber.queue.qsize() for subscriber in self._subscribers),
+        }
+
+
+change_feed = ChangeFeed()
+changes.on_rows_changed(change_feed.publish)
+
+
+def parse_tables(tables):
+    if not tables:
+        return None
+    return {table.strip() for table in tables.split(",") if table.strip()}
+
+
+async def next_message(subscriber):
+    try:
+        return await asyncio.wait_for(subscriber.queue.get(), FEED_HEARTBEAT)
+    except asyncio.TimeoutError:
+        return None
+
+
+async def sse_events(request: Request, subscriber: Subscriber):
+    try:
+        yield "retry: 3000\n\n"
+        while True:
+            message = await next_message(subscriber)
+            if message is None:
+                if await request.is_disconnected():
+                    break
+                yield ": keepalive\n\n"
+                continue
+            yield f"id: {FEED_EPOCH}-{message.seq}\ndata: {message.data}\n\n"
+    finally:
+        change_feed.unsubscribe(subscriber)
+
+
+@feed_router.get("/api/changes/stream")
+async def stream_changes(request: Request, tables: Optional[str] = None, since: Optional[str] = None):
+    # EventSource sends Last-Event-ID when it reconnects
+    since = request.headers.get("last-event-id") or since
+    subscriber = change_feed.subscribe(parse_tables(tables), since)
+    return StreamingResponse(
+        sse_events(request, subscriber),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@feed_router.websocket("/api/changes/ws")
+async def websocket_changes(websocket: WebSocket, tables: Optional[str] = None, since: Optional[str] = None):
+    await websocket.accept()
+    subscriber = change_feed.subscribe(parse_tables(tables), since)
+    try:
+        while True:
+            message = await next_message(subscriber)
+            if message is None:
+                await websocket.send_text('{"type": "ping"}')
+                continue
+            await websocket.send_text(message.data)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        change_feed.unsubscribe(subscriber)
+
+
+@feed_router.get("/api/changes/stats")
+async def get_change_feed_stats():
+    return change_feed.stats()
@@ -0,0 +1,33 @@
+# Write endpoints call tables_changed() after they commit; in-process caches
+# and indexes subscribe to learn which tables they need to refresh.
+# rows_changed() carries the rows themselves for listeners that push diffs
+# to clients; each row holds at least the columns that identify it.
+_listeners = []
+_row_listeners = []
+
+
+def on_tables_changed(listener):
+    _listeners.append(listener)
+    return listener
+
+
+def on_rows_changed(listener):
+    _row_listeners.append(listener)
+    return listener
+
+
+def tables_changed(*tables):
+    changed = set(tables)
+    for listener in _listeners:
+        try:
+            listener(changed)
+        except Exception as e:
+            print(f"Error in change listener: {e}")
+
+
+def rows_changed(table, op, rows):
+    for listener in _row_listeners:
+        try:
+            listener(table, op, rows)
+        except Exception as e:
+            print(f"Error in change listener: {e}")
@@ -0,0 +1,399 @@
+import heapq
+import threading
+import time
+from collections import defaultdict
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel
+from sqlalchemy import bindparam, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+import changes
+from database import get_db
+from flight_index import flight_index
+from gate_schedule import minute_of_day
+from ground_operations import ENGINEER_ROLE, MEDICAL_ROLES
+
+
+MEDICAL = "medical"
+ENGINEER = "engineer"
+# ill passengers are seen to before arriving flights
+JOB_PRIORITY = {MEDICAL: 0, ENGINEER: 1}
+ILLNESS_STATUS = "Illness"
+ARRIVAL_STATUS = "Arrival"
+
+STAFF_QUERY = text("""
+    SELECT Employee_ID, Employee_name, Job_title, Airport_ID
+    FROM Employee
+    WHERE Job_title IN :roles
+""").bindparams(bindparam("roles", expanding=True))
+ILL_PASSENGERS_QUERY = text("""
+    SELECT Passenger_ID, Passenger_name, Flight_no FROM Passenger WHERE Passenger_status = :status
+""")
+PENDING_PASSENGERS_QUERY = text("""
+    SELECT Passenger_ID, Passenger_name, Flight_no
+    FROM Passenger
+    WHERE Passenger_ID IN :ids AND Passenger_status = :status
+""").bindparams(bindparam("ids", expanding=True))
+
+dispatch_router = APIRouter()
+
+
+class DispatchRequest(BaseModel):
+    airport: Optional[str] = None
+    kind: Optional[Literal["medical", "engineer"]] = None
+    dry_run: bool = False
+
+
+class StaffMember:
+    __slots__ = ("Employee_ID", "Employee_name", "kind", "Airport_ID", "load", "Terminal")
+
+    def __init__(self, employee_id, employee_name, kind, airport_id, load=0, terminal=None):
+        self.Employee_ID = employee_id
+        self.Employee_name = employee_name
+        self.kind = kind
+        self.Airport_ID = airport_id
+        # open jobs already held
+        self.load = load
+        # terminal of the latest of those jobs, None when idle
+        self.Terminal = terminal
+
+
+class Job:
+    __slots__ = ("kind", "key", "name", "Flight_no", "Airport_ID", "Terminal", "arrival_time", "minute")
+
+    def __init__(self, kind, key, name, flight_no, airport_id, terminal, arrival_time):
+        self.kind = kind
+        # Passenger_ID for medical jobs, Flight_no for engineer jobs
+        self.key = key
+        self.name = name
+        self.Flight_no = flight_no
+        self.Airport_ID = airport_id
+        self.Terminal = terminal
+        self.arrival_time = arrival_time
+        self.minute = minute_of_day(arrival_time)
+
+    def as_dict(self):
+        job = {"kind": self.kind}
+        if self.kind == MEDICAL:
+            job.update({"Passenger_ID": self.key, "Passenger_name": self.name})
+        job.update({
+            "Flight_no": self.Flight_no,
+            "Airport_ID": self.Airport_ID,
+            "Terminal": self.Terminal,
+            "arrival_time": self.arrival_time
+        })
+        return job
+
+
+def job_order(job):
+    return (JOB_PRIORITY[job.kind], job.minute is None, job.minute or 0, str(job.key))
+
+
+def terminal_distance(a, b):
+    if a is None or b is None:
+        return 1
+    return abs(a - b)
+
+
+def plan_dispatch(jobs, staff):
+    # Staff of one kind at one airport form a pool, kept as one heap of
+    # (load, Employee_ID) per terminal. Jobs are taken in priority order and
+    # each goes to the least loaded member of its pool, the nearest terminal
+    # breaking ties; that member then holds one more job at the job's
+    # terminal. A pool has a handful of terminals, so a job costs a few heap
+    # peeks and one pop and push.
+    pools = defaultdict(lambda: defaultdict(list))
+    for member in staff:
+        pools[(member.kind, member.Airport_ID)][member.Terminal].append((member.load, member.Employee_ID))
+    for pool in pools.values():
+        for heap in pool.values():
+            heapq.heapify(heap)
+
+    plan = []
+    for job in sorted(jobs, key=job_order):
+        pool = pools.get((job.kind, job.Airport_ID))
+        best = None
+        for terminal, heap in (pool or {}).items():
+            if heap:
+                load, employee_id = heap[0]
+                candidate = (load, terminal_distance(terminal, job.Terminal), employee_id, terminal)
+                if best is None or candidate[:3] < best[:3]:
+                    best = candidate
+        if best is None:
+            plan.append((job, None))
+            continue
+        load, _, employee_id, terminal = best
+        heapq.heappop(pool[terminal])
+        heapq.heappush(pool[job.Terminal], (load + 1, employee_id))
+        plan.append((job, employee_id))
+    return plan
+
+
+class Dispatcher:
+    def __init__(self):
+        # held across planning and committing so two requests cannot hand
+        # out the same job
+        self.lock = threading.RLock()
+        self.loaded = False
+        self._staff = {}
+        self._ill = {}
+        self._medics = {}
+        self._engineers = defaultdict(set)
+        # passengers reported ill whose flight has not been read yet
+        self._pending = set()
+        self._staff_stale = False
+        self._plan = None
+        self.rebalance_ms = None
+
+    def load(self, db: Session):
+        staff = db.execute(STAFF_QUERY, {"roles": list(MEDICAL_ROLES) + [ENGINEER_ROLE]}).fetchall()
+        ill = db.execute(ILL_PASSENGERS_QUERY, {"status": ILLNESS_STATUS}).fetchall()
+        medics = db.execute(text("SELECT Passenger_ID, Employee_ID FROM MEDICAL_ASSIGNED")).fetchall()
+        engineers = db.execute(text("SELECT Employee_ID, Flight_no FROM FE_ASSIGNED")).fetchall()
+        with self.lock:
+            self._set_staff(staff)
+            self._ill = {p.Passenger_ID: (p.Passenger_name, p.Flight_no) for p in ill}
+            self._medics = {m.Passenger_ID: m.Employee_ID for m in medics}
+            self._engineers = defaultdict(set)
+            for e in engineers:
+                self._engineers[e.Flight_no].add(e.Employee_ID)
+            self._pending = set()
+            self._plan = None
+            self.loaded = True
+
+    def _set_staff(self, rows):
+        self._staff = {
+            e.Employee_ID: (e.Employee_name, MEDICAL if e.Job_title in MEDICAL_ROLES else ENGINEER, e.Airport_ID)
+            for e in rows
+        }
+        self._staff_stale = False
+
+    def refresh(self, db: Session):
+        # brings the state up to date after changes that did not carry
+        # everything the queue needs
+        if not flight_index.loaded:
+            flight_index.load()
+        with self.lock:
+            if not self.loaded:
+                self.load(db)
+                return
+            if self._staff_stale:
+                self._set_staff(db.execute(STAFF_QUERY, {"roles": list(MEDICAL_ROLES) + [ENGINEER_ROLE]}).fetchall())
+                self._plan = None
+            if self._pending:
+                rows = db.execute(PENDING_PASSENGERS_QUERY, {"ids": sorted(self._pending), "status": ILLNESS_STATUS}).fetchall()
+                for p in rows:
+                    self._ill[p.Passenger_ID] = (p.Passenger_name, p.Flight_no)
+                self._pending = set()
+                self._plan = None
+
+    def on_rows_changed(self, table, op, rows):
+        if not self.loaded:
+            return
+        with self.lock:
+            if table == "Passenger":
+                for row in rows:
+                    passenger_id = row["Passenger_ID"]
+                    status = row.get("Passenger_status")
+                    if op == "delete" or (status is not None and status != ILLNESS_STATUS):
+                        self._ill.pop(passenger_id, None)
+                        self._pending.discard(passenger_id)
+                        if op == "delete":
+                            self._medics.pop(passenger_id, None)
+                    elif status == ILLNESS_STATUS and "Flight_no" in row:
+                        self._ill[passenger_id] = (row.get("Passenger_name"), row["Flight_no"])
+                    elif status == ILLNESS_STATUS:
+                        self._pending.add(passenger_id)
+            elif table == "Flight":
+                if op == "delete":
+                    # the foreign keys take the passengers and assignments along
+                    deleted = {row["Flight_no"] for row in rows}
+                    for flight_no in deleted:
+                        self._engineers.pop(flight_no, None)
+                    for passenger_id in [p for p, (_, flight_no) in self._ill.items() if flight_no in deleted]:
+                        self._ill.pop(passenger_id)
+                        self._medics.pop(passenger_id, None)
+            elif table == "Employee":
+                self._staff_stale = True
+                if op == "delete":
+                    deleted = {row["Employee_ID"] for row in rows}
+                    for employee_id in deleted:
+                        self._staff.pop(employee_id, None)
+                    self._medics = {p: e for p, e in self._medics.items() if e not in deleted}
+                    for engineers in self._engineers.values():
+                        engineers -= deleted
+            elif table == "MEDICAL_ASSIGNED":
+                for row in rows:
+                    if op == "delete":
+                        self._medics.pop(row["Passenger_ID"], None)
+                    else:
+                        self._medics[row["Passenger_ID"]] = row["Employee_ID"]
+            elif table == "FE_ASSIGNED":
+                for row in rows:
+                    if op == "delete":
+                        self._engineers[row["Flight_no"]].discard(row["Employee_ID"])
+                    else:
+                        self._engineers[row["Flight_no"]].add(row["Employee_ID"])
+            else:
+                return
+            self._plan = None
+
+    def _state(self):
+        # open jobs and the staff with the jobs they already hold
+        staff = {
+            employee_id: StaffMember(employee_id, name, kind, airport_id)
+            for employee_id, (name, kind, airport_id) in self._staff.items()
+        }
+        jobs = []
+        held = []
+        for passenger_id, (name, flight_no) in self._ill.items():
+            record = flight_index.get(flight_no)
+            if record is None:
+                continue
+            job = Job(MEDICAL, passenger_id, name, flight_no, record.Airport_ID, record.Terminal, record.arrival_time)
+            medic = self._medics.get(passenger_id)
+            if medic is None:
+                jobs.append(job)
+            else:
+                held.append((job, [medic]))
+        for record in flight_index.matching("status", ARRIVAL_STATUS):
+            job = Job(ENGINEER, record.Flight_no, None, record.Flight_no, record.Airport_ID, record.Terminal, record.arrival_time)
+            engineers = self._engineers.get(record.Flight_no)
+            if engineers:
+                held.append((job, engineers))
+            else:
+                jobs.append(job)
+        for job, employee_ids in sorted(held, key=lambda h: job_order(h[0])):
+            for employee_id in employee_ids:
+                member = staff.get(employee_id)
+                if member is not None:
+                    member.load += 1
+                    member.Terminal = job.Terminal
+        return jobs, staff
+
+    def plan(self, db: Session):
+        with self.lock:
+            self.refresh(db)
+            if self._plan is None:
+                start = time.perf_counter()
+                jobs, staff = self._state()
+                self._plan = (plan_dispatch(jobs, staff.values()), staff)
+                self.rebalance_ms = (time.perf_counter() - start) * 1000
+            return self._plan
+
+    def queue(self, db: Session, airport=None, kind=None):
+        with self.lock:
+            plan, staff = self.plan(db)
+            queue = []
+            for job, employee_id in plan:
+                if (airport is not None and job.Airport_ID != airport) or (kind is not None and job.kind != kind):
+                    continue
+                entry = job.as_dict()
+                entry["Employee_ID"] = employee_id
+                entry["Employee_name"] = staff[employee_id].Employee_name if employee_id is not None else None
+                queue.append(entry)
+            return queue
+
+    def _insert(self, db: Session, medical, engineering):
+        try:
+            if medical:
+                db.execute(text("INSERT INTO MEDICAL_ASSIGNED (Passenger_ID, Employee_ID) VALUES (:Passenger_ID, :Employee_ID)"), medical)
+            if engineering:
+                db.execute(text("INSERT INTO FE_ASSIGNED (Employee_ID, Flight_no) VALUES (:Employee_ID, :Flight_no)"), engineering)
+            db.commit()
+        except IntegrityError:
+            # another process wrote an assignment since we loaded; start over
+            db.rollback()
+            self.loaded = False
+            raise HTTPException(status_code=409, detail="Assignments changed while dispatching, try again")
+        if medical:
+            changes.tables_changed("MEDICAL_ASSIGNED")
+            changes.rows_changed("MEDICAL_ASSIGNED", "insert", medical)
+        if engineering:
+            changes.tables_changed("FE_ASSIGNED")
+            changes.rows_changed("FE_ASSIGNED", "insert", engineering)
+
+    def dispatch(self, db: Session, airport=None, kind=None, dry_run=False):
+        with self.lock:
+            queue = self.queue(db, airport, kind)
+            medical = [{"Passenger_ID": j["Passenger_ID"], "Employee_ID": j["Employee_ID"]} for j in queue if j["kind"] == MEDICAL and j["Employee_ID"] is not None]
+            engineering = [{"Employee_ID": j["Employee_ID"], "Flight_no": j["Flight_no"]} for j in queue if j["kind"] == ENGINEER and j["Employee_ID"] is not None]
+            if not dry_run:
+                self._insert(db, medical, engineering)
+            return queue
+
+    def assign(self, db: Session, kind, key, employee_id=None):
+        with self.lock:
+            self.refresh(db)
+            if kind == MEDICAL:
+                if key in self._medics:
+                    raise HTTPException(status_code=409, detail="Passenger already has medical staff assigned")
+                if key not in self._ill:
+                    raise HTTPException(status_code=400, detail="Passenger is not reported ill")
+                name, flight_no = self._ill[key]
+            else:
+                name, flight_no = None, key
+            record = flight_index.get(flight_no)
+            if record is None:
+                raise HTTPException(status_code=404, detail="Flight not found")
+
+            if employee_id is None:
+                job = Job(kind, key, name, flight_no, record.Airport_ID, record.Terminal, record.arrival_time)
+                _, staff = self._state()
+                # engineers already on the flight cannot take it again
+                busy = self._engineers.get(key, ()) if kind == ENGINEER else ()
+                (_, employee_id), = plan_dispatch([job], [m for m in staff.values() if m.Employee_ID not in busy])
+                if employee_id is None:
+                    raise HTTPException(status_code=409, detail=f"No {'medical staff' if kind == MEDICAL else 'ground engineer'} available at {record.Airport_ID}")
+            else:
+                member = self._staff.get(employee_id)
+                if member is None or member[1] != kind:
+                    raise HTTPException(status_code=400, detail=f"Employee {employee_id} is not {'medical staff' if kind == MEDICAL else 'a ground engineer'}")
+                if kind == ENGINEER and employee_id in self._engineers.get(key, ()):
+                    raise HTTPException(status_code=409, detail="Ground engineer is already assigned to this flight")
+
+            if kind == MEDICAL:
+                self._insert(db, [{"Passenger_ID": key, "Employee_ID": employee_id}], [])
+            else:
+                self._insert(db, [], [{"Employee_ID": employee_id, "Flight_no": key}])
+            return employee_id, self._staff[employee_id][0]
+
+
+dispatcher = Dispatcher()
+changes.on_rows_changed(dispatcher.on_rows_changed)
+
+
+@dispatch_router.get("/api/ground_operations/queue")
+def get_dispatch_queue(airport: Optional[str] = None, kind: Optional[Literal["medical", "engineer"]] = None, db: Session = Depends(get_db)):
+    try:
+        queue = dispatcher.queue(db, airport, kind)
+        return {
+            "queue": queue,
+            "unassigned": sum(1 for job in queue if job["Employee_ID"] is None),
+            "rebalance_ms": dispatcher.rebalance_ms
+        }
+    except Exception as e:
+        print(f"Error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@dispatch_router.post("/api/ground_operations/dispatch")
+def dispatch_queue(body: DispatchRequest, db: Session = Depends(get_db)):
+    try:
+        queue = dispatcher.dispatch(db, body.airport, body.kind, body.dry_run)
+        assigned = [job for job in queue if job["Employee_ID"] is not None]
+        return {
+            "assigned": len(assigned),
+            "committed": bool(assigned) and not body.dry_run,
+            "assignments": assigned,
+            "unassigned": [job for job in queue if job["Employee_ID"] is None]
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        db.rollback()
+        print(f"Error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
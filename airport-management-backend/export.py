@@ -0,0 +1,60 @@
+import csv
+import io
+import json
+
+from fastapi.responses import StreamingResponse
+
+from database import engine
+from listings import Listing
+
+
+EXPORT_BATCH_SIZE = 1000
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv"
+}
+
+
+def stream_batches(query, params, format_row):
+    # The rows are read through a server-side cursor on a connection owned by
+    # the generator, so the request session is not held open while streaming.
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=EXPORT_BATCH_SIZE).execute(query, params)
+        for partition in result.partitions():
+            yield [format_row(row) for row in partition]
+
+
+def ndjson_chunks(batches):
+    for batch in batches:
+        yield "".join(json.dumps(row, default=str) + "\n" for row in batch)
+
+
+def csv_chunks(field_names, batches):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=field_names)
+    writer.writeheader()
+    yield buffer.getvalue()
+    for batch in batches:
+        buffer.seek(0)
+        buffer.truncate(0)
+        writer.writerows(batch)
+        yield buffer.getvalue()
+
+
+def export_response(listing: Listing, fmt, fields, filters, filename):
+    # Build the query up front so bad fields are rejected before streaming starts.
+    field_names = listing.select_fields(fields)
+    query, params = listing.build_query(field_names, filters)
+    batches = stream_batches(query, params, listing.row_formatter(field_names))
+
+    if fmt == "csv":
+        chunks = csv_chunks(field_names, batches)
+    else:
+        chunks = ndjson_chunks(batches)
+
+    return StreamingResponse(
+        chunks,
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'}
+    )
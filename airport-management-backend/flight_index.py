@@ -0,0 +1,215 @@
+import asyncio
+import os
+import threading
+from bisect import bisect_right, insort
+from itertools import islice
+
+from sqlalchemy import bindparam, text
+from starlette.concurrency import run_in_threadpool
+
+import changes
+from database import SessionLocal
+from listings import Listing
+
+
+FLIGHT_INDEX_REFRESH = int(os.getenv("FLIGHT_INDEX_REFRESH", "300"))
+# a write touching more flights than this reloads the whole index
+FLIGHT_INDEX_RELOAD_ROWS = 1000
+
+FLIGHT_COLUMNS = (
+    "Flight_no", "Airline_name", "Flight_status", "arrival_time", "Airport_ID",
+    "Airline_ID", "Gate_no", "Terminal", "src_city", "des_city"
+)
+
+# listing filter name -> record attribute
+SECONDARY_INDEXES = {
+    "airport": "Airport_ID",
+    "terminal": "Terminal",
+    "status": "Flight_status",
+    "gate": "Gate_no",
+    "src_city": "src_city",
+    "des_city": "des_city",
+    "route": ("src_city", "des_city"),
+}
+
+SELECT_FLIGHTS = f"SELECT {', '.join(FLIGHT_COLUMNS)} FROM Flight"
+
+
+def indexed_value(record, attribute):
+    if isinstance(attribute, tuple):
+        return tuple(getattr(record, name) for name in attribute)
+    return getattr(record, attribute)
+
+
+class FlightRecord:
+    __slots__ = FLIGHT_COLUMNS
+
+    def __init__(self, row):
+        for column in FLIGHT_COLUMNS:
+            setattr(self, column, getattr(row, column))
+        # stored in the form the API returns
+        self.arrival_time = str(self.arrival_time) if self.arrival_time else None
+
+
+class FlightIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.loaded = False
+        # bumped by every incremental update so a full load that raced one
+        # is not installed over it
+        self._generation = 0
+        self._reload_listeners = []
+        self._reset()
+
+    def on_reload(self, listener):
+        self._reload_listeners.append(listener)
+        return listener
+
+    def _reset(self):
+        self._flights = {}
+        self._sorted_nos = []
+        self._secondary = {name: {} for name in SECONDARY_INDEXES}
+
+    def _add(self, record):
+        self._flights[record.Flight_no] = record
+        insort(self._sorted_nos, record.Flight_no)
+        for name, attribute in SECONDARY_INDEXES.items():
+            insort(self._secondary[name].setdefault(indexed_value(record, attribute), []), record.Flight_no)
+
+    def _remove(self, flight_no):
+        record = self._flights.pop(flight_no, None)
+        if record is None:
+            return
+        del self._sorted_nos[bisect_right(self._sorted_nos, flight_no) - 1]
+        for name, attribute in SECONDARY_INDEXES.items():
+            value = indexed_value(record, attribute)
+            bucket = self._secondary[name][value]
+            del bucket[bisect_right(bucket, flight_no) - 1]
+            if not bucket:
+                del self._secondary[name][value]
+
+    def load(self, attempts=3):
+        for attempt in range(attempts):
+            generation = self._generation
+            db = SessionLocal()
+            try:
+                rows = db.execute(text(SELECT_FLIGHTS)).fetchall()
+            finally:
+                db.close()
+            with self._lock:
+                installed = generation == self._generation or attempt == attempts - 1
+                if installed:
+                    self._install([FlightRecord(row) for row in rows])
+            if installed:
+                for listener in self._reload_listeners:
+                    listener()
+                return
+
+    def _install(self, records):
+        self._flights = {record.Flight_no: record for record in records}
+        self._sorted_nos = sorted(self._flights)
+        self._secondary = {name: {} for name in SECONDARY_INDEXES}
+        # records are added in key order, so every bucket comes out sorted
+        for flight_no in self._sorted_nos:
+            record = self._flights[flight_no]
+            for name, attribute in SECONDARY_INDEXES.items():
+                self._secondary[name].setdefault(indexed_value(record, attribute), []).append(flight_no)
+        self.loaded = True
+
+    async def ensure_loaded(self):
+        if not self.loaded:
+            await run_in_threadpool(self.load)
+
+    def refresh(self, flight_nos):
+        # re-read the given flights so the index holds what MySQL stored,
+        # not what the client sent
+        if len(flight_nos) > FLIGHT_INDEX_RELOAD_ROWS:
+            self.load()
+            return
+        query = text(f"{SELECT_FLIGHTS} WHERE Flight_no IN :nos").bindparams(bindparam("nos", expanding=True))
+        db = SessionLocal()
+        try:
+            rows = db.execute(query, {"nos": list(flight_nos)}).fetchall()
+        finally:
+            db.close()
+        with self._lock:
+            self._generation += 1
+            for flight_no in flight_nos:
+                self._remove(flight_no)
+            for row in rows:
+                self._add(FlightRecord(row))
+
+    def remove(self, flight_nos):
+        with self._lock:
+            self._generation += 1
+            for flight_no in flight_nos:
+                self._remove(flight_no)
+
+    def on_rows_changed(self, table, op, rows):
+        if table != "Flight" or not self.loaded:
+            return
+        flight_nos = [row["Flight_no"] for row in rows]
+        if op == "delete":
+            self.remove(flight_nos)
+        else:
+            self.refresh(flight_nos)
+
+    def flight_numbers(self):
+        with self._lock:
+            return list(self._sorted_nos)
+
+    def get(self, flight_no):
+        with self._lock:
+            return self._flights.get(flight_no)
+
+    def records(self):
+        with self._lock:
+            return list(self._flights.values())
+
+    def matching(self, name, value):
+        # records in one secondary bucket, e.g. matching("status", "Arrival")
+        with self._lock:
+            return [self._flights[flight_no] for flight_no in self._secondary[name].get(value, [])]
+
+    def page(self, listing: Listing, cursor=None, limit=None, fields=None, filters=None, columnar=False):
+        field_names = listing.select_fields(fields)
+        filters = {name: value for name, value in (filters or {}).items() if value is not None}
+        if "src_city" in filters and "des_city" in filters:
+            filters["route"] = (filters.pop("src_city"), filters.pop("des_city"))
+        active = list(filters.items())
+        records = []
+        has_more = False
+        with self._lock:
+            # walk the smallest matching bucket (each is sorted by Flight_no)
+            # and check the remaining filters on the records themselves
+            buckets = [(self._secondary[name].get(value, []), name) for name, value in active]
+            bucket, chosen = min(buckets, key=lambda b: len(b[0])) if buckets else (self._sorted_nos, None)
+            checks = [(SECONDARY_INDEXES[name], value) for name, value in active if name != chosen]
+            start = bisect_right(bucket, cursor) if cursor is not None else 0
+            for flight_no in islice(bucket, start, None):
+                record = self._flights[flight_no]
+                if all(indexed_value(record, attribute) == value for attribute, value in checks):
+                    if limit is not None and len(records) == limit:
+                        has_more = True
+                        break
+                    records.append(record)
+        if columnar:
+            items = [tuple([getattr(record, name) for name in field_names]) for record in records]
+        else:
+            items = [{name: getattr(record, name) for name in field_names} for record in records]
+        next_cursor = getattr(records[-1], listing.key) if has_more else None
+        return items, next_cursor
+
+
+flight_index = FlightIndex()
+changes.on_rows_changed(flight_index.on_rows_changed)
+
+
+async def refresh_loop(interval=FLIGHT_INDEX_REFRESH):
+    # picks up writes made outside the API (SQL scripts, other services)
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await run_in_threadpool(flight_index.load)
+        except Exception as e:
+            print(f"Error refreshing flight index: {e}")
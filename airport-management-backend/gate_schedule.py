@@ -0,0 +1,273 @@
+import os
+import threading
+from bisect import bisect_left, insort
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel
+from sqlalchemy import text
+from starlette.concurrency import run_in_threadpool
+
+import changes
+from database import SessionLocal
+from flight_index import flight_index
+
+
+# how long a flight holds its gate from its scheduled time
+GATE_OCCUPANCY_MINUTES = int(os.getenv("GATE_OCCUPANCY_MINUTES", "45"))
+MINUTES_PER_DAY = 24 * 60
+
+gates_router = APIRouter()
+
+
+class GateCheck(BaseModel):
+    Flight_no: Optional[str] = None
+    Airport_ID: str
+    Gate_no: str
+    arrival_time: str
+
+
+def minute_of_day(value):
+    # accepts "HH:MM", "HH:MM:SS" and the str() of time/timedelta values
+    if value is None:
+        return None
+    try:
+        parts = str(value).split(":")
+        return (int(parts[0]) * 60 + int(parts[1])) % MINUTES_PER_DAY
+    except (IndexError, ValueError):
+        return None
+
+
+def format_minute(minute):
+    return f"{minute // 60:02d}:{minute % 60:02d}"
+
+
+class GateTimeline:
+    # Flight start minutes for one gate, kept sorted. Every flight holds the
+    # gate for the same number of minutes, so two windows overlap exactly
+    # when their starts are less than that apart (around midnight too), and
+    # a conflict check is a bisect for the starts within that distance.
+    def __init__(self, window):
+        self.window = window
+        self.starts = []
+
+    def add(self, start, flight_no):
+        insort(self.starts, (start, flight_no))
+
+    def remove(self, start, flight_no):
+        position = bisect_left(self.starts, (start, flight_no))
+        if position < len(self.starts) and self.starts[position] == (start, flight_no):
+            del self.starts[position]
+
+    def _between(self, low, high):
+        # starts in the open range (low, high), for 0 <= low < high <= a day
+        position = bisect_left(self.starts, (low + 1, ""))
+        while position < len(self.starts) and self.starts[position][0] < high:
+            yield self.starts[position]
+            position += 1
+
+    def overlapping(self, start):
+        low = start - self.window
+        high = start + self.window
+        ranges = [(max(low, -1), min(high, MINUTES_PER_DAY))]
+        if low < -1:
+            ranges.append((low + MINUTES_PER_DAY, MINUTES_PER_DAY))
+        if high > MINUTES_PER_DAY:
+            ranges.append((-1, high - MINUTES_PER_DAY))
+        found = []
+        for range_low, range_high in ranges:
+            found.extend(self._between(range_low, range_high))
+        return found
+
+    def nearest_gap(self, start):
+        # minutes between this window and the closest other window at the gate
+        if not self.starts:
+            return None
+        position = bisect_left(self.starts, (start, ""))
+        neighbours = [self.starts[position % len(self.starts)][0], self.starts[position - 1][0]]
+        distance = min(min(abs(start - other), MINUTES_PER_DAY - abs(start - other)) for other in neighbours)
+        return distance - self.window
+
+
+class GateSchedule:
+    def __init__(self, window=GATE_OCCUPANCY_MINUTES):
+        self.window = window
+        # held by add_flight and the bulk flight insert across their check and
+        # insert so two requests cannot take the same slot
+        self.lock = threading.RLock()
+        self.loaded = False
+        self._timelines = {}
+        self._gates = {}
+        self._placed = {}
+
+    def _timeline(self, gate_key):
+        timeline = self._timelines.get(gate_key)
+        if timeline is None:
+            timeline = self._timelines[gate_key] = GateTimeline(self.window)
+        return timeline
+
+    def _place(self, record):
+        start = minute_of_day(record.arrival_time)
+        if start is None or not record.Gate_no:
+            return
+        gate_key = (record.Airport_ID, record.Gate_no)
+        self._timeline(gate_key).add(start, record.Flight_no)
+        self._placed[record.Flight_no] = (gate_key, start)
+
+    def _unplace(self, flight_no):
+        placed = self._placed.pop(flight_no, None)
+        if placed:
+            gate_key, start = placed
+            self._timelines[gate_key].remove(start, flight_no)
+
+    def load(self):
+        db = SessionLocal()
+        try:
+            gates = db.execute(text("SELECT Gate_no, Airport_ID, Terminal FROM Gate")).fetchall()
+        finally:
+            db.close()
+        with self.lock:
+            self._gates = {(gate.Airport_ID, gate.Gate_no): gate.Terminal for gate in gates}
+        if not flight_index.loaded:
+            flight_index.load()
+        self.rebuild()
+
+    def rebuild(self):
+        with self.lock:
+            self._timelines = {}
+            self._placed = {}
+            for record in flight_index.records():
+                self._place(record)
+            self.loaded = True
+
+    def on_flights_reloaded(self):
+        if self.loaded:
+            self.rebuild()
+
+    async def ensure_loaded(self):
+        if not self.loaded:
+            await run_in_threadpool(self.load)
+
+    def on_rows_changed(self, table, op, rows):
+        # the flight index has already applied the change, so it holds the
+        # stored values
+        if table != "Flight" or not self.loaded:
+            return
+        with self.lock:
+            for row in rows:
+                self._unplace(row["Flight_no"])
+                if op != "delete":
+                    record = flight_index.get(row["Flight_no"])
+                    if record is not None:
+                        self._place(record)
+
+    def conflicts(self, airport_id, gate_no, arrival_time, flight_no=None):
+        start = minute_of_day(arrival_time)
+        if start is None or not gate_no:
+            return []
+        with self.lock:
+            timeline = self._timelines.get((airport_id, gate_no))
+            if timeline is None:
+                return []
+            return [
+                {"Flight_no": other, "arrival_time": format_minute(other_start), "Gate_no": gate_no}
+                for other_start, other in timeline.overlapping(start)
+                if other != flight_no
+            ]
+
+    def batch_conflicts(self, rows):
+        # conflicts per row, against the schedule and the rows before it in
+        # the batch; callers hold the lock until the batch is written
+        batch = {}
+        found = []
+        with self.lock:
+            for row in rows:
+                conflicts = self.conflicts(row.get("Airport_ID"), row.get("Gate_no"), row.get("arrival_time"), row.get("Flight_no"))
+                start = minute_of_day(row.get("arrival_time"))
+                if start is not None and row.get("Gate_no"):
+                    timeline = batch.get((row.get("Airport_ID"), row["Gate_no"]))
+                    if timeline is None:
+                        timeline = batch[(row.get("Airport_ID"), row["Gate_no"])] = GateTimeline(self.window)
+                    conflicts.extend(
+                        {"Flight_no": other, "arrival_time": format_minute(other_start), "Gate_no": row["Gate_no"]}
+                        for other_start, other in timeline.overlapping(start)
+                        if other != row.get("Flight_no")
+                    )
+                    timeline.add(start, row.get("Flight_no") or "")
+                found.append(conflicts)
+        return found
+
+    def free_gates(self, airport_id, arrival_time, terminal=None, limit=5):
+        start = minute_of_day(arrival_time)
+        if start is None:
+            raise HTTPException(status_code=400, detail="arrival_time must be HH:MM or HH:MM:SS")
+        proposals = []
+        with self.lock:
+            for (gate_airport, gate_no), gate_terminal in self._gates.items():
+                if gate_airport != airport_id or (terminal is not None and gate_terminal != terminal):
+                    continue
+                timeline = self._timelines.get((gate_airport, gate_no))
+                if timeline is not None and timeline.overlapping(start):
+                    continue
+                gap = timeline.nearest_gap(start) if timeline is not None else None
+                proposals.append({"Gate_no": gate_no, "Terminal": gate_terminal, "buffer_minutes": gap})
+        # prefer the gates with the most slack around the new window
+        proposals.sort(key=lambda p: (-(p["buffer_minutes"] if p["buffer_minutes"] is not None else MINUTES_PER_DAY), p["Gate_no"]))
+        return proposals[:limit]
+
+    def all_conflicts(self, airport_id=None):
+        found = []
+        with self.lock:
+            for (gate_airport, gate_no), timeline in self._timelines.items():
+                if airport_id is not None and gate_airport != airport_id:
+                    continue
+                for start, flight_no in timeline.starts:
+                    for other_start, other in timeline.overlapping(start):
+                        if (other_start, other) > (start, flight_no):
+                            found.append({
+                                "Airport_ID": gate_airport,
+                                "Gate_no": gate_no,
+                                "flights": [
+                                    {"Flight_no": flight_no, "arrival_time": format_minute(start)},
+                                    {"Flight_no": other, "arrival_time": format_minute(other_start)}
+                                ]
+                            })
+        return found
+
+
+gate_schedule = GateSchedule()
+changes.on_rows_changed(gate_schedule.on_rows_changed)
+flight_index.on_reload(gate_schedule.on_flights_reloaded)
+
+
+@gates_router.post("/api/gates/check")
+async def check_gate(body: GateCheck):
+    try:
+        await gate_schedule.ensure_loaded()
+        conflicts = gate_schedule.conflicts(body.Airport_ID, body.Gate_no, body.arrival_time, body.Flight_no)
+        return {"available": not conflicts, "conflicts": conflicts}
+    except Exception as e:
+        print(f"Error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@gates_router.get("/api/gates/free")
+async def get_free_gates(airport: str, arrival_time: str, terminal: Optional[int] = None, limit: int = 5):
+    try:
+        await gate_schedule.ensure_loaded()
+        return {"gates": gate_schedule.free_gates(airport, arrival_time, terminal, limit)}
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@gates_router.get("/api/gates/conflicts")
+async def get_gate_conflicts(airport: Optional[str] = None):
+    try:
+        await gate_schedule.ensure_loaded()
+        return {"conflicts": gate_schedule.all_conflicts(airport)}
+    except Exception as e:
+        print(f"Error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
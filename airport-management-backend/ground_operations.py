@@ -0,0 +1,103 @@
+import asyncio
+import os
+import threading
+import time
+
+from sqlalchemy import text
+
+import changes
+from database import AsyncSessionLocal
+
+
+SNAPSHOT_TTL = float(os.getenv("GROUND_OPS_SNAPSHOT_TTL", "2"))
+SNAPSHOT_TABLES = {"Employee", "Passenger", "Flight"}
+
+MEDICAL_ROLES = ("Medical staff", "Medical staffs")
+ENGINEER_ROLE = "Ground Engineer"
+
+STAFF_QUERY = text("""
+    SELECT Employee_ID, Employee_name, Job_title
+    FROM Employee
+    WHERE Job_title IN ('Medical staff', 'Medical staffs', 'Ground Engineer')
+""")
+ILL_PASSENGERS_QUERY = text("""
+    SELECT p.Passenger_ID, p.Passenger_name, p.Passenger_status, p.Flight_no, f.src_city, f.des_city
+    FROM Passenger p
+    JOIN Flight f ON p.Flight_no = f.Flight_no
+    WHERE p.Passenger_status = 'Illness'
+""")
+ARRIVALS_QUERY = text("""
+    SELECT Flight_no, src_city, des_city, Airline_name, arrival_time
+    FROM Flight
+    WHERE Flight_status = 'Arrival'
+""")
+
+
+async def fetch(query):
+    # one session per query so the three reads run side by side
+    async with AsyncSessionLocal() as db:
+        return (await db.execute(query)).fetchall()
+
+
+async def load_ground_operations():
+    staff, ill_passengers, arrival_flights = await asyncio.gather(
+        fetch(STAFF_QUERY), fetch(ILL_PASSENGERS_QUERY), fetch(ARRIVALS_QUERY)
+    )
+    medical_staff = []
+    ground_engineers = []
+    for e in staff:
+        member = {"Employee_ID": e.Employee_ID, "Employee_name": e.Employee_name, "Job_title": e.Job_title}
+        if e.Job_title in MEDICAL_ROLES:
+            medical_staff.append(member)
+        elif e.Job_title == ENGINEER_ROLE:
+            ground_engineers.append(member)
+
+    return {
+        "medical_staff": medical_staff,
+        "ground_engineers": ground_engineers,
+        "ill_passengers": [{"Passenger_ID": p.Passenger_ID, "Passenger_name": p.Passenger_name, "Passenger_status": p.Passenger_status, "Flight_no": p.Flight_no, "src_city": p.src_city, "des_city": p.des_city} for p in ill_passengers],
+        "arrival_flights": [{"Flight_no": f.Flight_no, "src_city": f.src_city, "des_city": f.des_city, "Airline_name": f.Airline_name, "arrival_time": str(f.arrival_time) if f.arrival_time else None} for f in arrival_flights]
+    }
+
+
+class SharedSnapshot:
+    # Requests that arrive while a load is running wait for that load instead
+    # of starting their own, and the result is reused for `ttl` seconds or
+    # until one of `tables` is written.
+    def __init__(self, load, ttl, tables):
+        self.load = load
+        self.ttl = ttl
+        self.tables = tables
+        self._lock = threading.Lock()
+        self._value = None
+        self._expires_at = 0.0
+        self._generation = 0
+        self._pending = None
+
+    async def get(self):
+        with self._lock:
+            if self._value is not None and self._expires_at > time.monotonic():
+                return self._value
+            if self._pending is None or self._pending.done():
+                self._pending = asyncio.ensure_future(self._refresh(self._generation))
+            pending = self._pending
+        return await asyncio.shield(pending)
+
+    async def _refresh(self, generation):
+        value = await self.load()
+        with self._lock:
+            if self._generation == generation:
+                self._value = value
+                self._expires_at = time.monotonic() + self.ttl
+        return value
+
+    def invalidate(self, changed_tables):
+        if changed_tables & self.tables:
+            with self._lock:
+                self._generation += 1
+                self._value = None
+                self._pending = None
+
+
+ground_operations_snapshot = SharedSnapshot(load_ground_operations, SNAPSHOT_TTL, SNAPSHOT_TABLES)
+changes.on_tables_changed(ground_operations_snapshot.invalidate)
@@ -0,0 +1,184 @@
+from fastapi import HTTPException
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 5000
+
+
+# str() of a date or time is its ISO form
+def as_str(value):
+    return str(value) if value else None
+
+
+class Listing:
+    def __init__(self, from_clause, key, columns, filters, formatters=None, key_type=str):
+        self.from_clause = from_clause
+        self.key = key
+        self.key_type = key_type
+        # output field name -> SQL expression
+        self.columns = columns
+        # query parameter name -> SQL expression
+        self.filters = filters
+        self.formatters = formatters or {}
+
+    def select_fields(self, fields=None):
+        if not fields:
+            return list(self.columns)
+        requested = [f.strip() for f in fields.split(",") if f.strip()]
+        unknown = [f for f in requested if f not in self.columns]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+        # the key is always returned so the client can build the next cursor
+        if self.key not in requested:
+            requested.insert(0, self.key)
+        return requested
+
+    def build_query(self, field_names, filter_values, cursor=None, limit=None):
+        select_list = ", ".join(f"{self.columns[name]} AS {name}" for name in field_names)
+        conditions = []
+        params = {}
+        for name, value in filter_values.items():
+            if value is None:
+                continue
+            conditions.append(f"{self.filters[name]} = :{name}")
+            params[name] = value
+        if cursor is not None:
+            try:
+                params["cursor"] = self.key_type(cursor)
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+            conditions.append(f"{self.columns[self.key]} > :cursor")
+
+        sql = f"SELECT {select_list} FROM {self.from_clause}"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += f" ORDER BY {self.columns[self.key]}"
+        if limit is not None:
+            sql += " LIMIT :limit"
+            params["limit"] = limit
+        return text(sql), params
+
+    def row_formatter(self, field_names):
+        plan = [(i, name, self.formatters.get(name)) for i, name in enumerate(field_names)]
+
+        def format_row(row):
+            return {name: fmt(row[i]) if fmt else row[i] for i, name, fmt in plan}
+
+        return format_row
+
+
+def page_query(listing: Listing, cursor, limit, fields, filters):
+    field_names = listing.select_fields(fields)
+    # ask for one extra row to learn whether another page exists
+    query, params = listing.build_query(field_names, filters or {}, cursor, limit + 1)
+    return field_names, query, params
+
+
+def page_from_rows(listing: Listing, field_names, rows, limit, columnar=False):
+    if columnar:
+        # one value list per row, in field_names order; dates and times are
+        # left for the response encoder
+        items = [tuple(row) for row in rows[:limit]]
+        next_cursor = items[-1][field_names.index(listing.key)] if len(rows) > limit else None
+        return items, next_cursor
+    format_row = listing.row_formatter(field_names)
+    items = [format_row(row) for row in rows[:limit]]
+    next_cursor = items[-1][listing.key] if len(rows) > limit else None
+    return items, next_cursor
+
+
+def fetch_page(db: Session, listing: Listing, cursor=None, limit=DEFAULT_PAGE_SIZE, fields=None, filters=None, columnar=False):
+    field_names, query, params = page_query(listing, cursor, limit, fields, filters)
+    rows = db.execute(query, params).fetchall()
+    return page_from_rows(listing, field_names, rows, limit, columnar)
+
+
+async def fetch_page_async(db: AsyncSession, listing: Listing, cursor=None, limit=DEFAULT_PAGE_SIZE, fields=None, filters=None, columnar=False):
+    field_names, query, params = page_query(listing, cursor, limit, fields, filters)
+    rows = (await db.execute(query, params)).fetchall()
+    return page_from_rows(listing, field_names, rows, limit, columnar)
+
+FLIGHT_SCHEDULE = Listing(
+    from_clause="Flight",
+    key="Flight_no",
+    columns={
+        "Flight_no": "Flight_no",
+        "Airline_name": "Airline_name",
+        "Flight_status": "Flight_status",
+        "arrival_time": "arrival_time",
+        "Airport_ID": "Airport_ID",
+        "Airline_ID": "Airline_ID",
+        "Gate_no": "Gate_no",
+        "Terminal": "Terminal",
+        "src_city": "src_city",
+        "des_city": "des_city"
+    },
+    filters={
+        "airport": "Airport_ID",
+        "terminal": "Terminal",
+        "status": "Flight_status",
+        "gate": "Gate_no",
+        "src_city": "src_city",
+        "des_city": "des_city"
+    },
+    formatters={"arrival_time": as_str}
+)
+
+FLIGHTS_LIST = Listing(
+    from_clause="Flight",
+    key="Flight_no",
+    columns={
+        "Flight_no": "Flight_no",
+        "src_city": "src_city",
+        "des_city": "des_city"
+    },
+    filters=FLIGHT_SCHEDULE.filters
+)
+
+EMPLOYEES = Listing(
+    from_clause="Employee",
+    key="Employee_ID",
+    key_type=int,
+    columns={
+        "Employee_ID": "Employee_ID",
+        "F_Name": "F_Name",
+        "M_Initial": "M_Initial",
+        "L_Name": "L_Name",
+        "Employee_name": "Employee_name",
+        "Hire_date": "Hire_date",
+        "Employee_Salary": "Employee_Salary",
+        "Job_title": "Job_title",
+        "Airport_ID": "Airport_ID"
+    },
+    filters={
+        "airport": "Airport_ID",
+        "job_title": "Job_title"
+    },
+    formatters={"Hire_date": as_str}
+)
+
+CREW = Listing(
+    from_clause="""Crew c
+            JOIN Employee e ON c.Employee_ID = e.Employee_ID
+            JOIN Flight f ON c.Flight_no = f.Flight_no""",
+    key="Crew_ID",
+    key_type=int,
+    columns={
+        "Crew_ID": "c.Crew_ID",
+        "Crew_role": "c.Crew_role",
+        "Employee_ID": "c.Employee_ID",
+        "Employee_name": "e.Employee_name",
+        "Flight_no": "c.Flight_no",
+        "src_city": "f.src_city",
+        "des_city": "f.des_city"
+    },
+    filters={
+        "flight_no": "c.Flight_no",
+        "role": "c.Crew_role",
+        "airport": "f.Airport_ID",
+        "terminal": "f.Terminal"
+    }
+)
@@ -1,11 +1,67 @@
-from fastapi import FastAPI, Depends, HTTPException, Body
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Depends, HTTPException, Body, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
 from sqlalchemy import text
-from database import get_db, engine
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from database import get_db, get_async_db, pool_metrics
 from pydantic import BaseModel
-
-app = FastAPI(title="Airport Management System API")
+from typing import Literal, Optional
+import analytics
+import changes
+import export
+import listings
+import reports
+import revenue
+from report_cache import report_cache
+from ground_operations import ground_operations_snapshot
+from archive import archive_loop, archive_router
+from auth import auth_router
+from baggage_scans import scan_ingestor, scans_router
+from bulk import bulk_router
+from change_feed import change_feed, feed_router
+from flight_index import flight_index, refresh_loop
+from gate_schedule import gate_schedule, gates_router
+from passenger_search import search_refresh_loop, search_router
+from revenue import revenue_router
+from roster import roster_router
+from dispatch import dispatcher, dispatch_router, MEDICAL, ENGINEER, ILLNESS_STATUS
+from passwords import HashPoolBusy, hash_password, hash_pool
+from profiling import ProfilingMiddleware, instrument_routes, metrics_router
+from responses import FastJSONResponse, page_response
+from report_counters import report_counters, capture_employees, capture_passengers, reconcile_loop, PASSENGER_SCOPE, FLIGHT_SCOPE
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    instrument_routes(app)
+    reconcile_task = asyncio.create_task(reconcile_loop())
+    change_feed.start(asyncio.get_running_loop())
+    try:
+        await flight_index.ensure_loaded()
+        await gate_schedule.ensure_loaded()
+    except Exception as e:
+        print(f"Error warming flight index: {e}")
+    refresh_task = asyncio.create_task(refresh_loop())
+    archive_task = asyncio.create_task(archive_loop())
+    search_task = asyncio.create_task(search_refresh_loop())
+    scan_ingestor.start()
+    yield
+    # buffered scans are written before the change feed goes away
+    await scan_ingestor.stop()
+    change_feed.stop()
+    refresh_task.cancel()
+    archive_task.cancel()
+    search_task.cancel()
+    reconcile_task.cancel()
+    hash_pool.shutdown()
+
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+app = FastAPI(title="Airport Management System API", lifespan=lifespan, default_response_class=FastJSONResponse)
 
 class StatusUpdate(BaseModel):
     status: str
@@ -17,178 +73,161 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(ProfilingMiddleware)
+
+app.include_router(archive_router)
+app.include_router(auth_router)
+app.include_router(bulk_router)
+app.include_router(dispatch_router)
+app.include_router(feed_router)
+app.include_router(gates_router)
+app.include_router(metrics_router)
+app.include_router(revenue_router)
+app.include_router(roster_router)
+app.include_router(scans_router)
+app.include_router(search_router)
 
-@app.post("/signin")
-def signin(
-    first_name: str = Body(..., embed=True),
-    password: str = Body(..., embed=True),
-    db: Session = Depends(get_db)
-):
+@app.get("/api/reports/flight-traffic")
+def get_flight_traffic_report(request: Request, db: Session = Depends(get_db)):
     try:
-        query = text("""
-            SELECT * FROM Employee 
-            WHERE F_Name = :first_name 
-              AND pwd = :password 
-              AND Job_title IN ('Airport Head of Staff', 'Security')
-            LIMIT 1
-        """)
-        res = db.execute(query, {"first_name": first_name, "password": password})
-        employee = res.fetchone()
-        
-        if not employee:
-            raise HTTPException(status_code=401, detail="Invalid credentials")
-
-        return {
-            "Employee_ID": employee.Employee_ID,
-            "Employee_name": employee.Employee_name,
-            "Job_title": employee.Job_title,
-            "Airport_ID": employee.Airport_ID,
-        }
-    except HTTPException:
-        raise
+        return report_cache.cached_response(request, "flight-traffic", lambda: reports.flight_traffic_report(db))
     except Exception as e:
-        print(f"Error in signin: {e}")
-        raise HTTPException(status_code=500, detail="Internal server error")
+        print(f"Error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/reports/employee-stats")
+def get_employee_report(request: Request, db: Session = Depends(get_db)):
+    try:
+        return report_cache.cached_response(request, "employee-stats", lambda: report_counters.employee_report(db))
+    except Exception as e:
+        print(f"Error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/api/reports/flight-traffic")
-def get_flight_traffic_report(db: Session = Depends(get_db)):
+
+
+@app.get("/api/reports/passenger-traffic")
+def get_passenger_traffic_report(request: Request, db: Session = Depends(get_db)):
     try:
-        flights = db.execute(text("SELECT * FROM Flight")).fetchall()
-        arrivals = sum(1 for f in flights if f.Flight_status == 'Arrival')
-        departures = sum(1 for f in flights if f.Flight_status == 'Departure')
-
-        airline_stats = {}
-        routes = {}
-
-        for flight in flights:
-            airline_stats[flight.Airline_name] = airline_stats.get(flight.Airline_name, 0) + 1
-            route = f"{flight.src_city} → {flight.des_city}"
-            routes[route] = routes.get(route, 0) + 1
-
-        top_routes = dict(sorted(routes.items(), key=lambda x: x[1], reverse=True)[:10])
-
-        return {
-            "total_flights": len(flights),
-            "arrivals": arrivals,
-            "departures": departures,
-            "airline_breakdown": airline_stats,
-            "top_routes": top_routes
-        }
+        return report_cache.cached_response(request, "passenger-traffic", lambda: report_counters.passenger_traffic_report(db))
     except Exception as e:
         print(f"Error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/api/reports/employee-stats")
-def get_employee_report(db: Session = Depends(get_db)):
+@app.get("/api/reports/load-factor")
+def get_load_factor_report(request: Request, db: Session = Depends(get_db)):
     try:
-        job_stats_query = text("""
-            SELECT 
-                Job_title, 
-                COUNT(*) AS emp_count, 
-                SUM(Employee_Salary) AS total_salary,
-                AVG(Employee_Salary) AS avg_salary_per_job
-            FROM Employee
-            GROUP BY Job_title
-        """)
-        results = db.execute(job_stats_query).fetchall()
-
-        job_stats = {
-            row.Job_title: {
-                "count": row.emp_count, 
-                "total_salary": row.total_salary,
-                "avg_salary": int(row.avg_salary_per_job) if row.avg_salary_per_job else 0
-            } 
-            for row in results
-        }
-        
-        total_employees = sum(row.emp_count for row in results)
-        total_salary = sum(row.total_salary for row in results)
-        avg_salary_query = text("""
-            SELECT AVG(Employee_Salary) AS avg_salary 
-            FROM Employee
-        """)
-        avg_salary_row = db.execute(avg_salary_query).fetchone()
-        avg_salary = int(avg_salary_row.avg_salary) if avg_salary_row.avg_salary else 0
-
-        return {
-            "total_employees": total_employees,
-            "total_salary_expense": total_salary,
-            "average_salary": avg_salary,
-            "job_breakdown": job_stats
-        }
+        return report_cache.cached_response(request, "load-factor", lambda: analytics.load_factor_report(analytics.snapshot(db)))
     except Exception as e:
         print(f"Error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/reports/route-rankings")
+def get_route_rankings(request: Request, db: Session = Depends(get_db)):
+    try:
+        return report_cache.cached_response(request, "route-rankings", lambda: analytics.route_rankings(analytics.snapshot(db)))
+    except Exception as e:
+        print(f"Error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/reports/airline-shares")
+def get_airline_shares(request: Request, db: Session = Depends(get_db)):
+    try:
+        return report_cache.cached_response(request, "airline-shares", lambda: analytics.airline_shares(analytics.snapshot(db)))
+    except Exception as e:
+        print(f"Error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/api/reports/passenger-traffic")
-def get_passenger_traffic_report(db: Session = Depends(get_db)):
+@app.post("/api/reports/reconcile")
+def reconcile_report_counters(db: Session = Depends(get_db)):
     try:
-        passengers = db.execute(text("SELECT * FROM Passenger")).fetchall()
-        tickets = db.execute(text("SELECT * FROM Ticket")).fetchall()
-        baggage = db.execute(text("SELECT * FROM Baggage")).fetchall()
-
-        total_passengers = len(passengers)
-        total_tickets = len(tickets)
-        total_baggage = len(baggage)
-
-        class_stats = {}
-        for ticket in tickets:
-            cls = ticket.Class
-            class_stats[cls] = class_stats.get(cls, 0) + 1
-
-        total_weight = sum(b.Baggage_weight for b in baggage if b.Baggage_weight)
-        avg_weight = total_weight / total_baggage if total_baggage > 0 else 0
-
-        return {
-            "total_passengers": total_passengers,
-            "total_tickets": total_tickets,
-            "total_baggage": total_baggage,
-            "ticket_class_breakdown": class_stats,
-            "baggage_stats": {
-                "total_weight": total_weight,
-                "average_weight": round(avg_weight, 2)
-            }
-        }
+        drift = report_counters.reconcile(db)
+        report_cache.clear()
+        return {"message": "Report counters reconciled", "drift": drift}
     except Exception as e:
         print(f"Error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/metrics/pool")
+def get_pool_metrics():
+    return pool_metrics()
+
 @app.get("/api/flight-schedule")
-def get_flight_schedule(db: Session = Depends(get_db)):
+async def get_flight_schedule(
+    cursor: Optional[str] = None,
+    limit: int = Query(listings.DEFAULT_PAGE_SIZE, ge=1, le=listings.MAX_PAGE_SIZE),
+    fields: Optional[str] = None,
+    airport: Optional[str] = None,
+    terminal: Optional[int] = None,
+    status: Optional[str] = None,
+    gate: Optional[str] = None,
+    src_city: Optional[str] = None,
+    des_city: Optional[str] = None,
+    columnar: bool = False
+):
     try:
-        flights = db.execute(text("SELECT * FROM Flight")).fetchall()
-        flight_list = []
-        for f in flights:
-            flight_list.append({
-                "Flight_no": f.Flight_no,
-                "Airline_name": f.Airline_name,
-                "Flight_status": f.Flight_status,
-                "arrival_time": str(f.arrival_time) if f.arrival_time else None,
-                "Airport_ID": f.Airport_ID,
-                "Airline_ID": f.Airline_ID,
-                "Gate_no": f.Gate_no,
-                "Terminal": f.Terminal,
-                "src_city": f.src_city,
-                "des_city": f.des_city
-            })
-        return {"flights": flight_list}
+        await flight_index.ensure_loaded()
+        flight_list, next_cursor = flight_index.page(
+            listings.FLIGHT_SCHEDULE, cursor, limit, fields,
+            {"airport": airport, "terminal": terminal, "status": status, "gate": gate, "src_city": src_city, "des_city": des_city},
+            columnar
+        )
+        return page_response("flights", flight_list, next_cursor, listings.FLIGHT_SCHEDULE.select_fields(fields) if columnar else None)
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/flight-schedule/export")
+def export_flight_schedule(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    fields: Optional[str] = None,
+    airport: Optional[str] = None,
+    terminal: Optional[int] = None,
+    status: Optional[str] = None,
+    gate: Optional[str] = None,
+    src_city: Optional[str] = None,
+    des_city: Optional[str] = None
+):
+    try:
+        return export.export_response(
+            listings.FLIGHT_SCHEDULE, format, fields,
+            {"airport": airport, "terminal": terminal, "status": status, "gate": gate, "src_city": src_city, "des_city": des_city},
+            "flights"
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/flight-schedule/add")
-def add_flight(flight_data: dict, db: Session = Depends(get_db)):
+def add_flight(flight_data: dict, allow_conflict: bool = False, db: Session = Depends(get_db)):
     try:
+        if not gate_schedule.loaded:
+            gate_schedule.load()
         insert_query = text("""
             INSERT INTO Flight (Flight_no, Airline_name, Flight_status, arrival_time, Airport_ID, Airline_ID, Gate_no, Terminal, src_city, des_city)
             VALUES (:Flight_no, :Airline_name, :Flight_status, :arrival_time, :Airport_ID, :Airline_ID, :Gate_no, :Terminal, :src_city, :des_city)
         """)
-        db.execute(insert_query, flight_data)
-        db.commit()
-        return {"message": "Flight added successfully", "flight_no": flight_data['Flight_no']}
+        # the check and the insert happen under one lock so two requests
+        # cannot both take the same gate slot
+        with gate_schedule.lock:
+            conflicts = gate_schedule.conflicts(
+                flight_data.get('Airport_ID'), flight_data.get('Gate_no'), flight_data.get('arrival_time'), flight_data.get('Flight_no')
+            )
+            if conflicts and not allow_conflict:
+                raise HTTPException(status_code=409, detail={"message": "Gate is already in use at that time", "conflicts": conflicts})
+            db.execute(insert_query, flight_data)
+            db.commit()
+            changes.tables_changed("Flight")
+            changes.rows_changed("Flight", "insert", [flight_data])
+        response = {"message": "Flight added successfully", "flight_no": flight_data['Flight_no']}
+        if conflicts:
+            response["gate_conflicts"] = conflicts
+        return response
+    except HTTPException:
+        raise
     except Exception as e:
         db.rollback()
         print(f"Error: {e}")
@@ -197,11 +236,18 @@ def add_flight(flight_data: dict, db: Session = Depends(get_db)):
 @app.delete("/api/flight-schedule/delete/{flight_no}")
 def delete_flight(flight_no: str, db: Session = Depends(get_db)):
     try:
+        removed = capture_passengers(db, FLIGHT_SCOPE, flight_no)
+        revenue.tickets_removed(db, FLIGHT_SCOPE["dependents"], {"key": flight_no})
         delete_query = text("DELETE FROM Flight WHERE Flight_no = :flight_no")
         result = db.execute(delete_query, {"flight_no": flight_no})
         if result.rowcount == 0:
             raise HTTPException(status_code=404, detail="Flight not found")
-        db.commit()
+        with report_counters.writing():
+            db.commit()
+            report_counters.passengers_removed(removed)
+        # deleting a flight cascades to its passengers, tickets and baggage
+        changes.tables_changed("Flight", "Passenger", "Ticket", "Baggage")
+        changes.rows_changed("Flight", "delete", [{"Flight_no": flight_no}])
         return {"message": "Flight deleted successfully", "flight_no": flight_no}
     except HTTPException:
         raise
@@ -211,51 +257,89 @@ def delete_flight(flight_no: str, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/employees")
-def get_employees(db: Session = Depends(get_db)):
+async def get_employees(
+    cursor: Optional[int] = None,
+    limit: int = Query(listings.DEFAULT_PAGE_SIZE, ge=1, le=listings.MAX_PAGE_SIZE),
+    fields: Optional[str] = None,
+    airport: Optional[str] = None,
+    job_title: Optional[str] = None,
+    columnar: bool = False,
+    db: AsyncSession = Depends(get_async_db)
+):
     try:
-        employees = db.execute(text("SELECT * FROM Employee")).fetchall()
-        employee_list = []
-        for emp in employees:
-            employee_list.append({
-                'Employee_ID': emp.Employee_ID,
-                'F_Name': emp.F_Name,
-                'M_Initial': emp.M_Initial,
-                'L_Name': emp.L_Name,
-                'Employee_name': emp.Employee_name,
-                'Hire_date': emp.Hire_date.isoformat() if emp.Hire_date else None,
-                'Employee_Salary': emp.Employee_Salary,
-                'Job_title': emp.Job_title,
-                'Airport_ID': emp.Airport_ID,
-                'pwd': emp.pwd
-            })
-        return {"employees": employee_list}
+        employee_list, next_cursor = await listings.fetch_page_async(
+            db, listings.EMPLOYEES, cursor, limit, fields,
+            {"airport": airport, "job_title": job_title}, columnar
+        )
+        return page_response("employees", employee_list, next_cursor, listings.EMPLOYEES.select_fields(fields) if columnar else None)
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/api/employees/add")
-def add_employee(employee_data: dict, db: Session = Depends(get_db)):
+@app.get("/api/employees/export")
+def export_employees(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    fields: Optional[str] = None,
+    airport: Optional[str] = None,
+    job_title: Optional[str] = None
+):
+    try:
+        return export.export_response(
+            listings.EMPLOYEES, format, fields,
+            {"airport": airport, "job_title": job_title},
+            "employees"
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+def insert_employee(db, employee_data):
+    insert_query = text("""
+        INSERT INTO Employee (Employee_ID, F_Name, M_Initial, L_Name, Employee_name, Hire_date, Employee_Salary, Job_title, Airport_ID, pwd)
+        VALUES (:Employee_ID, :F_Name, :M_Initial, :L_Name, :Employee_name, :Hire_date, :Employee_Salary, :Job_title, :Airport_ID, :pwd)
+    """)
     try:
-        insert_query = text("""
-            INSERT INTO Employee (Employee_ID, F_Name, M_Initial, L_Name, Employee_name, Hire_date, Employee_Salary, Job_title, Airport_ID, pwd)
-            VALUES (:Employee_ID, :F_Name, :M_Initial, :L_Name, :Employee_name, :Hire_date, :Employee_Salary, :Job_title, :Airport_ID, :pwd)
-        """)
         db.execute(insert_query, employee_data)
-        db.commit()
+        added = capture_employees(db, "Employee_ID = :id", {"id": employee_data['Employee_ID']})
+        with report_counters.writing():
+            db.commit()
+            report_counters.employees_added(added)
+    except Exception:
+        db.rollback()
+        raise
+    changes.tables_changed("Employee")
+    changes.rows_changed("Employee", "insert", [{k: v for k, v in employee_data.items() if k != 'pwd'}])
+
+@app.post("/api/employees/add")
+async def add_employee(employee_data: dict, db: Session = Depends(get_db)):
+    try:
+        if employee_data.get('pwd'):
+            employee_data['pwd'] = await hash_pool.run(hash_password, employee_data['pwd'])
+        await run_in_threadpool(insert_employee, db, employee_data)
         return {"message": "Employee added successfully", "employee_id": employee_data['Employee_ID']}
+    except HashPoolBusy:
+        raise HTTPException(status_code=503, detail="Too many password hashes in progress, try again", headers={"Retry-After": "1"})
     except Exception as e:
-        db.rollback()
         print(f"Error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.delete("/api/employees/delete/{employee_id}")
 def delete_employee(employee_id: int, db: Session = Depends(get_db)):
     try:
+        removed = capture_employees(db, "Employee_ID = :id", {"id": employee_id})
         delete_query = text("DELETE FROM Employee WHERE Employee_ID = :id")
         result = db.execute(delete_query, {"id": employee_id})
         if result.rowcount == 0:
             raise HTTPException(status_code=404, detail="Employee not found")
-        db.commit()
+        with report_counters.writing():
+            db.commit()
+            report_counters.employees_removed(removed)
+        changes.tables_changed("Employee", "Crew")
+        changes.rows_changed("Employee", "delete", [{"Employee_ID": employee_id}])
         return {"message": "Employee deleted successfully", "employee_id": employee_id}
     except HTTPException:
         raise
@@ -276,55 +360,65 @@ def get_average_salary(db: Session = Depends(get_db)):
 
 
 @app.get("/api/crew")
-def get_crew(db: Session = Depends(get_db)):
+async def get_crew(
+    cursor: Optional[int] = None,
+    limit: int = Query(listings.DEFAULT_PAGE_SIZE, ge=1, le=listings.MAX_PAGE_SIZE),
+    fields: Optional[str] = None,
+    flight_no: Optional[str] = None,
+    role: Optional[str] = None,
+    airport: Optional[str] = None,
+    terminal: Optional[int] = None,
+    columnar: bool = False,
+    db: AsyncSession = Depends(get_async_db)
+):
     try:
-        query = text("""
-            SELECT c.Crew_ID, c.Crew_role, c.Employee_ID, e.Employee_name, c.Flight_no, f.src_city, f.des_city
-            FROM Crew c
-            JOIN Employee e ON c.Employee_ID = e.Employee_ID
-            JOIN Flight f ON c.Flight_no = f.Flight_no
-        """)
-        crew_members = db.execute(query).fetchall()
-        crew_list = []
-        for c in crew_members:
-            crew_list.append({
-                'Crew_ID': c.Crew_ID,
-                'Crew_role': c.Crew_role,
-                'Employee_ID': c.Employee_ID,
-                'Employee_name': c.Employee_name,
-                'Flight_no': c.Flight_no,
-                'src_city': c.src_city,
-                'des_city': c.des_city
-            })
-        return {"crew": crew_list}
+        crew_list, next_cursor = await listings.fetch_page_async(
+            db, listings.CREW, cursor, limit, fields,
+            {"flight_no": flight_no, "role": role, "airport": airport, "terminal": terminal}, columnar
+        )
+        return page_response("crew", crew_list, next_cursor, listings.CREW.select_fields(fields) if columnar else None)
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/flights-list")
-def get_flights_list(db: Session = Depends(get_db)):
+async def get_flights_list(
+    cursor: Optional[str] = None,
+    limit: int = Query(listings.DEFAULT_PAGE_SIZE, ge=1, le=listings.MAX_PAGE_SIZE),
+    fields: Optional[str] = None,
+    airport: Optional[str] = None,
+    terminal: Optional[int] = None,
+    status: Optional[str] = None,
+    gate: Optional[str] = None,
+    src_city: Optional[str] = None,
+    des_city: Optional[str] = None,
+    columnar: bool = False
+):
     try:
-        flights = db.execute(text("SELECT Flight_no, src_city, des_city FROM Flight")).fetchall()
-        flight_list = []
-        for f in flights:
-            flight_list.append({
-                'Flight_no': f.Flight_no,
-                'src_city': f.src_city,
-                'des_city': f.des_city
-            })
-        return {"flights": flight_list}
+        await flight_index.ensure_loaded()
+        flight_list, next_cursor = flight_index.page(
+            listings.FLIGHTS_LIST, cursor, limit, fields,
+            {"airport": airport, "terminal": terminal, "status": status, "gate": gate, "src_city": src_city, "des_city": des_city},
+            columnar
+        )
+        return page_response("flights", flight_list, next_cursor, listings.FLIGHTS_LIST.select_fields(fields) if columnar else None)
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+CREW_EMPLOYEES_QUERY = text("""
+    SELECT Employee_ID, Employee_name, Job_title FROM Employee
+    WHERE Job_title IN ('Pilot', 'Flight Attendant')
+""")
+
 @app.get("/api/crew-employees")
-def get_crew_employees(db: Session = Depends(get_db)):
+async def get_crew_employees(db: AsyncSession = Depends(get_async_db)):
     try:
-        query = text("""
-            SELECT Employee_ID, Employee_name, Job_title FROM Employee
-            WHERE Job_title IN ('Pilot', 'Flight Attendant')
-        """)
-        employees = db.execute(query).fetchall()
+        employees = (await db.execute(CREW_EMPLOYEES_QUERY)).fetchall()
         employee_list = []
         for emp in employees:
             employee_list.append({
@@ -355,6 +449,8 @@ def assign_crew_to_flight(assignment_data: dict, db: Session = Depends(get_db)):
         if result.rowcount == 0:
             raise HTTPException(status_code=404, detail="Crew member not found or already assigned")
         db.commit()
+        changes.tables_changed("Crew")
+        changes.rows_changed("Crew", "update", [{"Crew_ID": crew_id, "Flight_no": flight_no}])
         return {"message": "Crew member assigned successfully", "crew_id": crew_id, "flight_no": flight_no}
     except HTTPException:
         raise
@@ -366,11 +462,17 @@ def assign_crew_to_flight(assignment_data: dict, db: Session = Depends(get_db)):
 @app.delete("/api/crew/delete/{crew_id}")
 def delete_crew(crew_id: int, db: Session = Depends(get_db)):
     try:
+        removed = capture_employees(db, "Employee_ID IN (SELECT Employee_ID FROM Crew WHERE Crew_ID = :id)", {"id": crew_id})
         delete_query = text("DELETE FROM Crew WHERE Crew_ID = :id")
         result = db.execute(delete_query, {"id": crew_id})
         if result.rowcount == 0:
             raise HTTPException(status_code=404, detail="Crew member not found")
-        db.commit()
+        with report_counters.writing():
+            db.commit()
+            report_counters.employees_removed(removed)
+        # the after_crew_delete trigger also removes the employee
+        changes.tables_changed("Crew", "Employee")
+        changes.rows_changed("Crew", "delete", [{"Crew_ID": crew_id}])
         return {"message": "Crew member deleted successfully", "crew_id": crew_id}
     except HTTPException:
         raise
@@ -380,30 +482,45 @@ def delete_crew(crew_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/flights")
-def get_flights(db: Session = Depends(get_db)):
+async def get_flights():
     try:
-        flights = db.execute(text("SELECT DISTINCT Flight_no FROM Flight")).fetchall()
-        return {"flights": [f[0] for f in flights]}
+        await flight_index.ensure_loaded()
+        return {"flights": flight_index.flight_numbers()}
     except Exception as e:
         print(f"Error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+# one row per passenger, bag and ticket, in a single round trip
+FLIGHT_PASSENGERS_QUERY = text("""
+    SELECT p.Passenger_ID, p.Passenger_name, p.Passenger_status,
+           b.Baggage_ID, b.Baggae_weight, t.Ticket_no
+    FROM Passenger p
+    LEFT JOIN Baggage b ON b.Passenger_ID = p.Passenger_ID
+    LEFT JOIN Ticket t ON t.Passenger_ID = p.Passenger_ID
+    WHERE p.Flight_no = :flight_no
+    ORDER BY p.Passenger_ID, b.Baggage_ID, t.Ticket_no
+""")
+
 @app.get("/api/flight/{flight_no}/passengers")
-def get_passengers_for_flight(flight_no: str, db: Session = Depends(get_db)):
+async def get_passengers_for_flight(flight_no: str, db: AsyncSession = Depends(get_async_db)):
     try:
-        passengers = db.execute(text("SELECT * FROM Passenger WHERE Flight_no = :flight_no"), {"flight_no": flight_no}).fetchall()
+        rows = (await db.execute(FLIGHT_PASSENGERS_QUERY, {"flight_no": flight_no})).fetchall()
 
+        # A passenger with several bags or tickets comes back on several rows;
+        # keep the first one, as the per-passenger lookups used to.
         passenger_list = []
-        for p in passengers:
-            baggage = db.execute(text("SELECT * FROM Baggage WHERE Passenger_ID = :pid"), {"pid": p.Passenger_ID}).first()
-            ticket = db.execute(text("SELECT * FROM Ticket WHERE Passenger_ID = :pid"), {"pid": p.Passenger_ID}).first()
+        seen = set()
+        for p in rows:
+            if p.Passenger_ID in seen:
+                continue
+            seen.add(p.Passenger_ID)
             passenger_list.append({
                 "Passenger_ID": p.Passenger_ID,
                 "Passenger_name": p.Passenger_name,
                 "Passenger_status": p.Passenger_status or "Normal",
-                "baggage_weight": baggage.Baggae_weight if baggage else None,
-                "baggage_id": baggage.Baggage_ID if baggage else None,
-                "ticket_id": ticket.Ticket_no if ticket else None,
+                "baggage_weight": p.Baggae_weight,
+                "baggage_id": p.Baggage_ID,
+                "ticket_id": p.Ticket_no,
             })
 
         normal = [p for p in passenger_list if p['Passenger_status'].lower() == "normal"]
@@ -418,11 +535,17 @@ def get_passengers_for_flight(flight_no: str, db: Session = Depends(get_db)):
 @app.delete("/api/passenger/{passenger_id}")
 def delete_passenger(passenger_id: int, db: Session = Depends(get_db)):
     try:
+        removed = capture_passengers(db, PASSENGER_SCOPE, passenger_id)
+        revenue.tickets_removed(db, PASSENGER_SCOPE["dependents"], {"key": passenger_id})
         delete_query = text("DELETE FROM Passenger WHERE Passenger_ID = :id")
         result = db.execute(delete_query, {"id": passenger_id})
         if result.rowcount == 0:
             raise HTTPException(status_code=404, detail="Passenger not found")
-        db.commit()
+        with report_counters.writing():
+            db.commit()
+            report_counters.passengers_removed(removed)
+        changes.tables_changed("Passenger", "Ticket", "Baggage")
+        changes.rows_changed("Passenger", "delete", [{"Passenger_ID": passenger_id}])
         return {"message": "Deleted"}
     except HTTPException:
         raise
@@ -438,7 +561,15 @@ def update_passenger_status(passenger_id: int, status_update: StatusUpdate, db:
         result = db.execute(update_query, {"status": status_update.status, "id": passenger_id})
         if result.rowcount == 0:
             raise HTTPException(status_code=404, detail="Passenger not found")
+        # a passenger who is no longer ill frees their medic
+        released = 0
+        if status_update.status != ILLNESS_STATUS:
+            released = db.execute(text("DELETE FROM MEDICAL_ASSIGNED WHERE Passenger_ID = :id"), {"id": passenger_id}).rowcount
         db.commit()
+        changes.tables_changed("Passenger", "MEDICAL_ASSIGNED")
+        changes.rows_changed("Passenger", "update", [{"Passenger_ID": passenger_id, "Passenger_status": status_update.status}])
+        if released:
+            changes.rows_changed("MEDICAL_ASSIGNED", "delete", [{"Passenger_ID": passenger_id}])
         return {"message": "Updated"}
     except HTTPException:
         raise
@@ -448,36 +579,9 @@ def update_passenger_status(passenger_id: int, status_update: StatusUpdate, db:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/ground_operations/data")
-def get_ground_operations_data(db: Session = Depends(get_db)):
+async def get_ground_operations_data():
     try:
-        medical_staff = db.execute(text("""
-            SELECT Employee_ID, Employee_name, Job_title 
-            FROM Employee 
-            WHERE Job_title IN ('Medical staff', 'Medical staffs')
-        """)).fetchall()
-        ground_engineers = db.execute(text("""
-            SELECT Employee_ID, Employee_name, Job_title 
-            FROM Employee 
-            WHERE Job_title = 'Ground Engineer'
-        """)).fetchall()
-        ill_passengers = db.execute(text("""
-            SELECT p.Passenger_ID, p.Passenger_name, p.Passenger_status, p.Flight_no, f.src_city, f.des_city
-            FROM Passenger p
-            JOIN Flight f ON p.Flight_no = f.Flight_no
-            WHERE p.Passenger_status = 'Illness'
-        """)).fetchall()
-        arrival_flights = db.execute(text("""
-            SELECT Flight_no, src_city, des_city, Airline_name, arrival_time
-            FROM Flight
-            WHERE Flight_status = 'Arrival'
-        """)).fetchall()
-
-        return {
-            "medical_staff": [{"Employee_ID": m.Employee_ID, "Employee_name": m.Employee_name, "Job_title": m.Job_title} for m in medical_staff],
-            "ground_engineers": [{"Employee_ID": g.Employee_ID, "Employee_name": g.Employee_name, "Job_title": g.Job_title} for g in ground_engineers],
-            "ill_passengers": [{"Passenger_ID": p.Passenger_ID, "Passenger_name": p.Passenger_name, "Passenger_status": p.Passenger_status, "Flight_no": p.Flight_no, "src_city": p.src_city, "des_city": p.des_city} for p in ill_passengers],
-            "arrival_flights": [{"Flight_no": f.Flight_no, "src_city": f.src_city, "des_city": f.des_city, "Airline_name": f.Airline_name, "arrival_time": str(f.arrival_time) if f.arrival_time else None} for f in arrival_flights]
-        }
+        return await ground_operations_snapshot.get()
     except Exception as e:
         print(f"Error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -487,12 +591,17 @@ def get_ground_operations_data(db: Session = Depends(get_db)):
 def assign_medical_staff(data: dict, db: Session = Depends(get_db)):
     try:
         passenger_id = data.get("Passenger_ID")
+        # without an Employee_ID the dispatcher picks the nearest least loaded medic
         staff_id = data.get("Employee_ID")
 
-        if not passenger_id or not staff_id:
-            raise HTTPException(status_code=400, detail="Passenger_ID and Employee_ID are required")
-        return {"message": "Medical staff assigned successfully", "passenger_id": passenger_id, "staff_id": staff_id}
+        if not passenger_id:
+            raise HTTPException(status_code=400, detail="Passenger_ID is required")
+        staff_id, staff_name = dispatcher.assign(db, MEDICAL, passenger_id, staff_id)
+        return {"message": "Medical staff assigned successfully", "passenger_id": passenger_id, "staff_id": staff_id, "staff_name": staff_name}
+    except HTTPException:
+        raise
     except Exception as e:
+        db.rollback()
         print(f"Error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -503,10 +612,13 @@ def assign_ground_engineer(data: dict, db: Session = Depends(get_db)):
         flight_no = data.get("Flight_no")
         engineer_id = data.get("Employee_ID")
 
-        if not flight_no or not engineer_id:
-            raise HTTPException(status_code=400, detail="Flight_no and Employee_ID are required")
-
-        return {"message": "Ground engineer assigned successfully", "flight_no": flight_no, "engineer_id": engineer_id}
+        if not flight_no:
+            raise HTTPException(status_code=400, detail="Flight_no is required")
+        engineer_id, engineer_name = dispatcher.assign(db, ENGINEER, flight_no, engineer_id)
+        return {"message": "Ground engineer assigned successfully", "flight_no": flight_no, "engineer_id": engineer_id, "engineer_name": engineer_name}
+    except HTTPException:
+        raise
     except Exception as e:
+        db.rollback()
         print(f"Error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Date, Time, DECIMAL, BigInteger, ForeignKey
+from sqlalchemy import Column, Integer, String, Date, DateTime, Time, DECIMAL, BigInteger, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from database import Base
 
@@ -48,6 +48,11 @@ class Employee(Base):
     Airport_ID = Column(String(3), ForeignKey('Airport.Airport_ID'), nullable=False)
     pwd = Column(String(255))  # Store hashed password
 
+    __table_args__ = (
+        Index("idx_employee_name_job", "F_Name", "Job_title"),
+        Index("idx_employee_job", "Job_title", "Employee_name", "Employee_Salary"),
+    )
+
 
 # 5. Flight Table
 class Flight(Base):
@@ -63,6 +68,12 @@ class Flight(Base):
     Terminal = Column(Integer)
     src_city = Column(String(255)) 
     des_city = Column(String(255))  
+    Completed_at = Column(DateTime)
+
+    __table_args__ = (
+        Index("idx_flight_status", "Flight_status", "Flight_no"),
+        Index("idx_flight_completed", "Completed_at", "Flight_no"),
+    )
 
 
 
@@ -79,6 +90,11 @@ class Passenger(Base):
     Flight_no = Column(String(20), ForeignKey('Flight.Flight_no'), nullable=False)
     Passenger_status = Column(String(20))
 
+    __table_args__ = (
+        Index("idx_passenger_flight", "Flight_no", "Passenger_status"),
+        Index("idx_passenger_status", "Passenger_status", "Flight_no"),
+    )
+
 
 # 7. Gate Table
 class Gate(Base):
@@ -98,6 +114,10 @@ class Crew(Base):
     Flight_no = Column(String(20), ForeignKey('Flight.Flight_no'), primary_key=True)
     Crew_role = Column(String(100))
 
+    __table_args__ = (
+        Index("idx_crew_flight", "Flight_no"),
+    )
+
 
 # 9. Baggage Table
 class Baggage(Base):
@@ -108,6 +128,12 @@ class Baggage(Base):
     Flight_no = Column(String(20), ForeignKey('Flight.Flight_no'), primary_key=True)
     Baggae_weight = Column(DECIMAL(10, 2))
     Baggage_status = Column(String(50))
+    # when the stored status was scanned; an older scan does not overwrite it
+    Last_scanned_at = Column(DateTime)
+
+    __table_args__ = (
+        Index("idx_baggage_passenger", "Passenger_ID", "Baggage_ID", "Baggae_weight"),
+    )
 
 
 # 10. Ticket Table
@@ -120,6 +146,13 @@ class Ticket(Base):
     Price = Column(DECIMAL(10, 2))
     Seat_No = Column(String(10))
     Booking_date = Column(Date)
+    Class = Column(String(20), default="Economy")
+
+    __table_args__ = (
+        Index("idx_ticket_passenger", "Passenger_ID", "Ticket_no"),
+        # MySQL already has this one from fk_ticket_flight
+        Index("idx_ticket_flight", "Flight_no"),
+    )
 
 
 # 11. FE_ASSIGNED Table
@@ -129,6 +162,10 @@ class FE_ASSIGNED(Base):
     Employee_ID = Column(Integer, ForeignKey('Employee.Employee_ID'), primary_key=True)
     Flight_no = Column(String(20), ForeignKey('Flight.Flight_no'), primary_key=True)
 
+    __table_args__ = (
+        Index("idx_fe_flight", "Flight_no", "Employee_ID"),
+    )
+
 
 # 12. Boards Table
 class Boards(Base):
@@ -152,3 +189,159 @@ class Passenger_phone(Base):
     
     Passenger_ID = Column(Integer, ForeignKey('Passenger.Passenger_ID'), primary_key=True)
     Passenger_phone = Column(BigInteger, primary_key=True)
+
+
+# 15. MEDICAL_ASSIGNED Table
+class MEDICAL_ASSIGNED(Base):
+    __tablename__ = "MEDICAL_ASSIGNED"
+
+    Passenger_ID = Column(Integer, ForeignKey('Passenger.Passenger_ID'), primary_key=True)
+    Employee_ID = Column(Integer, ForeignKey('Employee.Employee_ID'), nullable=False)
+
+    __table_args__ = (
+        Index("idx_medical_employee", "Employee_ID", "Passenger_ID"),
+    )
+
+
+# 16.-23. Archive tables. Archive_date is the day the flight completed; in
+# MySQL every archive table is range partitioned on it (see mini_project.sql).
+class Flight_archive(Base):
+    __tablename__ = "Flight_archive"
+
+    Archive_date = Column(Date, primary_key=True)
+    Flight_no = Column(String(20), primary_key=True)
+    Airline_name = Column(String(255))
+    Flight_status = Column(String(20))
+    arrival_time = Column(Time)
+    Airport_ID = Column(String(3), nullable=False)
+    Airline_ID = Column(Integer, nullable=False)
+    Gate_no = Column(String(10))
+    Terminal = Column(Integer)
+    src_city = Column(String(255))
+    des_city = Column(String(255))
+    Completed_at = Column(DateTime)
+
+    __table_args__ = (
+        Index("idx_flight_archive_no", "Flight_no", "Archive_date"),
+        Index("idx_flight_archive_airport", "Airport_ID", "Archive_date"),
+    )
+
+
+class Passenger_archive(Base):
+    __tablename__ = "Passenger_archive"
+
+    Archive_date = Column(Date, primary_key=True)
+    Passenger_ID = Column(Integer, primary_key=True)
+    F_Name = Column(String(100), nullable=False)
+    M_Name = Column(String(100))
+    L_Name = Column(String(100), nullable=False)
+    Passenger_name = Column(String(200))
+    DOB = Column(Date)
+    Passenger_Address = Column(String(255))
+    Flight_no = Column(String(20), nullable=False)
+    Passenger_status = Column(String(20))
+
+    __table_args__ = (
+        Index("idx_passenger_archive_flight", "Flight_no", "Archive_date"),
+    )
+
+
+class Ticket_archive(Base):
+    __tablename__ = "Ticket_archive"
+
+    Archive_date = Column(Date, primary_key=True)
+    Ticket_no = Column(String(50), primary_key=True)
+    Flight_no = Column(String(20), primary_key=True)
+    Passenger_ID = Column(Integer, primary_key=True)
+    Price = Column(DECIMAL(10, 2))
+    Seat_No = Column(String(10))
+    Booking_date = Column(Date)
+    Class = Column(String(20), default="Economy")
+
+    __table_args__ = (
+        Index("idx_ticket_archive_passenger", "Passenger_ID", "Archive_date"),
+    )
+
+
+class Baggage_archive(Base):
+    __tablename__ = "Baggage_archive"
+
+    Archive_date = Column(Date, primary_key=True)
+    Baggage_ID = Column(Integer, primary_key=True)
+    Passenger_ID = Column(Integer, primary_key=True)
+    Flight_no = Column(String(20), primary_key=True)
+    Baggae_weight = Column(DECIMAL(10, 2))
+    Baggage_status = Column(String(50))
+
+    __table_args__ = (
+        Index("idx_baggage_archive_passenger", "Passenger_ID", "Archive_date"),
+    )
+
+
+class Boards_archive(Base):
+    __tablename__ = "Boards_archive"
+
+    Archive_date = Column(Date, primary_key=True)
+    Passenger_ID = Column(Integer, primary_key=True)
+    Flight_no = Column(String(20), primary_key=True)
+
+
+class Passenger_Email_archive(Base):
+    __tablename__ = "Passenger_Email_archive"
+
+    Archive_date = Column(Date, primary_key=True)
+    Passenger_ID = Column(Integer, primary_key=True)
+    Passenger_email = Column(String(50), primary_key=True)
+
+
+class Passenger_phone_archive(Base):
+    __tablename__ = "Passenger_phone_archive"
+
+    Archive_date = Column(Date, primary_key=True)
+    Passenger_ID = Column(Integer, primary_key=True)
+    Passenger_phone = Column(BigInteger, primary_key=True)
+
+
+class Crew_archive(Base):
+    __tablename__ = "Crew_archive"
+
+    Archive_date = Column(Date, primary_key=True)
+    Flight_no = Column(String(20), primary_key=True)
+    Crew_ID = Column(Integer, primary_key=True)
+    Crew_role = Column(String(100))
+    Employee_ID = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        Index("idx_crew_archive_employee", "Employee_ID", "Archive_date"),
+    )
+
+
+# 24.-25. Daily revenue rollups of Ticket (see revenue.py). No foreign keys:
+# the rows outlive the flights they count once those are archived.
+class Revenue_daily_flight(Base):
+    __tablename__ = "Revenue_daily_flight"
+
+    Booking_date = Column(Date, primary_key=True)
+    Flight_no = Column(String(20), primary_key=True)
+    Class = Column(String(20), primary_key=True)
+    Airline_ID = Column(Integer, nullable=False)
+    Tickets = Column(Integer, nullable=False, default=0)
+    Revenue = Column(DECIMAL(14, 2), nullable=False, default=0)
+
+    __table_args__ = (
+        Index("idx_revenue_flight_no", "Flight_no", "Booking_date"),
+    )
+
+
+class Revenue_daily_airline(Base):
+    __tablename__ = "Revenue_daily_airline"
+
+    Booking_date = Column(Date, primary_key=True)
+    Airline_ID = Column(Integer, primary_key=True)
+    Class = Column(String(20), primary_key=True)
+    Tickets = Column(Integer, nullable=False, default=0)
+    Revenue = Column(DECIMAL(14, 2), nullable=False, default=0)
+
+    __table_args__ = (
+        Index("idx_revenue_airline", "Airline_ID", "Booking_date"),
+    )
@@ -0,0 +1,465 @@
+import asyncio
+import os
+import threading
+import time
+from array import array
+from bisect import bisect_left
+
+import numpy as np
+from fastapi import APIRouter, HTTPException, Query
+from sqlalchemy import bindparam, text
+from starlette.concurrency import run_in_threadpool
+
+import changes
+from database import SessionLocal
+
+
+PASSENGER_SEARCH_REFRESH = int(os.getenv("PASSENGER_SEARCH_REFRESH", "3600"))
+# passengers written since the last full build are searched by a scan of
+# their own; past this many the index is rebuilt in the background
+PASSENGER_SEARCH_OVERLAY_ROWS = int(os.getenv("PASSENGER_SEARCH_OVERLAY_ROWS", "1000"))
+# candidates checked per lookup, which bounds a query on a very common prefix
+PASSENGER_SEARCH_SCAN = 2000
+# how often the background task checks whether a rebuild is due
+PASSENGER_SEARCH_CHECK = 5
+# rows fetched, and words turned into trigrams, per pass while building
+READ_CHUNK = 10_000
+TRIGRAM_CHUNK = 100_000
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+
+# score per query term: a whole word, the start of one, or anywhere in one
+EXACT, PREFIX, SUBSTRING = 3, 2, 1
+PHONE_CHARACTERS = set("0123456789 +-()")
+# numbers are stored without the country code
+PHONE_DIGITS = 10
+
+SELECT_PASSENGERS = "SELECT Passenger_ID, Passenger_name, F_Name, L_Name, Flight_no, Passenger_status FROM Passenger"
+SELECT_EMAILS = "SELECT Passenger_ID, Passenger_email FROM Passenger_Email"
+SELECT_PHONES = "SELECT Passenger_ID, Passenger_phone FROM Passenger_phone"
+
+search_router = APIRouter()
+
+
+def trigrams(word):
+    # each trigram of the UTF-8 bytes as one integer, as the index stores them
+    data = word.encode()
+    return {data[i] << 16 | data[i + 1] << 8 | data[i + 2] for i in range(len(data) - 2)}
+
+
+def query_terms(query):
+    query = query.strip().lower()
+    # "+91 98765-43210" is one phone number, not three words
+    if query and set(query) <= PHONE_CHARACTERS and any(c.isdigit() for c in query):
+        return ["".join(c for c in query if c.isdigit())[-PHONE_DIGITS:]]
+    return query.split()
+
+
+class PassengerRecord:
+    __slots__ = ("Passenger_ID", "Passenger_name", "Flight_no", "Passenger_status", "emails", "phones")
+
+    def __init__(self, passenger_id, name, first_name, last_name, flight_no, status):
+        self.Passenger_ID = passenger_id
+        self.Passenger_name = name or " ".join(part for part in (first_name, last_name) if part)
+        self.Flight_no = flight_no
+        self.Passenger_status = status
+        self.emails = ()
+        self.phones = ()
+
+    def tokens(self):
+        # what a query term is matched against: name words, whole emails
+        # (stored lowercased) and phone digits
+        return self.Passenger_name.lower().split() + list(self.emails) + list(self.phones)
+
+    def prefix_words(self):
+        # the tokens, and the whole name so that a name typed in order is
+        # one lookup
+        tokens = self.tokens()
+        name = self.Passenger_name.lower().split()
+        return tokens + [" ".join(name)] if len(name) > 1 else tokens
+
+    def trigram_words(self):
+        # the parts worth finding from the middle; every email shares its
+        # domain, so only the part before the @ counts
+        return [word for word in self.Passenger_name.lower().split() if len(word) >= 3] + \
+            [email.split("@")[0] for email in self.emails] + list(self.phones)
+
+    def score(self, terms):
+        tokens = self.tokens()
+        total = 0
+        for term in terms:
+            best = 0
+            for token in tokens:
+                if token == term:
+                    best = EXACT
+                    break
+                if token.startswith(term):
+                    best = PREFIX
+                elif not best and term in token:
+                    best = SUBSTRING
+            if not best:
+                return 0
+            total += best
+        return total
+
+    def as_dict(self, score):
+        return {
+            "Passenger_ID": self.Passenger_ID,
+            "Passenger_name": self.Passenger_name,
+            "Flight_no": self.Flight_no,
+            "Passenger_status": self.Passenger_status or "Normal",
+            "emails": list(self.emails),
+            "phones": list(self.phones),
+            "score": score
+        }
+
+
+def read_records(db, passenger_ids=None):
+    where = " WHERE Passenger_ID IN :ids" if passenger_ids is not None else ""
+    params = {"ids": list(passenger_ids)} if passenger_ids is not None else {}
+
+    def fetch(sql):
+        query = text(sql + where)
+        if where:
+            query = query.bindparams(bindparam("ids", expanding=True))
+        # plain tuples off the DBAPI cursor, a chunk at a time; a Row per
+        # passenger costs more than the read at millions of them
+        result = db.execute(query, params)
+        try:
+            while True:
+                rows = result.cursor.fetchmany(READ_CHUNK)
+                if not rows:
+                    return
+                yield from rows
+        finally:
+            result.close()
+
+    # one copy of each flight number and status, however many passengers
+    # share it
+    shared = {}
+    records = {}
+    for passenger_id, name, first_name, last_name, flight_no, status in fetch(SELECT_PASSENGERS):
+        records[passenger_id] = PassengerRecord(
+            passenger_id, name, first_name, last_name, shared.setdefault(flight_no, flight_no), shared.setdefault(status, status)
+        )
+    emails = {}
+    for passenger_id, email in fetch(SELECT_EMAILS):
+        emails.setdefault(passenger_id, []).append(email.lower())
+    phones = {}
+    for passenger_id, phone in fetch(SELECT_PHONES):
+        phones.setdefault(passenger_id, []).append(str(phone))
+    for passenger_id, values in emails.items():
+        if passenger_id in records:
+            records[passenger_id].emails = tuple(sorted(values))
+    for passenger_id, values in phones.items():
+        if passenger_id in records:
+            records[passenger_id].phones = tuple(sorted(values))
+    return records
+
+
+def build_prefix_index(records):
+    # distinct words in order, each owning a run of the ID array:
+    # ids[offsets[i]:offsets[i + 1]] hold words[i]
+    by_word = {}
+    for record in records.values():
+        passenger_id = record.Passenger_ID
+        for word in set(record.prefix_words()):
+            owners = by_word.get(word)
+            if owners is None:
+                # most words (emails, phones) have one owner; keep it bare
+                by_word[word] = passenger_id
+            elif type(owners) is list:
+                owners.append(passenger_id)
+            else:
+                by_word[word] = [owners, passenger_id]
+    words = sorted(by_word)
+    offsets = array("I", [0])
+    ids = array("I")
+    for word in words:
+        owners = by_word[word]
+        if type(owners) is list:
+            ids.extend(sorted(owners))
+        else:
+            ids.append(owners)
+        offsets.append(len(ids))
+    return words, np.frombuffer(offsets, dtype=np.uint32), np.frombuffer(ids, dtype=np.uint32)
+
+
+def trigram_keys(words, owners):
+    # every (trigram, passenger) pair as one 64-bit key, from a byte matrix
+    # of the words
+    chunk = np.array(words, dtype=bytes)
+    width = chunk.dtype.itemsize
+    if width < 3:
+        return np.zeros(0, dtype=np.uint64)
+    chars = chunk.view(np.uint8).reshape(len(chunk), width).astype(np.uint32)
+    grams = chars[:, :-2] << 16 | chars[:, 1:-1] << 8 | chars[:, 2:]
+    # rows are zero-padded past the end of each word
+    rows, columns = np.nonzero(chars[:, 2:])
+    return grams[rows, columns].astype(np.uint64) << 32 | np.array(owners, dtype=np.uint64)[rows]
+
+
+def build_trigram_index(records):
+    # sorted keys group into one run of passenger IDs per trigram
+    keys = [np.zeros(0, dtype=np.uint64)]
+    words = []
+    owners = []
+    for record in records.values():
+        for word in record.trigram_words():
+            words.append(word.encode())
+            owners.append(record.Passenger_ID)
+        if len(words) >= TRIGRAM_CHUNK:
+            keys.append(trigram_keys(words, owners))
+            words, owners = [], []
+    if words:
+        keys.append(trigram_keys(words, owners))
+    keys = np.concatenate(keys)
+    keys.sort()
+    # a trigram twice in one passenger's words is one entry
+    keys = keys[np.r_[True, keys[1:] != keys[:-1]]] if len(keys) else keys
+    codes = keys >> 32
+    ids = (keys & 0xFFFFFFFF).astype(np.uint32)
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]]) if len(keys) else np.zeros(0, dtype=np.int64)
+    ends = np.r_[starts[1:], len(keys)]
+    return ids, dict(zip(codes[starts].tolist(), zip(starts.tolist(), ends.tolist())))
+
+
+class PassengerSearch:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self.loaded = False
+        self._building = False
+        self._records = {}
+        self._by_flight = {}
+        self._words, self._word_offsets, self._word_ids = build_prefix_index({})
+        self._trigram_ids, self._trigrams = build_trigram_index({})
+        # written since the build: their entries above are not to be trusted
+        # (stale), and the current ones are scanned instead (overlay)
+        self._stale = set()
+        self._overlay = set()
+        # written while a build is running
+        self._dirty = set()
+
+    def load(self):
+        with self._load_lock:
+            self._build()
+
+    def _build(self):
+        # callers hold _load_lock
+        with self._lock:
+            self._building = True
+            self._dirty = set()
+        try:
+            db = SessionLocal()
+            try:
+                records = read_records(db)
+            finally:
+                db.close()
+            words, word_offsets, word_ids = build_prefix_index(records)
+            trigram_ids, trigram_runs = build_trigram_index(records)
+            by_flight = {}
+            for record in records.values():
+                by_flight.setdefault(record.Flight_no, set()).add(record.Passenger_ID)
+            with self._lock:
+                # passengers written during the build keep what the
+                # writes left, and are scanned until the next build
+                overlay = set()
+                for passenger_id in self._dirty:
+                    stored = records.pop(passenger_id, None)
+                    if stored is not None:
+                        by_flight[stored.Flight_no].discard(passenger_id)
+                    current = self._records.get(passenger_id)
+                    if current is not None:
+                        records[passenger_id] = current
+                        by_flight.setdefault(current.Flight_no, set()).add(passenger_id)
+                        overlay.add(passenger_id)
+                self._records = records
+                self._by_flight = by_flight
+                self._words, self._word_offsets, self._word_ids = words, word_offsets, word_ids
+                self._trigram_ids, self._trigrams = trigram_ids, trigram_runs
+                self._stale = set(self._dirty)
+                self._overlay = overlay
+                self.loaded = True
+        finally:
+            with self._lock:
+                self._building = False
+
+    def _load_once(self):
+        # checked under the build lock, so concurrent first searches build
+        # the index once
+        with self._load_lock:
+            if not self.loaded:
+                self._build()
+
+    async def ensure_loaded(self):
+        if not self.loaded:
+            await run_in_threadpool(self._load_once)
+
+    def _put(self, record):
+        old = self._records.get(record.Passenger_ID)
+        if old is not None:
+            self._by_flight.get(old.Flight_no, set()).discard(old.Passenger_ID)
+        self._records[record.Passenger_ID] = record
+        self._by_flight.setdefault(record.Flight_no, set()).add(record.Passenger_ID)
+        if self._building:
+            self._dirty.add(record.Passenger_ID)
+        # a status or flight change leaves the indexed words as they were
+        if old is None or old.tokens() != record.tokens() or record.Passenger_ID in self._overlay:
+            self._stale.add(record.Passenger_ID)
+            self._overlay.add(record.Passenger_ID)
+
+    def _drop(self, passenger_id):
+        record = self._records.pop(passenger_id, None)
+        if record is not None:
+            self._by_flight.get(record.Flight_no, set()).discard(passenger_id)
+        if self._building:
+            self._dirty.add(passenger_id)
+        self._stale.add(passenger_id)
+        self._overlay.discard(passenger_id)
+
+    def refresh(self, passenger_ids):
+        # re-read the given passengers so the index holds what MySQL stored.
+        # A large write only grows the overlay: search_refresh_loop rebuilds
+        # once it is too big, off the writer's thread
+        db = SessionLocal()
+        try:
+            records = read_records(db, passenger_ids)
+        finally:
+            db.close()
+        with self._lock:
+            for passenger_id in passenger_ids:
+                if passenger_id in records:
+                    self._put(records[passenger_id])
+                else:
+                    self._drop(passenger_id)
+
+    def needs_rebuild(self):
+        return len(self._overlay) > PASSENGER_SEARCH_OVERLAY_ROWS
+
+    def remove(self, passenger_ids):
+        with self._lock:
+            for passenger_id in passenger_ids:
+                self._drop(passenger_id)
+
+    def on_rows_changed(self, table, op, rows):
+        if not self.loaded and not self._building:
+            return
+        if table == "Flight" and op == "delete":
+            # passengers go with their flight
+            with self._lock:
+                passenger_ids = [
+                    passenger_id for row in rows for passenger_id in self._by_flight.get(row["Flight_no"], ())
+                ]
+            self.remove(passenger_ids)
+        elif table == "Passenger" and op == "delete":
+            self.remove([row["Passenger_ID"] for row in rows])
+        elif table in ("Passenger", "Passenger_Email", "Passenger_phone"):
+            self.refresh(list({row["Passenger_ID"] for row in rows}))
+
+    def _prefix_ids(self, term):
+        # owners of the words starting with the term, in word order so whole
+        # words come first
+        start = bisect_left(self._words, term)
+        end = bisect_left(self._words, term + "\uffff", start)
+        return self._word_ids[self._word_offsets[start]:self._word_offsets[end]]
+
+    def _trigram_ids_for(self, term):
+        # passengers holding all of the term's trigrams: the rarest run,
+        # filtered by binary search in each of the others (runs are sorted)
+        runs = [self._trigrams.get(gram) for gram in trigrams(term)]
+        if not runs or None in runs:
+            return self._trigram_ids[:0]
+        ids = sorted((self._trigram_ids[start:end] for start, end in runs), key=len)
+        candidates = ids[0]
+        for other in ids[1:]:
+            if not len(candidates):
+                break
+            positions = np.minimum(np.searchsorted(other, candidates), len(other) - 1)
+            candidates = candidates[other[positions] == candidates]
+        return candidates
+
+    def _lookup(self, terms, limit, hits):
+        def consider(candidates):
+            for passenger_id in candidates[:PASSENGER_SEARCH_SCAN].tolist():
+                if len(hits) >= limit:
+                    return
+                if passenger_id in hits or passenger_id in self._stale:
+                    continue
+                score = self._records[passenger_id].score(terms)
+                if score:
+                    hits[passenger_id] = score
+
+        # the whole query as a prefix (a name typed in order), then the
+        # term with the fewest words starting with it, then the longest
+        # term from the middle of a word; every candidate is scored on all
+        # the terms
+        if len(terms) > 1:
+            consider(self._prefix_ids(" ".join(terms)))
+        if len(hits) < limit:
+            consider(min((self._prefix_ids(term) for term in terms), key=len))
+        driver = max(terms, key=len).split("@")[0]
+        if len(hits) < limit and len(driver) >= 3:
+            consider(self._trigram_ids_for(driver))
+
+        for passenger_id in self._overlay:
+            score = self._records[passenger_id].score(terms)
+            if score:
+                hits[passenger_id] = score
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        terms = query_terms(query)
+        if not terms:
+            return []
+        hits = {}
+        with self._lock:
+            self._lookup(terms, limit, hits)
+            records = [(self._records[passenger_id], score) for passenger_id, score in hits.items()]
+        records.sort(key=lambda item: (-item[1], item[0].Passenger_name.lower(), item[0].Passenger_ID))
+        return [record.as_dict(score) for record, score in records[:limit]]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "loaded": self.loaded,
+                "passengers": len(self._records),
+                "words": len(self._words),
+                "trigrams": len(self._trigrams),
+                "overlay": len(self._overlay)
+            }
+
+
+passenger_search = PassengerSearch()
+changes.on_rows_changed(passenger_search.on_rows_changed)
+
+
+async def search_refresh_loop(interval=PASSENGER_SEARCH_REFRESH):
+    # builds the index, rebuilds it once the writes since the last build
+    # outgrow the overlay, and every `interval` seconds to pick up writes
+    # made outside the API
+    built_at = None
+    while True:
+        if built_at is None or passenger_search.needs_rebuild() or time.monotonic() - built_at >= interval:
+            try:
+                await run_in_threadpool(passenger_search.load)
+            except Exception as e:
+                print(f"Error loading passenger search index: {e}")
+            built_at = time.monotonic()
+        await asyncio.sleep(PASSENGER_SEARCH_CHECK)
+
+
+@search_router.get("/api/passengers/search")
+async def search_passengers(q: str = Query(..., min_length=1), limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT)):
+    try:
+        await passenger_search.ensure_loaded()
+        return {"query": q, "passengers": passenger_search.search(q, limit)}
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@search_router.get("/api/passengers/search/status")
+async def get_search_status():
+    return passenger_search.stats()
@@ -0,0 +1,74 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from passlib.context import CryptContext
+
+
+AUTH_HASH_WORKERS = int(os.getenv("AUTH_HASH_WORKERS", str(os.cpu_count() or 2)))
+# sign-ins allowed to wait for a hash worker before new ones are turned away
+AUTH_MAX_PENDING = int(os.getenv("AUTH_MAX_PENDING", str(AUTH_HASH_WORKERS * 8)))
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+# Rows created before passwords were hashed still hold plaintext; they verify
+# through the deprecated scheme and are rehashed on the next successful sign-in.
+pwd_context = CryptContext(schemes=["bcrypt", "plaintext"], deprecated=["plaintext"], bcrypt__rounds=BCRYPT_ROUNDS)
+
+# Compared against when the user does not exist, so a wrong name costs as
+# much as a wrong password.
+DUMMY_HASH = pwd_context.hash("not a real password")
+
+
+class HashPoolBusy(Exception):
+    pass
+
+
+def hash_password(password):
+    return pwd_context.hash(password)
+
+
+def verify_password(password, stored_hash):
+    # returns (matched, new hash to store or None)
+    if not stored_hash:
+        pwd_context.verify(password, DUMMY_HASH)
+        return False, None
+    return pwd_context.verify_and_update(password, stored_hash)
+
+
+class HashPool:
+    # bcrypt is CPU-bound by design, so it runs in worker processes instead of
+    # the event loop or the request threadpool.
+    def __init__(self, workers=AUTH_HASH_WORKERS, max_pending=AUTH_MAX_PENDING):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self._executor = None
+
+    def executor(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    async def run(self, fn, *args):
+        if self.pending >= self.max_pending:
+            raise HashPoolBusy()
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor(), fn, *args)
+        finally:
+            self.pending -= 1
+
+    async def verify(self, password, stored_hash):
+        return await self.run(verify_password, password, stored_hash)
+
+    def hash_many(self, passwords):
+        # used from sync code (bulk inserts) that already runs off the event loop
+        return list(self.executor().map(hash_password, passwords, chunksize=16))
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+hash_pool = HashPool()
@@ -0,0 +1,292 @@
+import contextvars
+import functools
+import inspect
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+
+from database import async_engine, engine, pool_metrics
+
+
+# statements slower than this are logged with their parameters
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+# requests issuing more statements than this are logged (N+1 patterns)
+QUERY_COUNT_WARNING = int(os.getenv("QUERY_COUNT_WARNING", "50"))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250, 1000)
+# parameters that never go to the log
+REDACTED_PARAMETERS = ("pwd", "password")
+
+logger = logging.getLogger("airport.profiling")
+
+metrics_router = APIRouter()
+
+
+class RequestProfile:
+    __slots__ = ("route", "queries", "db_seconds", "endpoint_done")
+
+    def __init__(self):
+        self.route = None
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.endpoint_done = None
+
+
+# the profile of the request being served; sync endpoints run in a copy of
+# the request's context, so they update the same object
+current_profile = contextvars.ContextVar("current_profile", default=None)
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        # labels -> [count per bucket..., +Inf count], sum
+        self._series = {}
+
+    def observe(self, labels, value):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            counts = series[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            counts[-1] += 1
+            series[1] += value
+
+    def render(self, label_names):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted(self._series.items())
+            series = [(labels, (list(counts), total)) for labels, (counts, total) in series]
+        for labels, (counts, total) in series:
+            base = format_labels(label_names, labels)
+            for bound, count in zip(self.buckets, counts):
+                lines.append(f'{self.name}_bucket{{{base},le="{bound}"}} {count}')
+            lines.append(f'{self.name}_bucket{{{base},le="+Inf"}} {counts[-1]}')
+            lines.append(f"{self.name}_sum{{{base}}} {total:.6f}")
+            lines.append(f"{self.name}_count{{{base}}} {counts[-1]}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self._lock = threading.Lock()
+        self._values = defaultdict(int)
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] += amount
+
+    def render(self, label_names=()):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            base = format_labels(label_names, labels)
+            lines.append(f"{self.name}{{{base}}} {value}" if base else f"{self.name} {value}")
+        return lines
+
+
+def format_labels(names, values):
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for value in values)
+    return ",".join(f'{name}="{value}"' for name, value in zip(names, escaped))
+
+
+ROUTE_LABELS = ("method", "route")
+
+request_seconds = Histogram("http_request_duration_seconds", "Time from request to the end of the response.", LATENCY_BUCKETS)
+db_seconds = Histogram("http_request_db_seconds", "Time spent in database statements per request.", LATENCY_BUCKETS)
+serialization_seconds = Histogram("http_request_serialization_seconds", "Time from the endpoint returning to the response starting (encoding and rendering).", LATENCY_BUCKETS)
+query_count = Histogram("http_request_queries", "Database statements issued per request.", QUERY_COUNT_BUCKETS)
+requests_total = Counter("http_requests_total", "Requests served.")
+slow_queries_total = Counter("db_slow_queries_total", f"Statements slower than SLOW_QUERY_MS ({SLOW_QUERY_MS:g} ms).")
+
+
+def printable_parameters(parameters):
+    if isinstance(parameters, dict):
+        return {key: "***" if key.lower() in REDACTED_PARAMETERS else value for key, value in parameters.items()}
+    if isinstance(parameters, list):
+        # executemany: the first few rows are enough to reproduce it
+        shown = [printable_parameters(row) for row in parameters[:3]]
+        return shown + [f"... {len(parameters) - 3} more"] if len(parameters) > 3 else shown
+    return parameters
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._profiling_start = time.perf_counter()
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, "_profiling_start", None)
+    if start is None:
+        return
+    elapsed = time.perf_counter() - start
+    profile = current_profile.get()
+    if profile is not None:
+        profile.queries += 1
+        profile.db_seconds += elapsed
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        slow_queries_total.inc()
+        logger.warning(
+            "Slow query (%.1f ms) in %s: %s | parameters: %s",
+            elapsed * 1000, profile.route if profile is not None else "background task", " ".join(statement.split()), printable_parameters(parameters)
+        )
+
+
+def instrument_engine(target):
+    event.listen(target, "before_cursor_execute", before_cursor_execute)
+    event.listen(target, "after_cursor_execute", after_cursor_execute)
+
+
+instrument_engine(engine)
+instrument_engine(async_engine.sync_engine)
+
+
+def timed_endpoint(call):
+    # marks when the endpoint itself returns, so the time until the response
+    # starts is FastAPI's encoding and rendering of the result
+    def mark_done():
+        profile = current_profile.get()
+        if profile is not None:
+            profile.endpoint_done = time.perf_counter()
+
+    if inspect.iscoroutinefunction(call):
+        @functools.wraps(call)
+        async def endpoint(*args, **kwargs):
+            try:
+                return await call(*args, **kwargs)
+            finally:
+                mark_done()
+    else:
+        @functools.wraps(call)
+        def endpoint(*args, **kwargs):
+            try:
+                return call(*args, **kwargs)
+            finally:
+                mark_done()
+    endpoint._profiled = True
+    return endpoint
+
+
+def api_routes(app):
+    # newer FastAPI releases keep included routers nested instead of copying
+    # their routes onto the app; each of their routes is served from its own
+    # context, with a dependant of its own
+    for route in app.routes:
+        if isinstance(route, APIRoute):
+            yield route
+        elif hasattr(route, "effective_route_contexts"):
+            yield from (context for context in route.effective_route_contexts() if isinstance(context.original_route, APIRoute))
+
+
+def instrument_routes(app):
+    # run once every route is registered (the app's lifespan does it)
+    for route in api_routes(app):
+        if not getattr(route.dependant.call, "_profiled", False):
+            route.dependant.call = timed_endpoint(route.dependant.call)
+
+
+class ProfilingMiddleware:
+    # Records latency, database time, serialization time and statement count
+    # per route template, and reports them to the client in Server-Timing.
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile()
+        # the route template is only known once routing has run
+        profile.route = scope["path"]
+        token = current_profile.set(profile)
+        start = time.perf_counter()
+        status = [500]
+        streaming = [False]
+        serialization = [0.0]
+
+        async def send_profiled(message):
+            if message["type"] == "http.response.start":
+                now = time.perf_counter()
+                status[0] = message["status"]
+                headers = message.setdefault("headers", [])
+                streaming[0] = any(k.lower() == b"content-type" and v.startswith(b"text/event-stream") for k, v in headers)
+                if profile.endpoint_done is not None:
+                    serialization[0] = max(now - profile.endpoint_done, 0.0)
+                app_seconds = max(now - start - profile.db_seconds - serialization[0], 0.0)
+                timing = f"db;dur={profile.db_seconds * 1000:.1f}, app;dur={app_seconds * 1000:.1f}, ser;dur={serialization[0] * 1000:.1f}"
+                message["headers"] = list(headers) + [(b"server-timing", timing.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_profiled)
+        finally:
+            current_profile.reset(token)
+            route = scope.get("route")
+            profile.route = route.path if route is not None else "unmatched"
+            labels = (scope["method"], profile.route)
+            requests_total.inc(labels + (str(status[0]),))
+            if not streaming[0]:
+                # event streams stay open for as long as the client listens
+                request_seconds.observe(labels, time.perf_counter() - start)
+                db_seconds.observe(labels, profile.db_seconds)
+                serialization_seconds.observe(labels, serialization[0])
+                query_count.observe(labels, profile.queries)
+            if profile.queries > QUERY_COUNT_WARNING:
+                logger.warning("%s %s issued %d statements", scope["method"], profile.route, profile.queries)
+            if status[0] >= 500:
+                logger.error("%s %s failed with %d after %.1f ms", scope["method"], profile.route, status[0], (time.perf_counter() - start) * 1000)
+
+
+def pool_gauges():
+    lines = []
+    gauges = [
+        ("db_pool_checked_out", "Connections in use.", "checked_out"),
+        ("db_pool_idle", "Idle connections in the pool.", "idle"),
+        ("db_pool_overflow", "Connections opened beyond pool_size.", "overflow")
+    ]
+    counters = [
+        ("db_pool_checkouts_total", "Connections handed out.", "checkouts"),
+        ("db_pool_timeouts_total", "Checkouts that timed out.", "timeouts"),
+        ("db_pool_wait_seconds_total", "Time spent waiting for a connection.", "wait_seconds_total")
+    ]
+    metrics = pool_metrics()
+    for kind, names in (("gauge", gauges), ("counter", counters)):
+        for name, help_text, key in names:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for pool_name, stats in metrics.items():
+                lines.append(f'{name}{{pool="{pool_name}"}} {stats[key]}')
+    return lines
+
+
+def render_metrics():
+    lines = []
+    for histogram in (request_seconds, db_seconds, serialization_seconds, query_count):
+        lines.extend(histogram.render(ROUTE_LABELS))
+    lines.extend(requests_total.render(ROUTE_LABELS + ("status",)))
+    lines.extend(slow_queries_total.render())
+    lines.extend(pool_gauges())
+    return "\n".join(lines) + "\n"
+
+
+@metrics_router.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
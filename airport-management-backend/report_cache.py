@@ -0,0 +1,82 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+
+import changes
+
+
+REPORT_CACHE_TTL = int(os.getenv("REPORT_CACHE_TTL", "300"))
+
+# tables each report reads; a write to any of them makes the report stale
+REPORT_TABLES = {
+    "flight-traffic": {"Flight"},
+    "employee-stats": {"Employee"},
+    "passenger-traffic": {"Passenger", "Ticket", "Baggage"},
+    "load-factor": {"Flight", "Ticket", "Aircraft"},
+    "route-rankings": {"Flight", "Ticket", "Aircraft"},
+    "airline-shares": {"Flight", "Ticket", "Aircraft"}
+}
+
+
+class CachedReport:
+    def __init__(self, body, expires_at):
+        self.body = body
+        self.etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        self.expires_at = expires_at
+
+
+class ReportCache:
+    def __init__(self, ttl=REPORT_CACHE_TTL):
+        self.ttl = ttl
+        self._entries = {}
+        self._generations = {name: 0 for name in REPORT_TABLES}
+        self._lock = threading.Lock()
+
+    def get(self, name, compute):
+        with self._lock:
+            entry = self._entries.get(name)
+            generation = self._generations[name]
+        if entry and entry.expires_at > time.monotonic():
+            return entry
+
+        body = json.dumps(jsonable_encoder(compute()), ensure_ascii=False).encode("utf-8")
+        entry = CachedReport(body, time.monotonic() + self.ttl)
+        with self._lock:
+            # a write that landed while we were computing wins over this result
+            if self._generations[name] == generation:
+                self._entries[name] = entry
+        return entry
+
+    def invalidate_tables(self, *tables):
+        changed = set(tables)
+        with self._lock:
+            for name, report_tables in REPORT_TABLES.items():
+                if report_tables & changed:
+                    self._entries.pop(name, None)
+                    self._generations[name] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            for name in self._generations:
+                self._generations[name] += 1
+
+    def cached_response(self, request: Request, name, compute):
+        entry = self.get(name, compute)
+        headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match:
+            tags = [tag.strip() for tag in if_none_match.split(",")]
+            if "*" in tags or entry.etag in tags or f"W/{entry.etag}" in tags:
+                return Response(status_code=304, headers=headers)
+        return Response(content=entry.body, media_type="application/json", headers=headers)
+
+
+report_cache = ReportCache()
+changes.on_tables_changed(lambda tables: report_cache.invalidate_tables(*tables))
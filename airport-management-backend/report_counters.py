@@ -0,0 +1,264 @@
+import asyncio
+import os
+import threading
+from contextlib import contextmanager
+from decimal import Decimal
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from database import SessionLocal
+
+
+RECONCILE_INTERVAL = int(os.getenv("REPORT_RECONCILE_INTERVAL", "600"))
+
+PASSENGER_SCOPE = {
+    "passenger": "Passenger_ID = :key",
+    "dependents": "Passenger_ID = :key"
+}
+
+# Deleting a flight cascades to its passengers, and from them to their
+# tickets and baggage, as well as to rows that reference the flight directly.
+FLIGHT_SCOPE = {
+    "passenger": "Flight_no = :key",
+    "dependents": "Flight_no = :key OR Passenger_ID IN (SELECT Passenger_ID FROM Passenger WHERE Flight_no = :key)"
+}
+
+# the same scopes for a list of keys
+PASSENGERS_SCOPE = {
+    "passenger": "Passenger_ID IN :key",
+    "dependents": "Passenger_ID IN :key"
+}
+
+FLIGHTS_SCOPE = {
+    "passenger": "Flight_no IN :key",
+    "dependents": "Flight_no IN :key OR Passenger_ID IN (SELECT Passenger_ID FROM Passenger WHERE Flight_no IN :key)"
+}
+
+
+JOB_TOTALS_QUERY = text("""
+    SELECT Job_title, COUNT(*) AS emp_count, SUM(Employee_Salary) AS total_salary, COUNT(Employee_Salary) AS paid_count
+    FROM Employee
+    GROUP BY Job_title
+""")
+
+
+def bind_lists(sql, params):
+    query = text(sql)
+    expanding = [bindparam(name, expanding=True) for name, value in params.items() if isinstance(value, (list, tuple))]
+    return query.bindparams(*expanding) if expanding else query
+
+
+class PassengerDelta:
+    def __init__(self, passengers=0, ticket_classes=None, baggage_count=0, baggage_weight=Decimal(0)):
+        self.passengers = passengers
+        self.ticket_classes = ticket_classes or {}
+        self.baggage_count = baggage_count
+        self.baggage_weight = baggage_weight
+
+
+def capture_employees(db: Session, where, params):
+    rows = db.execute(bind_lists(f"SELECT Job_title, Employee_Salary FROM Employee WHERE {where}", params), params).fetchall()
+    return [(row.Job_title, row.Employee_Salary) for row in rows]
+
+
+def capture_passengers(db: Session, scope, key):
+    params = {"key": key}
+    passengers = db.execute(bind_lists(f"SELECT COUNT(*) FROM Passenger WHERE {scope['passenger']}", params), params).scalar()
+    ticket_rows = db.execute(bind_lists(f"""
+        SELECT Class, COUNT(*) AS ticket_count
+        FROM Ticket
+        WHERE {scope['dependents']}
+        GROUP BY Class
+    """, params), params).fetchall()
+    baggage = db.execute(bind_lists(f"""
+        SELECT COUNT(*) AS bag_count, SUM(Baggae_weight) AS total_weight
+        FROM Baggage
+        WHERE {scope['dependents']}
+    """, params), params).fetchone()
+    return PassengerDelta(
+        passengers,
+        {row.Class: row.ticket_count for row in ticket_rows},
+        baggage.bag_count,
+        Decimal(str(baggage.total_weight or 0))
+    )
+
+
+class ReportCounters:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.loaded = False
+        self._reset()
+        # writers between their commit and applying its delta, and whether
+        # a load is reading the tables; the two never overlap
+        self._window = threading.Condition()
+        self._writing = 0
+        self._reading = False
+
+    @contextmanager
+    def writing(self):
+        # wraps a writer's commit and the delta it applies afterwards, so a
+        # load reads the tables either before the commit or after the delta;
+        # otherwise the write would be counted twice
+        with self._window:
+            while self._reading:
+                self._window.wait()
+            self._writing += 1
+        try:
+            yield
+        finally:
+            with self._window:
+                self._writing -= 1
+                self._window.notify_all()
+
+    @contextmanager
+    def _quiesced(self):
+        # holds off new writers and waits for the ones in flight
+        with self._window:
+            while self._reading:
+                self._window.wait()
+            self._reading = True
+            while self._writing:
+                self._window.wait()
+        try:
+            yield
+        finally:
+            with self._window:
+                self._reading = False
+                self._window.notify_all()
+
+    def _reset(self):
+        # Job_title -> [employees, salary sum, employees with a salary]
+        self.jobs = {}
+        self.passengers = 0
+        self.ticket_classes = {}
+        self.baggage_count = 0
+        self.baggage_weight = Decimal(0)
+
+    def _snapshot(self):
+        return {
+            "jobs": {title: list(values) for title, values in self.jobs.items() if values[0]},
+            "passengers": self.passengers,
+            "ticket_classes": {cls: count for cls, count in self.ticket_classes.items() if count},
+            "baggage_count": self.baggage_count,
+            "baggage_weight": self.baggage_weight
+        }
+
+    def _load_from(self, db: Session):
+        self._reset()
+        for row in db.execute(JOB_TOTALS_QUERY).fetchall():
+            self.jobs[row.Job_title] = [row.emp_count, int(row.total_salary or 0), row.paid_count]
+        self.passengers = db.execute(text("SELECT COUNT(*) FROM Passenger")).scalar()
+        for row in db.execute(text("SELECT Class, COUNT(*) AS ticket_count FROM Ticket GROUP BY Class")).fetchall():
+            self.ticket_classes[row.Class] = row.ticket_count
+        baggage = db.execute(text("SELECT COUNT(*) AS bag_count, SUM(Baggae_weight) AS total_weight FROM Baggage")).fetchone()
+        self.baggage_count = baggage.bag_count
+        self.baggage_weight = Decimal(str(baggage.total_weight or 0))
+        self.loaded = True
+
+    def ensure_loaded(self, db: Session):
+        if not self.loaded:
+            with self._quiesced(), self._lock:
+                if not self.loaded:
+                    self._load_from(db)
+
+    def reconcile(self, db: Session):
+        with self._quiesced(), self._lock:
+            before = self._snapshot() if self.loaded else None
+            self._load_from(db)
+            after = self._snapshot()
+        if before is None:
+            return {}
+        return {key: {"counter": before[key], "recomputed": after[key]} for key in after if before[key] != after[key]}
+
+    def employees_added(self, employees):
+        self._apply_employees(employees, 1)
+
+    def employees_removed(self, employees):
+        self._apply_employees(employees, -1)
+
+    def _apply_employees(self, employees, sign):
+        with self._lock:
+            if not self.loaded:
+                return
+            for job_title, salary in employees:
+                values = self.jobs.setdefault(job_title, [0, 0, 0])
+                values[0] += sign
+                if salary is not None:
+                    values[1] += sign * int(salary)
+                    values[2] += sign
+
+    def passengers_added(self, delta: PassengerDelta):
+        self._apply_passengers(delta, 1)
+
+    def passengers_removed(self, delta: PassengerDelta):
+        self._apply_passengers(delta, -1)
+
+    def _apply_passengers(self, delta: PassengerDelta, sign):
+        with self._lock:
+            if not self.loaded:
+                return
+            self.passengers += sign * delta.passengers
+            for cls, count in delta.ticket_classes.items():
+                self.ticket_classes[cls] = self.ticket_classes.get(cls, 0) + sign * count
+            self.baggage_count += sign * delta.baggage_count
+            self.baggage_weight += sign * delta.baggage_weight
+
+    def employee_report(self, db: Session):
+        self.ensure_loaded(db)
+        with self._lock:
+            jobs = {title: values for title, values in self.jobs.items() if values[0]}
+            job_stats = {
+                title: {
+                    "count": count,
+                    "total_salary": salary_sum if paid else None,
+                    "avg_salary": int(salary_sum / paid) if paid else 0
+                }
+                for title, (count, salary_sum, paid) in jobs.items()
+            }
+            total_paid = sum(values[2] for values in jobs.values())
+            total_salary = sum(values[1] for values in jobs.values())
+            return {
+                "total_employees": sum(values[0] for values in jobs.values()),
+                "total_salary_expense": total_salary,
+                "average_salary": int(total_salary / total_paid) if total_paid else 0,
+                "job_breakdown": job_stats
+            }
+
+    def passenger_traffic_report(self, db: Session):
+        self.ensure_loaded(db)
+        with self._lock:
+            avg_weight = self.baggage_weight / self.baggage_count if self.baggage_count > 0 else 0
+            return {
+                "total_passengers": self.passengers,
+                "total_tickets": sum(self.ticket_classes.values()),
+                "total_baggage": self.baggage_count,
+                "ticket_class_breakdown": {cls: count for cls, count in self.ticket_classes.items() if count},
+                "baggage_stats": {
+                    "total_weight": self.baggage_weight,
+                    "average_weight": round(avg_weight, 2)
+                }
+            }
+
+
+report_counters = ReportCounters()
+
+
+def reconcile_once():
+    db = SessionLocal()
+    try:
+        return report_counters.reconcile(db)
+    finally:
+        db.close()
+
+
+async def reconcile_loop(interval=RECONCILE_INTERVAL):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            drift = await run_in_threadpool(reconcile_once)
+            if drift:
+                print(f"Report counters drifted from the tables and were reset: {drift}")
+        except Exception as e:
+            print(f"Error reconciling report counters: {e}")
@@ -0,0 +1,38 @@
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+
+TOP_ROUTES = 10
+
+FLIGHT_STATUS_QUERY = text("""
+    SELECT Flight_status, COUNT(*) AS flight_count
+    FROM Flight
+    GROUP BY Flight_status
+""")
+
+
+def flight_traffic_report(db: Session, top_n: int = TOP_ROUTES):
+    status_rows = db.execute(FLIGHT_STATUS_QUERY).fetchall()
+    airline_rows = db.execute(text("""
+        SELECT Airline_name, COUNT(*) AS flight_count
+        FROM Flight
+        GROUP BY Airline_name
+    """)).fetchall()
+    route_rows = db.execute(text("""
+        SELECT src_city, des_city, COUNT(*) AS flight_count
+        FROM Flight
+        GROUP BY src_city, des_city
+        ORDER BY flight_count DESC, src_city, des_city
+        LIMIT :top_n
+    """), {"top_n": top_n}).fetchall()
+
+    status_counts = {row.Flight_status: row.flight_count for row in status_rows}
+
+    return {
+        "total_flights": sum(status_counts.values()),
+        "arrivals": status_counts.get("Arrival", 0),
+        "departures": status_counts.get("Departure", 0),
+        "airline_breakdown": {row.Airline_name: row.flight_count for row in airline_rows},
+        "top_routes": {f"{row.src_city} → {row.des_city}": row.flight_count for row in route_rows}
+    }
+
@@ -0,0 +1,33 @@
+from datetime import timedelta
+from decimal import Decimal
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+
+def encode_default(value):
+    # MySQL TIME columns come back as timedelta; send them the way str()
+    # formats them ("16:50:00"), as the handlers always have
+    if isinstance(value, timedelta):
+        return str(value)
+    if isinstance(value, Decimal):
+        # as jsonable_encoder does
+        return int(value) if value.as_tuple().exponent >= 0 else float(value)
+    return jsonable_encoder(value)
+
+
+class FastJSONResponse(JSONResponse):
+    # orjson encodes dicts, lists, tuples, dates and times in C. Handlers
+    # that return one of these directly skip FastAPI's jsonable_encoder
+    # pass, so a large page is walked once.
+    def render(self, content):
+        return orjson.dumps(content, default=encode_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+def page_response(key, items, next_cursor, columns=None):
+    # columns is set for columnar pages, whose items are value lists
+    body = {key: items, "next_cursor": next_cursor}
+    if columns is not None:
+        body["columns"] = columns
+    return FastJSONResponse(body)
@@ -0,0 +1,234 @@
+import datetime
+from collections import defaultdict
+from decimal import Decimal
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import Numeric, bindparam, text
+from sqlalchemy.orm import Session
+
+from archive import as_date
+from database import get_db
+from report_counters import bind_lists
+
+
+# default window of the revenue report
+REVENUE_DEFAULT_DAYS = 90
+REVENUE_TOP_FLIGHTS = 50
+# what the Ticket.Class column defaults to
+DEFAULT_CLASS = "Economy"
+CENTS = Decimal("0.01")
+
+# Revenue_daily_flight holds one row per booking day, flight and class, and
+# Revenue_daily_airline the same per airline. Every ticket write adds or
+# takes back its share in the same transaction, so reports read only these
+# rows. Tickets without a booking date are not counted. Archiving leaves the
+# rollups alone: archived tickets were still sold.
+UPSERTS = {
+    "mysql": """
+        INSERT INTO {table} ({columns}) VALUES ({values})
+        ON DUPLICATE KEY UPDATE Tickets = Tickets + VALUES(Tickets), Revenue = Revenue + VALUES(Revenue)
+    """,
+    "sqlite": """
+        INSERT INTO {table} ({columns}) VALUES ({values})
+        ON CONFLICT ({keys}) DO UPDATE SET Tickets = Tickets + excluded.Tickets, Revenue = Revenue + excluded.Revenue
+    """,
+}
+FLIGHT_KEYS = ("Booking_date", "Flight_no", "Class")
+AIRLINE_KEYS = ("Booking_date", "Airline_ID", "Class")
+
+AIRLINES_QUERY = text("SELECT Flight_no, Airline_ID FROM Flight WHERE Flight_no IN :flights").bindparams(
+    bindparam("flights", expanding=True)
+)
+
+# tickets matching a scope, summed the way the flight rollup keys them
+TICKET_TOTALS = """
+    SELECT Booking_date, Flight_no, COALESCE(Class, :default_class) AS Class, COUNT(*) AS Tickets, SUM(COALESCE(Price, 0)) AS Revenue
+    FROM Ticket
+    WHERE Booking_date IS NOT NULL AND ({where})
+    GROUP BY Booking_date, Flight_no, COALESCE(Class, :default_class)
+"""
+
+# the bulk rebuild: live and archived tickets, with the airline from the
+# live or the archived flight
+BACKFILL_FLIGHTS = text("""
+    INSERT INTO Revenue_daily_flight (Booking_date, Flight_no, Class, Airline_ID, Tickets, Revenue)
+    SELECT Booking_date, Flight_no, Class, MAX(Airline_ID), COUNT(*), SUM(Price)
+    FROM (
+        SELECT t.Booking_date, t.Flight_no, COALESCE(t.Class, :default_class) AS Class, f.Airline_ID, COALESCE(t.Price, 0) AS Price
+        FROM Ticket t JOIN Flight f ON f.Flight_no = t.Flight_no
+        WHERE t.Booking_date IS NOT NULL
+        UNION ALL
+        SELECT t.Booking_date, t.Flight_no, COALESCE(t.Class, :default_class), f.Airline_ID, COALESCE(t.Price, 0)
+        FROM Ticket_archive t JOIN Flight_archive f ON f.Archive_date = t.Archive_date AND f.Flight_no = t.Flight_no
+        WHERE t.Booking_date IS NOT NULL
+    ) tickets
+    GROUP BY Booking_date, Flight_no, Class
+""")
+BACKFILL_AIRLINES = text("""
+    INSERT INTO Revenue_daily_airline (Booking_date, Airline_ID, Class, Tickets, Revenue)
+    SELECT Booking_date, Airline_ID, Class, SUM(Tickets), SUM(Revenue)
+    FROM Revenue_daily_flight
+    GROUP BY Booking_date, Airline_ID, Class
+""")
+
+# report groupings: rollup read, key columns, order
+GROUPINGS = {
+    "airline": ("Revenue_daily_airline", ("Airline_ID",), "revenue DESC, Airline_ID"),
+    "class": ("Revenue_daily_airline", ("Class",), "revenue DESC, Class"),
+    "day": ("Revenue_daily_airline", ("Booking_date",), "Booking_date"),
+    "flight": ("Revenue_daily_flight", ("Flight_no", "Airline_ID"), "revenue DESC, Flight_no"),
+}
+
+revenue_router = APIRouter()
+
+
+def upsert(db: Session, table, keys, rows):
+    columns = list(rows[0])
+    sql = UPSERTS["mysql" if db.get_bind().dialect.name == "mysql" else "sqlite"].format(
+        table=table, columns=", ".join(columns), values=", ".join(":" + column for column in columns), keys=", ".join(keys)
+    )
+    # SQLite stores DECIMAL as a float; the Numeric type converts on the way in
+    db.execute(text(sql).bindparams(bindparam("Revenue", type_=Numeric(14, 2))), rows)
+
+
+def money(value):
+    # SUM over DECIMAL comes back as a float from SQLite
+    return Decimal(str(value or 0)).quantize(CENTS)
+
+
+def apply_totals(db: Session, totals, sign):
+    # totals: (Booking_date, Flight_no, Class) -> [tickets, revenue]; the
+    # airline rollup is summed from the same rows
+    totals = {key: value for key, value in totals.items() if value[0]}
+    if not totals:
+        return
+    airlines = dict(db.execute(AIRLINES_QUERY, {"flights": sorted({key[1] for key in totals})}).fetchall())
+    flight_rows = []
+    by_airline = defaultdict(lambda: [0, Decimal(0)])
+    for (day, flight_no, cls), (tickets, revenue) in totals.items():
+        airline_id = airlines.get(flight_no)
+        if airline_id is None:
+            continue
+        flight_rows.append({
+            "Booking_date": day, "Flight_no": flight_no, "Class": cls, "Airline_ID": airline_id,
+            "Tickets": sign * tickets, "Revenue": sign * revenue
+        })
+        airline_total = by_airline[(day, airline_id, cls)]
+        airline_total[0] += tickets
+        airline_total[1] += revenue
+    if not flight_rows:
+        return
+    upsert(db, "Revenue_daily_flight", FLIGHT_KEYS, flight_rows)
+    upsert(db, "Revenue_daily_airline", AIRLINE_KEYS, [
+        {"Booking_date": day, "Airline_ID": airline_id, "Class": cls, "Tickets": sign * tickets, "Revenue": sign * revenue}
+        for (day, airline_id, cls), (tickets, revenue) in by_airline.items()
+    ])
+
+
+def tickets_added(db: Session, tickets):
+    # call before the commit that inserts `tickets` (dicts of Ticket columns)
+    totals = defaultdict(lambda: [0, Decimal(0)])
+    for ticket in tickets:
+        if ticket.get("Booking_date") is None:
+            continue
+        total = totals[(as_date(ticket["Booking_date"]), ticket["Flight_no"], ticket.get("Class") or DEFAULT_CLASS)]
+        total[0] += 1
+        total[1] += money(ticket.get("Price"))
+    apply_totals(db, totals, 1)
+
+
+def tickets_removed(db: Session, where, params):
+    # call before deleting the tickets matching `where`, in the same
+    # transaction; a cascade from Passenger or Flight counts too
+    params = {**params, "default_class": DEFAULT_CLASS}
+    rows = db.execute(bind_lists(TICKET_TOTALS.format(where=where), params), params).fetchall()
+    apply_totals(db, {
+        (as_date(row.Booking_date), row.Flight_no, row.Class): [row.Tickets, money(row.Revenue)] for row in rows
+    }, -1)
+
+
+def backfill(db: Session):
+    # rebuilds both rollups from every ticket in one transaction
+    db.execute(text("DELETE FROM Revenue_daily_airline"))
+    db.execute(text("DELETE FROM Revenue_daily_flight"))
+    flight_rows = db.execute(BACKFILL_FLIGHTS, {"default_class": DEFAULT_CLASS}).rowcount
+    airline_rows = db.execute(BACKFILL_AIRLINES).rowcount
+    db.commit()
+    return {"flight_rows": flight_rows, "airline_rows": airline_rows}
+
+
+def revenue_report(db: Session, date_from, date_to, by, airline_id=None, limit=REVENUE_TOP_FLIGHTS):
+    table, keys, order = GROUPINGS[by]
+    where = "Booking_date BETWEEN :date_from AND :date_to"
+    params = {"date_from": date_from, "date_to": date_to}
+    if airline_id is not None:
+        where += " AND Airline_ID = :airline_id"
+        params["airline_id"] = airline_id
+    columns = ", ".join(keys)
+    # the top flights only; the other groupings are a row per airline,
+    # class or day
+    top = " LIMIT :limit" if by == "flight" else ""
+    rows = db.execute(text(f"""
+        SELECT {columns}, SUM(Tickets) AS tickets, SUM(Revenue) AS revenue
+        FROM {table}
+        WHERE {where}
+        GROUP BY {columns}
+        HAVING SUM(Tickets) > 0
+        ORDER BY {order}{top}
+    """), {**params, "limit": limit}).fetchall()
+    totals = db.execute(text(f"""
+        SELECT COALESCE(SUM(Tickets), 0) AS tickets, COALESCE(SUM(Revenue), 0) AS revenue
+        FROM Revenue_daily_airline
+        WHERE {where}
+    """), params).fetchone()
+
+    result = [{**dict(row._mapping), "revenue": money(row.revenue)} for row in rows]
+    if by == "day":
+        for row in result:
+            row["Booking_date"] = as_date(row["Booking_date"])
+    if by == "airline":
+        names = dict(db.execute(text("SELECT Airline_ID, Airline_name FROM Airline")).fetchall())
+        for row in result:
+            row["Airline_name"] = names.get(row["Airline_ID"])
+    return {
+        "date_from": date_from,
+        "date_to": date_to,
+        "by": by,
+        "tickets": int(totals.tickets),
+        "revenue": money(totals.revenue),
+        "rows": result
+    }
+
+
+@revenue_router.get("/api/reports/revenue")
+def get_revenue_report(
+    date_from: Optional[datetime.date] = None,
+    date_to: Optional[datetime.date] = None,
+    by: str = Query("airline", pattern="^(airline|class|day|flight)$"),
+    airline_id: Optional[int] = None,
+    limit: int = Query(REVENUE_TOP_FLIGHTS, ge=1, le=1000),
+    db: Session = Depends(get_db)
+):
+    # booking days inclusive; the default is the last REVENUE_DEFAULT_DAYS
+    try:
+        date_to = date_to or datetime.date.today()
+        date_from = date_from or date_to - datetime.timedelta(days=REVENUE_DEFAULT_DAYS - 1)
+        if date_from > date_to:
+            raise HTTPException(status_code=400, detail="date_from is after date_to")
+        return revenue_report(db, date_from, date_to, by, airline_id, limit)
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@revenue_router.post("/api/reports/revenue/backfill")
+def run_revenue_backfill(db: Session = Depends(get_db)):
+    try:
+        return backfill(db)
+    except Exception as e:
+        db.rollback()
+        print(f"Error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
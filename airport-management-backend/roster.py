@@ -0,0 +1,161 @@
+from collections import defaultdict
+from typing import Dict, List
+
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel
+from sqlalchemy import bindparam, text
+from sqlalchemy.orm import Session
+
+import changes
+from database import get_db
+from gate_schedule import minute_of_day
+
+
+DEFAULT_REQUIREMENTS = {"Pilot": 2, "Flight Attendant": 4}
+
+roster_router = APIRouter()
+
+
+class RosterRequest(BaseModel):
+    flights: List[str]
+    # crew needed per role on every flight
+    requirements: Dict[str, int] = DEFAULT_REQUIREMENTS
+    # per-flight overrides of the requirements
+    flight_requirements: Dict[str, Dict[str, int]] = {}
+    # crew may only work flights at their own airport
+    same_airport: bool = True
+    allow_partial: bool = False
+    dry_run: bool = False
+
+
+class RosterFlight:
+    __slots__ = ("Flight_no", "Airport_ID", "arrival_time", "needs")
+
+    def __init__(self, flight_no, airport_id, arrival_time, needs):
+        self.Flight_no = flight_no
+        self.Airport_ID = airport_id
+        self.arrival_time = arrival_time
+        # role -> crew still to assign
+        self.needs = needs
+
+
+class CrewMember:
+    __slots__ = ("Crew_ID", "Crew_role", "Airport_ID")
+
+    def __init__(self, crew_id, crew_role, airport_id):
+        self.Crew_ID = crew_id
+        self.Crew_role = crew_role
+        self.Airport_ID = airport_id
+
+
+def schedule_order(flight):
+    minute = minute_of_day(flight.arrival_time)
+    return (minute is None, minute or 0, flight.Flight_no)
+
+
+def plan_roster(flights, crew, same_airport=True):
+    # A crew row holds at most one Flight_no, so free crew of one role (at
+    # one airport) are interchangeable and the problem splits into
+    # independent pools. Filling the flights in schedule order from their
+    # pool is exact: it finds a full roster whenever one exists, and
+    # otherwise leaves the shortfall on the latest flights.
+    pools = defaultdict(list)
+    for member in sorted(crew, key=lambda m: m.Crew_ID, reverse=True):
+        pools[(member.Crew_role, member.Airport_ID if same_airport else None)].append(member)
+
+    assignments = []
+    shortfalls = []
+    for flight in sorted(flights, key=schedule_order):
+        for role, needed in flight.needs.items():
+            pool = pools[(role, flight.Airport_ID if same_airport else None)]
+            taken = min(needed, len(pool))
+            for _ in range(taken):
+                assignments.append({"Crew_ID": pool.pop().Crew_ID, "Crew_role": role, "Flight_no": flight.Flight_no})
+            if taken < needed:
+                shortfalls.append({"Flight_no": flight.Flight_no, "Crew_role": role, "missing": needed - taken})
+    return assignments, shortfalls
+
+
+def load_roster_inputs(db: Session, body: RosterRequest):
+    flight_query = text("""
+        SELECT Flight_no, Airport_ID, arrival_time FROM Flight WHERE Flight_no IN :flights
+    """).bindparams(bindparam("flights", expanding=True))
+    flight_rows = db.execute(flight_query, {"flights": body.flights}).fetchall()
+    missing = set(body.flights) - {row.Flight_no for row in flight_rows}
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Unknown flights: {', '.join(sorted(missing))}")
+
+    # crew already on these flights count towards their requirements
+    assigned_query = text("""
+        SELECT Flight_no, Crew_role, COUNT(*) AS crew_count
+        FROM Crew
+        WHERE Flight_no IN :flights
+        GROUP BY Flight_no, Crew_role
+    """).bindparams(bindparam("flights", expanding=True))
+    assigned = {(row.Flight_no, row.Crew_role): row.crew_count for row in db.execute(assigned_query, {"flights": body.flights})}
+
+    flights = []
+    for row in flight_rows:
+        requirements = body.flight_requirements.get(row.Flight_no, body.requirements)
+        needs = {
+            role: count - assigned.get((row.Flight_no, role), 0)
+            for role, count in requirements.items()
+            if count > assigned.get((row.Flight_no, role), 0)
+        }
+        flights.append(RosterFlight(row.Flight_no, row.Airport_ID, row.arrival_time, needs))
+
+    roles = {role for flight in flights for role in flight.needs}
+    crew = []
+    if roles:
+        crew_query = text("""
+            SELECT c.Crew_ID, c.Crew_role, e.Airport_ID
+            FROM Crew c
+            JOIN Employee e ON c.Employee_ID = e.Employee_ID
+            WHERE c.Flight_no IS NULL AND c.Crew_role IN :roles
+        """).bindparams(bindparam("roles", expanding=True))
+        crew = [CrewMember(row.Crew_ID, row.Crew_role, row.Airport_ID) for row in db.execute(crew_query, {"roles": sorted(roles)})]
+    return flights, crew
+
+
+def commit_roster(db: Session, assignments):
+    update_query = text("""
+        UPDATE Crew SET Flight_no = :flight_no
+        WHERE Crew_ID IN :crew_ids AND Flight_no IS NULL
+    """).bindparams(bindparam("crew_ids", expanding=True))
+    by_flight = defaultdict(list)
+    for assignment in assignments:
+        by_flight[assignment["Flight_no"]].append(assignment["Crew_ID"])
+    for flight_no, crew_ids in by_flight.items():
+        result = db.execute(update_query, {"flight_no": flight_no, "crew_ids": crew_ids})
+        if result.rowcount != len(crew_ids):
+            # someone assigned one of these crew members since we read them
+            db.rollback()
+            raise HTTPException(status_code=409, detail="Crew assignments changed while building the roster, try again")
+    db.commit()
+
+
+@roster_router.post("/api/crew/roster")
+def build_roster(body: RosterRequest, db: Session = Depends(get_db)):
+    try:
+        if not body.flights:
+            raise HTTPException(status_code=400, detail="flights must not be empty")
+        flights, crew = load_roster_inputs(db, body)
+        assignments, shortfalls = plan_roster(flights, crew, body.same_airport)
+        if shortfalls and not body.allow_partial:
+            raise HTTPException(status_code=409, detail={"message": "Not enough free crew for these flights", "shortfalls": shortfalls})
+        if not body.dry_run and assignments:
+            commit_roster(db, assignments)
+            changes.tables_changed("Crew")
+            changes.rows_changed("Crew", "update", [{"Crew_ID": a["Crew_ID"], "Flight_no": a["Flight_no"]} for a in assignments])
+        return {
+            "assigned": len(assignments),
+            "committed": bool(assignments) and not body.dry_run,
+            "assignments": assignments,
+            "shortfalls": shortfalls
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        db.rollback()
+        print(f"Error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
@@ -106,6 +106,7 @@ class TicketSchema(BaseModel):
     Price: Optional[float] = None
     Seat_No: Optional[str] = None
     Booking_date: Optional[date] = None
+    Class: Optional[str] = None
     Flight_no: str
     Passenger_ID: int
     
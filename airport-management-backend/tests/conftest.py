@@ -0,0 +1,39 @@
+# The API runs against a throwaway SQLite database: database.py builds its
+# engines from these variables at import, so they are set before anything
+# imports it.
+import os
+import re
+import sys
+import tempfile
+
+import pytest
+
+BACKEND = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+INDEX_PACK = os.path.join(BACKEND, "..", "database", "migrations", "002_index_pack.sql")
+DB_PATH = os.path.join(tempfile.mkdtemp(), "airport_test.db")
+
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ["ASYNC_DATABASE_URL"] = f"sqlite+aiosqlite:///{DB_PATH}"
+sys.path.insert(0, BACKEND)
+sys.path.insert(0, os.path.join(BACKEND, "benchmarks"))
+
+from sqlalchemy import text
+
+import database
+import datagen
+
+
+def apply_index_pack(engine):
+    # the migration as shipped; the models already declare most of these
+    with open(INDEX_PACK) as f:
+        statements = re.findall(r"^CREATE INDEX .*?;", f.read(), re.MULTILINE | re.DOTALL)
+    with engine.begin() as conn:
+        for statement in statements:
+            conn.execute(text(statement.replace("CREATE INDEX", "CREATE INDEX IF NOT EXISTS", 1)))
+
+
+@pytest.fixture(scope="session")
+def engine():
+    datagen.load(database.engine, scale=1)
+    apply_index_pack(database.engine)
+    return database.engine
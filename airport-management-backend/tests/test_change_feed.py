@@ -0,0 +1,41 @@
+import pytest
+
+from change_feed import ChangeFeed, FEED_EPOCH
+
+
+def drain(subscriber):
+    messages = []
+    while not subscriber.queue.empty():
+        messages.append(subscriber.queue.get_nowait().data)
+    return messages
+
+
+@pytest.fixture
+def feed():
+    # five published changes; _fan_out is what publish schedules on the loop
+    feed = ChangeFeed(history=3)
+    for n in range(5):
+        feed._fan_out("Flight", "update", [{"Flight_no": f"F{n}"}])
+    return feed
+
+
+def subscribe(feed, since):
+    return drain(feed.subscribe(None, since))
+
+
+def test_resumes_from_an_id_of_this_process(feed):
+    messages = subscribe(feed, f"{FEED_EPOCH}-3")
+    assert len(messages) == 2 and all('"type": "change"' in m for m in messages)
+    assert subscribe(feed, f"{FEED_EPOCH}-5") == []
+
+
+@pytest.mark.parametrize("since", [
+    "0000abcd-3",            # another worker or an earlier run
+    f"{FEED_EPOCH}-9",       # ahead of this process's seq
+    "9",
+    f"{FEED_EPOCH}-1",       # older than the history kept
+    "not-an-id",
+])
+def test_resyncs_when_the_position_is_not_in_this_feed(feed, since):
+    messages = subscribe(feed, since)
+    assert len(messages) == 1 and '"type": "resync"' in messages[0]
@@ -0,0 +1,82 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event, text
+
+import database
+import main
+
+FLIGHT_NO = "TQ0001"
+# (Passenger_ID, status, bags, tickets)
+PASSENGERS = [
+    (900001, "Illness", 2, 1),
+    (900002, "Normal", 3, 2),
+    (900003, "baggage overweight", 1, 1),
+    (900004, "Normal", 0, 1),
+    (900005, None, 2, 0),
+]
+
+
+@pytest.fixture(scope="module")
+def flight(engine):
+    with engine.begin() as conn:
+        conn.execute(text("""
+            INSERT INTO Flight (Flight_no, Airline_name, Flight_status, arrival_time, Airport_ID, Airline_ID, Gate_no, Terminal, src_city, des_city)
+            VALUES (:flight_no, 'IndiGo', 'Arrival', '10:00:00', 'BLR', 1, 'G01', 1, 'Delhi', 'Bengaluru')
+        """), {"flight_no": FLIGHT_NO})
+        bag = ticket = 0
+        for passenger_id, status, bags, tickets in PASSENGERS:
+            conn.execute(text("""
+                INSERT INTO Passenger (Passenger_ID, F_Name, L_Name, Passenger_name, Flight_no, Passenger_status)
+                VALUES (:id, 'Test', 'Passenger', :name, :flight_no, :status)
+            """), {"id": passenger_id, "name": f"Passenger {passenger_id}", "flight_no": FLIGHT_NO, "status": status})
+            for _ in range(bags):
+                bag += 1
+                conn.execute(text("""
+                    INSERT INTO Baggage (Baggage_ID, Passenger_ID, Flight_no, Baggae_weight, Baggage_status)
+                    VALUES (:bag, :id, :flight_no, 20, 'Loaded')
+                """), {"bag": 900000 + bag, "id": passenger_id, "flight_no": FLIGHT_NO})
+            for _ in range(tickets):
+                ticket += 1
+                conn.execute(text("""
+                    INSERT INTO Ticket (Ticket_no, Price, Seat_No, Booking_date, Flight_no, Passenger_ID, Class)
+                    VALUES (:ticket, 5000, '1A', '2025-01-10', :flight_no, :id, 'Economy')
+                """), {"ticket": f"TQ{ticket:05d}", "flight_no": FLIGHT_NO, "id": passenger_id})
+    yield FLIGHT_NO
+    # the database is shared by the whole session: leave it as datagen made it
+    with engine.begin() as conn:
+        for table in ("Ticket", "Baggage", "Passenger", "Flight"):
+            conn.execute(text(f"DELETE FROM {table} WHERE Flight_no = :flight_no"), {"flight_no": FLIGHT_NO})
+
+
+@pytest.fixture
+def statements():
+    # every statement sent on either engine while the test runs
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    engines = [database.engine, database.async_engine.sync_engine]
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", record)
+    yield executed
+    for engine in engines:
+        event.remove(engine, "before_cursor_execute", record)
+
+
+def test_flight_passengers_is_one_query(flight, statements):
+    response = TestClient(main.app).get(f"/api/flight/{flight}/passengers")
+
+    assert response.status_code == 200
+    assert len(statements) == 1
+    assert len(response.json()["passengers"]) == len(PASSENGERS)
+
+
+def test_flight_passengers_lists_normal_before_flagged(flight):
+    passengers = TestClient(main.app).get(f"/api/flight/{flight}/passengers").json()["passengers"]
+
+    assert [p["Passenger_ID"] for p in passengers] == [900002, 900004, 900005, 900001, 900003]
+    assert [p["Passenger_status"] for p in passengers] == ["Normal", "Normal", "Normal", "Illness", "baggage overweight"]
+    # one row per passenger, carrying the first bag and ticket
+    assert passengers[0]["baggage_id"] == 900003 and passengers[0]["ticket_id"] == "TQ00002"
+    assert passengers[1]["baggage_id"] is None and passengers[2]["ticket_id"] is None
@@ -0,0 +1,9 @@
+import pytest
+
+from check_query_plans import HOT_QUERIES, sqlite_full_scans
+
+
+@pytest.mark.parametrize("name, sql, params", HOT_QUERIES, ids=[name for name, _, _ in HOT_QUERIES])
+def test_hot_query_uses_an_index(engine, name, sql, params):
+    with engine.connect() as conn:
+        assert sqlite_full_scans(conn, sql, params) == []
@@ -0,0 +1,58 @@
+import threading
+import time
+
+from sqlalchemy import text
+
+from database import SessionLocal
+from report_counters import ReportCounters, capture_employees
+
+EMPLOYEE_ID = 990001
+
+
+def test_reconcile_waits_for_a_committed_delta(engine):
+    counters = ReportCounters()
+    db = SessionLocal()
+    counters.ensure_loaded(db)
+    before = counters.employee_report(db)["total_employees"]
+    committed = threading.Event()
+    release = threading.Event()
+
+    def add_employee():
+        # commits, then stalls before applying its delta
+        writer = SessionLocal()
+        writer.execute(text("""
+            INSERT INTO Employee (Employee_ID, F_Name, L_Name, Employee_name, Job_title, Employee_Salary, Airport_ID)
+            VALUES (:id, 'Race', 'Test', 'Race Test', 'Pilot', 100000, 'BLR')
+        """), {"id": EMPLOYEE_ID})
+        added = capture_employees(writer, "Employee_ID = :id", {"id": EMPLOYEE_ID})
+        with counters.writing():
+            writer.commit()
+            committed.set()
+            release.wait(5)
+            counters.employees_added(added)
+        writer.close()
+
+    def reconcile():
+        reader = SessionLocal()
+        counters.reconcile(reader)
+        reader.close()
+
+    writer_thread = threading.Thread(target=add_employee)
+    writer_thread.start()
+    assert committed.wait(5)
+    reconcile_thread = threading.Thread(target=reconcile)
+    reconcile_thread.start()
+    time.sleep(0.2)
+    # the reconcile must not read the tables between the commit and the delta
+    assert reconcile_thread.is_alive()
+    release.set()
+    writer_thread.join(5)
+    reconcile_thread.join(5)
+
+    try:
+        assert counters.employee_report(db)["total_employees"] == before + 1
+        assert counters.reconcile(db) == {}
+    finally:
+        db.execute(text("DELETE FROM Employee WHERE Employee_ID = :id"), {"id": EMPLOYEE_ID})
+        db.commit()
+        db.close()
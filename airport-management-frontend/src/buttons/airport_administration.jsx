@@ -1,4 +1,5 @@
 import React, { useState, useEffect } from 'react';
+import { fetchAllPages } from '../fetchAllPages';
 import "./buttons.css";
 
 const AirportAdministration = () => {
@@ -35,13 +36,9 @@ const AirportAdministration = () => {
 
   const fetchEmployees = () => {
     setLoading(true);
-    fetch('http://localhost:8000/api/employees')
-      .then(res => {
-        if (!res.ok) throw new Error(`HTTP error! status: ${res.status}`);
-        return res.json();
-      })
-      .then(data => {
-        setEmployees(data.employees || []);
+    fetchAllPages('http://localhost:8000/api/employees', 'employees')
+      .then(employees => {
+        setEmployees(employees);
         setLoading(false);
       })
       .catch(error => {
@@ -1,4 +1,5 @@
 import React, { useState, useEffect } from 'react';
+import { fetchAllPages } from '../fetchAllPages';
 import "./buttons.css";
 
 
@@ -16,12 +17,12 @@ const CrewInfo = () => {
   const fetchCrewMembers = () => {
     setLoading(true);
     Promise.all([
-      fetch('http://localhost:8000/api/crew').then(res => res.json()),
-      fetch('http://localhost:8000/api/flights-list').then(res => res.json())
+      fetchAllPages('http://localhost:8000/api/crew', 'crew'),
+      fetchAllPages('http://localhost:8000/api/flights-list', 'flights')
     ])
-      .then(([crewData, flightsData]) => {
-        setCrewMembers(crewData.crew || []);
-        setFlights(flightsData.flights || []);
+      .then(([crew, flights]) => {
+        setCrewMembers(crew);
+        setFlights(flights);
         setLoading(false);
       })
       .catch(error => {
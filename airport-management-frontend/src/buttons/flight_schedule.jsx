@@ -1,4 +1,5 @@
 import React, { useState, useEffect } from 'react';
+import { fetchAllPages } from '../fetchAllPages';
 
 const FlightSchedule = () => {
   const [flights, setFlights] = useState([]);
@@ -32,14 +33,9 @@ const FlightSchedule = () => {
 
   const fetchFlights = () => {
     setLoading(true);
-    fetch('http://localhost:8000/api/flight-schedule')
-      .then(res => {
-        if (!res.ok) throw new Error(`HTTP error! status: ${res.status}`);
-        return res.json();
-      })
-      .then(data => {
-        console.log('Received data:', data);
-        setFlights(data.flights || []);
+    fetchAllPages('http://localhost:8000/api/flight-schedule', 'flights')
+      .then(flights => {
+        setFlights(flights);
         setLoading(false);
       })
       .catch(error => {
@@ -49,8 +45,34 @@ const FlightSchedule = () => {
       });
   };
 
+  // Apply a change-feed event to the loaded flights instead of refetching
+  const applyFlightChange = (change) => {
+    if (change.resync) {
+      fetchFlights();
+      return;
+    }
+    setFlights(current => {
+      const changedNos = new Set(change.rows.map(row => row.Flight_no));
+      if (change.op === 'delete') {
+        return current.filter(flight => !changedNos.has(flight.Flight_no));
+      }
+      if (change.op === 'insert') {
+        return [...current.filter(flight => !changedNos.has(flight.Flight_no)), ...change.rows];
+      }
+      const updates = Object.fromEntries(change.rows.map(row => [row.Flight_no, row]));
+      return current.map(flight => updates[flight.Flight_no] ? { ...flight, ...updates[flight.Flight_no] } : flight);
+    });
+  };
+
   useEffect(() => {
     fetchFlights();
+    const source = new EventSource('http://localhost:8000/api/changes/stream?tables=Flight');
+    source.onmessage = (e) => {
+      const message = JSON.parse(e.data);
+      if (message.type === 'resync') fetchFlights();
+      else if (message.type === 'change') applyFlightChange(message);
+    };
+    return () => source.close();
   }, []);
 
   // Filter flights based on tab and search
@@ -99,7 +121,12 @@ const FlightSchedule = () => {
       },
       body: JSON.stringify(newFlight)
     })
-    .then(res => {
+    .then(async res => {
+      if (res.status === 409) {
+        const { detail } = await res.json();
+        const taken = detail.conflicts.map(c => `${c.Flight_no} at ${c.arrival_time}`).join(', ');
+        throw new Error(`Gate ${newFlight.Gate_no} is already in use by ${taken}`);
+      }
       if (!res.ok) throw new Error('Failed to add flight');
       return res.json();
     })
@@ -119,7 +146,6 @@ const FlightSchedule = () => {
         src_city: '',
         des_city: ''
       });
-      fetchFlights();
     })
     .catch(error => {
       alert('Error adding flight: ' + error.message);
@@ -143,7 +169,6 @@ const FlightSchedule = () => {
       alert('Flight deleted successfully!');
       setShowDeleteModal(false);
       setDeleteFlightNo('');
-      fetchFlights();
     })
     .catch(error => {
       alert('Error deleting flight: ' + error.message);
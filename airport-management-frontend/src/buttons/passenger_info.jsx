@@ -1,4 +1,5 @@
 import React, { useState, useEffect } from 'react';
+import { fetchAllPages } from '../fetchAllPages';
 import "./buttons.css";
 
 const PassengerInfo = () => {
@@ -18,10 +19,9 @@ const PassengerInfo = () => {
 
   const fetchFlights = () => {
     setLoading(true);
-    fetch('http://localhost:8000/api/flights-list')
-      .then(res => res.json())
-      .then(data => {
-        setFlights(data.flights || []);
+    fetchAllPages('http://localhost:8000/api/flights-list', 'flights')
+      .then(flights => {
+        setFlights(flights);
         setLoading(false);
       })
       .catch(error => {
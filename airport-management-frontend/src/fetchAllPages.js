@@ -0,0 +1,18 @@
+// The list endpoints return one page at a time plus a next_cursor; follow
+// it until it runs out so screens get every row.
+const PAGE_SIZE = 5000;
+
+export const fetchAllPages = async (url, key) => {
+  const rows = [];
+  let cursor = null;
+  do {
+    const params = new URLSearchParams({ limit: PAGE_SIZE });
+    if (cursor !== null) params.set('cursor', cursor);
+    const res = await fetch(`${url}${url.includes('?') ? '&' : '?'}${params}`);
+    if (!res.ok) throw new Error(`HTTP error! status: ${res.status}`);
+    const data = await res.json();
+    rows.push(...(data[key] || []));
+    cursor = data.next_cursor ?? null;
+  } while (cursor !== null);
+  return rows;
+};
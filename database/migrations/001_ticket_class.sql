@@ -0,0 +1,5 @@
+USE airport_mngt_system;
+
+-- The passenger traffic report breaks tickets down by travel class
+ALTER TABLE Ticket
+    ADD COLUMN Class VARCHAR(20) DEFAULT 'Economy' AFTER Booking_date;
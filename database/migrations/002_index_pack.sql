@@ -0,0 +1,23 @@
+USE airport_mngt_system;
+
+-- Indexes for the filters and joins the API runs on every page load.
+-- MySQL drops the implicit foreign key indexes these replace.
+
+-- signin: F_Name + Job_title
+CREATE INDEX idx_employee_name_job ON Employee (F_Name, Job_title);
+-- crew-employees, ground operations and the employee report (covering)
+CREATE INDEX idx_employee_job ON Employee (Job_title, Employee_name, Employee_Salary);
+
+-- flight traffic report and arrivals on the ground operations screen
+CREATE INDEX idx_flight_status ON Flight (Flight_status, Flight_no);
+
+-- passengers of a flight, ill passengers
+CREATE INDEX idx_passenger_flight ON Passenger (Flight_no, Passenger_status);
+CREATE INDEX idx_passenger_status ON Passenger (Passenger_status, Flight_no);
+
+-- baggage and ticket of a passenger (covering for the passenger list join)
+CREATE INDEX idx_baggage_passenger ON Baggage (Passenger_ID, Baggage_ID, Baggae_weight);
+CREATE INDEX idx_ticket_passenger ON Ticket (Passenger_ID, Ticket_no);
+
+-- crew of a flight
+CREATE INDEX idx_crew_flight ON Crew (Flight_no);
@@ -0,0 +1,18 @@
+USE airport_mngt_system;
+
+-- Medics dispatched to ill passengers; a passenger has at most one at a time.
+CREATE TABLE MEDICAL_ASSIGNED (
+    Passenger_ID INT NOT NULL,
+    Employee_ID INT NOT NULL,
+    PRIMARY KEY (Passenger_ID)
+);
+
+ALTER TABLE MEDICAL_ASSIGNED 
+    ADD CONSTRAINT fk_medical_passenger FOREIGN KEY (Passenger_ID) REFERENCES Passenger(Passenger_ID)
+    ON DELETE CASCADE ON UPDATE CASCADE,
+    ADD CONSTRAINT fk_medical_employee FOREIGN KEY (Employee_ID) REFERENCES Employee(Employee_ID)
+    ON DELETE CASCADE ON UPDATE CASCADE;
+
+-- engineers on a flight, patients of a medic (dispatch load counts)
+CREATE INDEX idx_fe_flight ON FE_ASSIGNED (Flight_no, Employee_ID);
+CREATE INDEX idx_medical_employee ON MEDICAL_ASSIGNED (Employee_ID, Passenger_ID);
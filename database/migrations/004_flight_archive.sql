@@ -0,0 +1,107 @@
+USE airport_mngt_system;
+
+-- When a flight completed; the archiver moves flights completed more than
+-- ARCHIVE_AFTER_HOURS ago.
+ALTER TABLE Flight ADD COLUMN Completed_at DATETIME NULL;
+CREATE INDEX idx_flight_completed ON Flight (Completed_at, Flight_no);
+
+-- Completed flights and everything hanging off them, moved out of the live
+-- tables by the archiver (archive.py). Archive_date is the day the flight
+-- completed; every table is range partitioned on it by month, and the
+-- archiver splits a new month off p_future before its first batch lands.
+CREATE TABLE Flight_archive (
+    Flight_no VARCHAR(20) NOT NULL,
+    Airline_name VARCHAR(255),
+    Flight_status VARCHAR(20),
+    arrival_time TIME,
+    Airport_ID VARCHAR(3) NOT NULL,
+    Airline_ID INT NOT NULL,
+    Gate_no VARCHAR(10),
+    Terminal INT,
+    src_city VARCHAR(255),
+    des_city VARCHAR(255),
+    Completed_at DATETIME,
+    Archive_date DATE NOT NULL,
+    PRIMARY KEY (Archive_date, Flight_no),
+    KEY idx_flight_archive_no (Flight_no, Archive_date),
+    KEY idx_flight_archive_airport (Airport_ID, Archive_date)
+)
+PARTITION BY RANGE COLUMNS (Archive_date) (PARTITION p_future VALUES LESS THAN (MAXVALUE));
+
+CREATE TABLE Passenger_archive (
+    Passenger_ID INT NOT NULL,
+    F_Name VARCHAR(100) NOT NULL,
+    M_Name VARCHAR(100),
+    L_Name VARCHAR(100) NOT NULL,
+    Passenger_name VARCHAR(200),
+    DOB DATE,
+    Passenger_Address VARCHAR(255),
+    Flight_no VARCHAR(20) NOT NULL,
+    Passenger_status VARCHAR(20),
+    Archive_date DATE NOT NULL,
+    PRIMARY KEY (Archive_date, Passenger_ID),
+    KEY idx_passenger_archive_flight (Flight_no, Archive_date)
+)
+PARTITION BY RANGE COLUMNS (Archive_date) (PARTITION p_future VALUES LESS THAN (MAXVALUE));
+
+CREATE TABLE Ticket_archive (
+    Ticket_no VARCHAR(50) NOT NULL,
+    Price DECIMAL(10, 2),
+    Seat_No VARCHAR(10),
+    Booking_date DATE,
+    Class VARCHAR(20) DEFAULT 'Economy',
+    Flight_no VARCHAR(20) NOT NULL,
+    Passenger_ID INT NOT NULL,
+    Archive_date DATE NOT NULL,
+    PRIMARY KEY (Archive_date, Ticket_no, Flight_no, Passenger_ID),
+    KEY idx_ticket_archive_passenger (Passenger_ID, Archive_date)
+)
+PARTITION BY RANGE COLUMNS (Archive_date) (PARTITION p_future VALUES LESS THAN (MAXVALUE));
+
+CREATE TABLE Baggage_archive (
+    Baggage_ID INT NOT NULL,
+    Baggae_weight DECIMAL(10, 2),
+    Baggage_status VARCHAR(50),
+    Passenger_ID INT NOT NULL,
+    Flight_no VARCHAR(20) NOT NULL,
+    Archive_date DATE NOT NULL,
+    PRIMARY KEY (Archive_date, Baggage_ID, Passenger_ID, Flight_no),
+    KEY idx_baggage_archive_passenger (Passenger_ID, Archive_date)
+)
+PARTITION BY RANGE COLUMNS (Archive_date) (PARTITION p_future VALUES LESS THAN (MAXVALUE));
+
+CREATE TABLE Boards_archive (
+    Passenger_ID INT NOT NULL,
+    Flight_no VARCHAR(20) NOT NULL,
+    Archive_date DATE NOT NULL,
+    PRIMARY KEY (Archive_date, Passenger_ID, Flight_no)
+)
+PARTITION BY RANGE COLUMNS (Archive_date) (PARTITION p_future VALUES LESS THAN (MAXVALUE));
+
+CREATE TABLE Passenger_Email_archive (
+    Passenger_ID INT NOT NULL,
+    Passenger_email VARCHAR(50) NOT NULL,
+    Archive_date DATE NOT NULL,
+    PRIMARY KEY (Archive_date, Passenger_ID, Passenger_email)
+)
+PARTITION BY RANGE COLUMNS (Archive_date) (PARTITION p_future VALUES LESS THAN (MAXVALUE));
+
+CREATE TABLE Passenger_phone_archive (
+    Passenger_ID INT NOT NULL,
+    Passenger_phone BIGINT NOT NULL,
+    Archive_date DATE NOT NULL,
+    PRIMARY KEY (Archive_date, Passenger_ID, Passenger_phone)
+)
+PARTITION BY RANGE COLUMNS (Archive_date) (PARTITION p_future VALUES LESS THAN (MAXVALUE));
+
+-- crew assignments of archived flights; the crew themselves stay live
+CREATE TABLE Crew_archive (
+    Crew_ID INT NOT NULL,
+    Crew_role VARCHAR(100),
+    Employee_ID INT NOT NULL,
+    Flight_no VARCHAR(20) NOT NULL,
+    Archive_date DATE NOT NULL,
+    PRIMARY KEY (Archive_date, Flight_no, Crew_ID),
+    KEY idx_crew_archive_employee (Employee_ID, Archive_date)
+)
+PARTITION BY RANGE COLUMNS (Archive_date) (PARTITION p_future VALUES LESS THAN (MAXVALUE));
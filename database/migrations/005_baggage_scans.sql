@@ -0,0 +1,10 @@
+USE airport_mngt_system;
+
+-- Scan events are written to Baggage in batches (baggage_scans.py), which
+-- applies the weight rule once per batch. The per-row trigger would run it
+-- again for every bag, and would also reset ill or theft-flagged passengers.
+DROP TRIGGER IF EXISTS UpdatePassengerStatusAfterBaggageUpdate;
+
+-- when the stored status was scanned, so a late-arriving older scan does not
+-- overwrite a newer one
+ALTER TABLE Baggage ADD COLUMN Last_scanned_at DATETIME NULL AFTER Baggage_status;
@@ -0,0 +1,45 @@
+USE airport_mngt_system;
+
+-- Daily revenue rollups of Ticket, kept current by the API (revenue.py) as
+-- tickets are written and deleted. Archived tickets stay counted, so there
+-- are no foreign keys to the live tables.
+CREATE TABLE Revenue_daily_flight (
+    Booking_date DATE NOT NULL,
+    Flight_no VARCHAR(20) NOT NULL,
+    Class VARCHAR(20) NOT NULL,
+    Airline_ID INT NOT NULL,
+    Tickets INT NOT NULL DEFAULT 0,
+    Revenue DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (Booking_date, Flight_no, Class),
+    KEY idx_revenue_flight_no (Flight_no, Booking_date)
+);
+
+CREATE TABLE Revenue_daily_airline (
+    Booking_date DATE NOT NULL,
+    Airline_ID INT NOT NULL,
+    Class VARCHAR(20) NOT NULL,
+    Tickets INT NOT NULL DEFAULT 0,
+    Revenue DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (Booking_date, Airline_ID, Class),
+    KEY idx_revenue_airline (Airline_ID, Booking_date)
+);
+
+-- The initial backfill, from live and archived tickets. POST
+-- /api/reports/revenue/backfill runs the same rebuild.
+INSERT INTO Revenue_daily_flight (Booking_date, Flight_no, Class, Airline_ID, Tickets, Revenue)
+SELECT Booking_date, Flight_no, Class, MAX(Airline_ID), COUNT(*), SUM(Price)
+FROM (
+    SELECT t.Booking_date, t.Flight_no, COALESCE(t.Class, 'Economy') AS Class, f.Airline_ID, COALESCE(t.Price, 0) AS Price
+    FROM Ticket t JOIN Flight f ON f.Flight_no = t.Flight_no
+    WHERE t.Booking_date IS NOT NULL
+    UNION ALL
+    SELECT t.Booking_date, t.Flight_no, COALESCE(t.Class, 'Economy'), f.Airline_ID, COALESCE(t.Price, 0)
+    FROM Ticket_archive t JOIN Flight_archive f ON f.Archive_date = t.Archive_date AND f.Flight_no = t.Flight_no
+    WHERE t.Booking_date IS NOT NULL
+) tickets
+GROUP BY Booking_date, Flight_no, Class;
+
+INSERT INTO Revenue_daily_airline (Booking_date, Airline_ID, Class, Tickets, Revenue)
+SELECT Booking_date, Airline_ID, Class, SUM(Tickets), SUM(Revenue)
+FROM Revenue_daily_flight
+GROUP BY Booking_date, Airline_ID, Class;
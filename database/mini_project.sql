@@ -2,8 +2,11 @@ CREATE DATABASE IF NOT EXISTS airport_mngt_system;
 USE airport_mngt_system;
 
 -- Drop tables if they exist
-DROP TABLE IF EXISTS FE_ASSIGNED, Boards, Passenger_Email, Passenger_phone,
-Baggage, Ticket, Crew, Gate, Passenger, Flight, Employee, Aircraft, Airport, Airline;
+DROP TABLE IF EXISTS MEDICAL_ASSIGNED, FE_ASSIGNED, Boards, Passenger_Email, Passenger_phone,
+Baggage, Ticket, Crew, Gate, Passenger, Flight, Employee, Aircraft, Airport, Airline,
+Flight_archive, Passenger_archive, Ticket_archive, Baggage_archive, Boards_archive,
+Passenger_Email_archive, Passenger_phone_archive, Crew_archive,
+Revenue_daily_flight, Revenue_daily_airline;
 
 -- 1. Airline Table
 CREATE TABLE Airline (
@@ -62,6 +65,7 @@ CREATE TABLE Flight (
     Terminal INT,
     src_city VARCHAR(255),          
     des_city VARCHAR(255),         
+    Completed_at DATETIME,
     PRIMARY KEY (Flight_no)
 );
 
@@ -102,6 +106,7 @@ CREATE TABLE Baggage (
     Baggage_ID INT NOT NULL,
     Baggae_weight DECIMAL(10, 2),
     Baggage_status VARCHAR(50),
+    Last_scanned_at DATETIME,
     Passenger_ID INT NOT NULL,
     Flight_no VARCHAR(20) NOT NULL,
     PRIMARY KEY (Baggage_ID, Passenger_ID, Flight_no)
@@ -113,6 +118,7 @@ CREATE TABLE Ticket (
     Price DECIMAL(10, 2),
     Seat_No VARCHAR(10),
     Booking_date DATE,
+    Class VARCHAR(20) DEFAULT 'Economy',
     Flight_no VARCHAR(20) NOT NULL,
     Passenger_ID INT NOT NULL,
     PRIMARY KEY (Ticket_no, Flight_no, Passenger_ID)
@@ -146,6 +152,139 @@ CREATE TABLE Passenger_phone (
     PRIMARY KEY (Passenger_ID, Passenger_phone)
 );
 
+-- 15. MEDICAL_ASSIGNED Table (one medic per ill passenger)
+CREATE TABLE MEDICAL_ASSIGNED (
+    Passenger_ID INT NOT NULL,
+    Employee_ID INT NOT NULL,
+    PRIMARY KEY (Passenger_ID)
+);
+
+-- 16.-23. Archive tables: completed flights and everything hanging off
+-- them, moved out of the live tables by the archiver (archive.py).
+-- Archive_date is the day the flight completed; every table is range
+-- partitioned on it by month, and the archiver splits a new month off
+-- p_future before its first batch lands.
+CREATE TABLE Flight_archive (
+    Flight_no VARCHAR(20) NOT NULL,
+    Airline_name VARCHAR(255),
+    Flight_status VARCHAR(20),
+    arrival_time TIME,
+    Airport_ID VARCHAR(3) NOT NULL,
+    Airline_ID INT NOT NULL,
+    Gate_no VARCHAR(10),
+    Terminal INT,
+    src_city VARCHAR(255),
+    des_city VARCHAR(255),
+    Completed_at DATETIME,
+    Archive_date DATE NOT NULL,
+    PRIMARY KEY (Archive_date, Flight_no),
+    KEY idx_flight_archive_no (Flight_no, Archive_date),
+    KEY idx_flight_archive_airport (Airport_ID, Archive_date)
+)
+PARTITION BY RANGE COLUMNS (Archive_date) (PARTITION p_future VALUES LESS THAN (MAXVALUE));
+
+CREATE TABLE Passenger_archive (
+    Passenger_ID INT NOT NULL,
+    F_Name VARCHAR(100) NOT NULL,
+    M_Name VARCHAR(100),
+    L_Name VARCHAR(100) NOT NULL,
+    Passenger_name VARCHAR(200),
+    DOB DATE,
+    Passenger_Address VARCHAR(255),
+    Flight_no VARCHAR(20) NOT NULL,
+    Passenger_status VARCHAR(20),
+    Archive_date DATE NOT NULL,
+    PRIMARY KEY (Archive_date, Passenger_ID),
+    KEY idx_passenger_archive_flight (Flight_no, Archive_date)
+)
+PARTITION BY RANGE COLUMNS (Archive_date) (PARTITION p_future VALUES LESS THAN (MAXVALUE));
+
+CREATE TABLE Ticket_archive (
+    Ticket_no VARCHAR(50) NOT NULL,
+    Price DECIMAL(10, 2),
+    Seat_No VARCHAR(10),
+    Booking_date DATE,
+    Class VARCHAR(20) DEFAULT 'Economy',
+    Flight_no VARCHAR(20) NOT NULL,
+    Passenger_ID INT NOT NULL,
+    Archive_date DATE NOT NULL,
+    PRIMARY KEY (Archive_date, Ticket_no, Flight_no, Passenger_ID),
+    KEY idx_ticket_archive_passenger (Passenger_ID, Archive_date)
+)
+PARTITION BY RANGE COLUMNS (Archive_date) (PARTITION p_future VALUES LESS THAN (MAXVALUE));
+
+CREATE TABLE Baggage_archive (
+    Baggage_ID INT NOT NULL,
+    Baggae_weight DECIMAL(10, 2),
+    Baggage_status VARCHAR(50),
+    Passenger_ID INT NOT NULL,
+    Flight_no VARCHAR(20) NOT NULL,
+    Archive_date DATE NOT NULL,
+    PRIMARY KEY (Archive_date, Baggage_ID, Passenger_ID, Flight_no),
+    KEY idx_baggage_archive_passenger (Passenger_ID, Archive_date)
+)
+PARTITION BY RANGE COLUMNS (Archive_date) (PARTITION p_future VALUES LESS THAN (MAXVALUE));
+
+CREATE TABLE Boards_archive (
+    Passenger_ID INT NOT NULL,
+    Flight_no VARCHAR(20) NOT NULL,
+    Archive_date DATE NOT NULL,
+    PRIMARY KEY (Archive_date, Passenger_ID, Flight_no)
+)
+PARTITION BY RANGE COLUMNS (Archive_date) (PARTITION p_future VALUES LESS THAN (MAXVALUE));
+
+CREATE TABLE Passenger_Email_archive (
+    Passenger_ID INT NOT NULL,
+    Passenger_email VARCHAR(50) NOT NULL,
+    Archive_date DATE NOT NULL,
+    PRIMARY KEY (Archive_date, Passenger_ID, Passenger_email)
+)
+PARTITION BY RANGE COLUMNS (Archive_date) (PARTITION p_future VALUES LESS THAN (MAXVALUE));
+
+CREATE TABLE Passenger_phone_archive (
+    Passenger_ID INT NOT NULL,
+    Passenger_phone BIGINT NOT NULL,
+    Archive_date DATE NOT NULL,
+    PRIMARY KEY (Archive_date, Passenger_ID, Passenger_phone)
+)
+PARTITION BY RANGE COLUMNS (Archive_date) (PARTITION p_future VALUES LESS THAN (MAXVALUE));
+
+-- crew assignments of archived flights; the crew themselves stay live
+CREATE TABLE Crew_archive (
+    Crew_ID INT NOT NULL,
+    Crew_role VARCHAR(100),
+    Employee_ID INT NOT NULL,
+    Flight_no VARCHAR(20) NOT NULL,
+    Archive_date DATE NOT NULL,
+    PRIMARY KEY (Archive_date, Flight_no, Crew_ID),
+    KEY idx_crew_archive_employee (Employee_ID, Archive_date)
+)
+PARTITION BY RANGE COLUMNS (Archive_date) (PARTITION p_future VALUES LESS THAN (MAXVALUE));
+
+-- 24.-25. Daily revenue rollups of Ticket, kept current by the API
+-- (revenue.py) as tickets are written and deleted. Archived tickets stay
+-- counted, so there are no foreign keys to the live tables.
+CREATE TABLE Revenue_daily_flight (
+    Booking_date DATE NOT NULL,
+    Flight_no VARCHAR(20) NOT NULL,
+    Class VARCHAR(20) NOT NULL,
+    Airline_ID INT NOT NULL,
+    Tickets INT NOT NULL DEFAULT 0,
+    Revenue DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (Booking_date, Flight_no, Class),
+    KEY idx_revenue_flight_no (Flight_no, Booking_date)
+);
+
+CREATE TABLE Revenue_daily_airline (
+    Booking_date DATE NOT NULL,
+    Airline_ID INT NOT NULL,
+    Class VARCHAR(20) NOT NULL,
+    Tickets INT NOT NULL DEFAULT 0,
+    Revenue DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (Booking_date, Airline_ID, Class),
+    KEY idx_revenue_airline (Airline_ID, Booking_date)
+);
+
 -- FOREIGN KEYS
 ALTER TABLE Aircraft 
     ADD CONSTRAINT fk_aircraft_airline FOREIGN KEY (Airline_ID) REFERENCES Airline(Airline_ID)
@@ -203,6 +342,40 @@ ALTER TABLE Passenger_phone
     ADD CONSTRAINT fk_phone_passenger FOREIGN KEY (Passenger_ID) REFERENCES Passenger(Passenger_ID)
     ON DELETE CASCADE ON UPDATE CASCADE;
 
+ALTER TABLE MEDICAL_ASSIGNED 
+    ADD CONSTRAINT fk_medical_passenger FOREIGN KEY (Passenger_ID) REFERENCES Passenger(Passenger_ID)
+    ON DELETE CASCADE ON UPDATE CASCADE,
+    ADD CONSTRAINT fk_medical_employee FOREIGN KEY (Employee_ID) REFERENCES Employee(Employee_ID)
+    ON DELETE CASCADE ON UPDATE CASCADE;
+
+
+-- INDEXES for the filters and joins the API runs on every page load
+
+-- signin: F_Name + Job_title
+CREATE INDEX idx_employee_name_job ON Employee (F_Name, Job_title);
+-- crew-employees, ground operations and the employee report (covering)
+CREATE INDEX idx_employee_job ON Employee (Job_title, Employee_name, Employee_Salary);
+
+-- flight traffic report and arrivals on the ground operations screen
+CREATE INDEX idx_flight_status ON Flight (Flight_status, Flight_no);
+-- flights due for archiving
+CREATE INDEX idx_flight_completed ON Flight (Completed_at, Flight_no);
+
+-- passengers of a flight, ill passengers
+CREATE INDEX idx_passenger_flight ON Passenger (Flight_no, Passenger_status);
+CREATE INDEX idx_passenger_status ON Passenger (Passenger_status, Flight_no);
+
+-- baggage and ticket of a passenger (covering for the passenger list join)
+CREATE INDEX idx_baggage_passenger ON Baggage (Passenger_ID, Baggage_ID, Baggae_weight);
+CREATE INDEX idx_ticket_passenger ON Ticket (Passenger_ID, Ticket_no);
+
+-- crew of a flight
+CREATE INDEX idx_crew_flight ON Crew (Flight_no);
+
+-- engineers on a flight, patients of a medic (dispatch load counts)
+CREATE INDEX idx_fe_flight ON FE_ASSIGNED (Flight_no, Employee_ID);
+CREATE INDEX idx_medical_employee ON MEDICAL_ASSIGNED (Employee_ID, Passenger_ID);
+
 
 -- DML COMMANDS 
 -- Insert Airlines 
@@ -272,10 +445,10 @@ INSERT INTO Aircraft (Aircraft_ID, capacity, Manufacturer, Model, Airline_ID) VA
 
 -- Insert Employees 
 
--- 1. Airport Head of Staff and security
+-- 1. Airport Head of Staff and security (bcrypt hashes of admin123 and security123)
 INSERT INTO Employee (Employee_ID, F_Name, M_Initial, L_Name, Employee_name, Hire_date, Employee_Salary, Job_title, Airport_ID, Assign, pwd) VALUES
-(1001, 'abc', 'K', 'def', 'abc def', '2020-01-15', 150000, 'Airport Head of Staff', 'BLR',0, 'admin123'),
-(1002, 'xyz', 'B', 'lmn', 'xyz B lmn', '2020-01-15', 15000, 'Security', 'BLR',0, 'security123');
+(1001, 'abc', 'K', 'def', 'abc def', '2020-01-15', 150000, 'Airport Head of Staff', 'BLR',0, '$2b$12$.5zQqhYp1dKA.MiNrzrDLOrXJzEU9Tu1AWPdy72INCe6WMufKTr6q'),
+(1002, 'xyz', 'B', 'lmn', 'xyz B lmn', '2020-01-15', 15000, 'Security', 'BLR',0, '$2b$12$/NmrV8wsv1K0.gcRNhHrAObNthtZCByDqMf62dqox7AUW0GoyJGCC');
 
 -- 2. Check-in Handlers 
 INSERT INTO Employee (Employee_ID, F_Name, M_Initial, L_Name, Employee_name, Hire_date, Employee_Salary, Job_title, Airport_ID,Assign, pwd) VALUES
@@ -701,6 +874,18 @@ INSERT INTO Baggage (Baggage_ID, Baggae_weight, Baggage_status, Passenger_ID, Fl
 (49, 23.1, 'Loaded', 49, 'AK456'),
 (50, 21.9, 'Loaded', 50, 'AK456');
 
+-- Revenue rollups of the sample tickets
+INSERT INTO Revenue_daily_flight (Booking_date, Flight_no, Class, Airline_ID, Tickets, Revenue)
+SELECT t.Booking_date, t.Flight_no, COALESCE(t.Class, 'Economy'), MAX(f.Airline_ID), COUNT(*), SUM(COALESCE(t.Price, 0))
+FROM Ticket t JOIN Flight f ON f.Flight_no = t.Flight_no
+WHERE t.Booking_date IS NOT NULL
+GROUP BY t.Booking_date, t.Flight_no, COALESCE(t.Class, 'Economy');
+
+INSERT INTO Revenue_daily_airline (Booking_date, Airline_ID, Class, Tickets, Revenue)
+SELECT Booking_date, Airline_ID, Class, SUM(Tickets), SUM(Revenue)
+FROM Revenue_daily_flight
+GROUP BY Booking_date, Airline_ID, Class;
+
 
 -- Trigger for deleting employee
 DELIMITER $$
@@ -716,21 +901,9 @@ END$$
 
 DELIMITER ;
 
--- Trigger for updating passenger
-DELIMITER $$
-
-CREATE TRIGGER UpdatePassengerStatusAfterBaggageUpdate
-AFTER UPDATE ON Baggage
-FOR EACH ROW
-BEGIN
-  IF NEW.Baggae_weight < 33 THEN
-    UPDATE Passenger
-    SET Passenger_status = 'Normal'
-    WHERE Passenger_ID = NEW.Passenger_ID;
-  END IF;
-END$$
-
-DELIMITER ;
+-- Baggage scans clear a passenger's 'baggage overweight' status once a batch
+-- of them has been written (airport-management-backend/baggage_scans.py);
+-- there is no per-row trigger on Baggage.
 
 
 